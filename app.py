@@ -1,157 +1,522 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import graphviz
-import re
-import math
+from flask import Flask, render_template, request, jsonify, send_file, url_for, g
+import codecs
+import gzip
+import hashlib
 import os
 import tempfile
 from datetime import datetime
 import io
+import json
+import re
+import time
+from sql_parser import SQLParseError, SchemaParser, parse_schema
+from drawio_writer import DrawioGenerator, layout_scale
+from graphviz_writer import ERDiagramGenerator
+from svg_writer import SvgGenerator
+from diagram_model import DiagramModel, ModelCache
+from layout import LAYOUT_MODES
+from render_cache import RenderCache, cache_key
+from layout_store import LayoutStore, extract_positions
+from render_scheduler import (RenderScheduler, RenderQueueFull, RenderUnavailable,
+                              RenderTimeout, RenderCancelled, client_disconnected)
+from render_jobs import JobStore, JobManager, JobQueueFull
+from table_bundle import BundleCancelled, write_table_bundle
+from partition import (DEFAULT_MAX_NODES, PARTITION_STRATEGIES, iter_partitioned_drawio, partition_schema,
+                       write_partition_bundle)
+from tiles import TILE_FORMATS, TileGrid
+from schema_diff import diff_display_schema, diff_schemas, stable_layout
+from schema_index import SchemaIndex
+from catalog import CatalogError, load_catalog
+from serving import Readiness
+from live_preview import LiveSessionLimit, LiveSessions, VersionConflict
+import metrics
+from metrics import SlowRequestProfiler, timed
 
 app = Flask(__name__)
 
-class ERDiagramGenerator:
-    def __init__(self):
-        self.dot = graphviz.Graph('ER', 
-                                 engine='neato',  
-                                 graph_attr={
-                                     'splines': 'spline',
-                                     'overlap': 'scale',
-                                     'sep': '+30',
-                                     'esep': '+20',
-                                     'nodesep': '1.0',
-                                     'charset': 'utf8'
-                                 })
-        self.dot.attr('node', shape='rectangle', fontname='Microsoft YaHei')
-
-    def parse_sql(self, sql_content, table_radius=6, field_radius=2, show_type=False):
-        table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\(([\s\S]*?)\);'
-        tables = list(re.finditer(table_pattern, sql_content, re.IGNORECASE))
-        table_count = len(tables)
+# 渲染结果缓存：内存LRU + 可选的磁盘层（设置 SQL2ER_CACHE_DIR 启用）
+render_cache = RenderCache(
+    max_entries=int(os.environ.get('SQL2ER_CACHE_ENTRIES', 128)),
+    disk_dir=os.environ.get('SQL2ER_CACHE_DIR') or None,
+    disk_max_bytes=int(os.environ.get('SQL2ER_CACHE_DISK_BYTES', 512 * 1024 * 1024))
+)
+
+# 布局存储：保存 neato 算好的节点位置与连线路径，之后的渲染只做绘制。
+# 设置 SQL2ER_LAYOUT_DB 时保存到该 SQLite 文件（重启后仍可复用，多个进程共用），否则只在内存中
+layout_store = LayoutStore(os.environ.get('SQL2ER_LAYOUT_DB') or ':memory:',
+                           max_bytes=int(os.environ.get('SQL2ER_LAYOUT_DB_MB', 256)) * 1024 * 1024)
+
+# 按已保存的布局绘制时传给 neato 的参数：使用输入中的节点坐标与连线路径，不再布局
+DRAW_ARGS = ('-n2',)
+
+# 解析结果：按输入内容的哈希记住最近用过的 DiagramModel，同一份SQL生成图片、导出Draw.io、请求图块时只解析一次
+diagram_models = ModelCache(max_entries=int(os.environ.get('SQL2ER_MODEL_CACHE', 32)))
+
+# 检索用的倒排索引：同一份输入只建一次，之后的查询只查索引
+search_indexes = ModelCache(max_entries=int(os.environ.get('SQL2ER_SEARCH_INDEXES', 8)))
+
+# 渲染方式：pipe（默认，内存管道）或 file（临时文件，兼容旧行为）
+RENDER_MODE = os.environ.get('SQL2ER_RENDER_MODE', 'pipe')
+
+# 布局进程调度：限制同时运行的 neato 数量、排队长度、单任务耗时与内存
+render_scheduler = RenderScheduler(
+    max_workers=int(os.environ.get('SQL2ER_RENDER_WORKERS', os.cpu_count() or 2)),
+    max_queue=int(os.environ.get('SQL2ER_RENDER_QUEUE', 16)),
+    timeout=float(os.environ.get('SQL2ER_RENDER_TIMEOUT', 60)),
+    memory_limit=int(os.environ.get('SQL2ER_RENDER_MEMORY_MB', 1024)) * 1024 * 1024
+)
+
+# 异步渲染任务：结果在任务完成后保留 SQL2ER_JOB_TTL 秒；排队和运行中的任务超过 SQL2ER_JOB_QUEUE 个时拒绝新任务
+job_manager = JobManager(
+    JobStore(ttl=float(os.environ.get('SQL2ER_JOB_TTL', 600))),
+    max_workers=int(os.environ.get('SQL2ER_JOB_WORKERS', 4)),
+    max_pending=int(os.environ.get('SQL2ER_JOB_QUEUE', 32))
+)
+
+# 实时预览会话：浏览器经 SSE 接收图的增量更新，SQL2ER_LIVE_IDLE 秒没有编辑的会话被清理。
+# 每个事件流一直占用一个请求线程（gthread 下每个工作进程 SQL2ER_THREADS 个），会话数上限总比线程数少
+# SQL2ER_LIVE_RESERVE 个，留给 /generate、/ready 和各会话上传改动的请求；超出时打开会话返回 429
+REQUEST_THREADS = int(os.environ.get('SQL2ER_THREADS', 8))
+LIVE_RESERVED_THREADS = int(os.environ.get('SQL2ER_LIVE_RESERVE', 4))
+live_sessions = LiveSessions(
+    max_sessions=max(0, min(int(os.environ.get('SQL2ER_LIVE_SESSIONS', REQUEST_THREADS)),
+                            REQUEST_THREADS - LIVE_RESERVED_THREADS)),
+    idle_timeout=float(os.environ.get('SQL2ER_LIVE_IDLE', 300))
+)
+
+# 异步任务支持的输出格式
+JOB_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'drawio': 'application/xml',
+    'zip': 'application/zip',
+}
+
+# 按表批量导出时压缩包内可包含的格式
+BUNDLE_FORMATS = ('png', 'svg', 'drawio')
+
+# 分区导出：每区默认的表数上限；各分区并行渲染，同时运行的布局进程数受内存预算限制
+# （每个进程至多 SQL2ER_RENDER_MEMORY_MB），预算不足两个进程时逐个渲染
+PARTITION_MAX_TABLES = int(os.environ.get('SQL2ER_PARTITION_TABLES', 150))
+PARTITION_MEMORY = int(os.environ.get('SQL2ER_PARTITION_MEMORY_MB', 2048)) * 1024 * 1024
+PARTITION_WORKERS = max(1, min(render_scheduler.max_workers,
+                               (PARTITION_MEMORY // render_scheduler.memory_limit) if render_scheduler.memory_limit
+                               else render_scheduler.max_workers))
+PARTITION_FORMATS = ('drawio', 'png', 'svg')
+
+# 上传文件的读取块大小，以及上传的SQL转储中单条建表语句的长度上限（字符）
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_STATEMENT_SIZE = int(os.environ.get('SQL2ER_MAX_STATEMENT_MB', 16)) * 1024 * 1024
+
+# 慢请求分析：设置 SQL2ER_PROFILE_DIR 后，耗时超过阈值的请求把 cProfile 结果写入该目录
+profiler = None
+if os.environ.get('SQL2ER_PROFILE_DIR'):
+    profiler = SlowRequestProfiler(os.environ['SQL2ER_PROFILE_DIR'],
+                                   threshold=float(os.environ.get('SQL2ER_PROFILE_THRESHOLD_MS', 1000)) / 1000)
+
+def collect_component_stats():
+    """抓取 /metrics 时导出缓存与渲染调度器的当前统计"""
+    cache = render_cache.stats()
+    layouts = layout_store.stats()
+    models = diagram_models.stats()
+    indexes = search_indexes.stats()
+    live = live_sessions.stats()
+    scheduler = render_scheduler.stats()
+    jobs = job_manager.stats()
+    return [
+        ('cache_hits_total', 'counter', '渲染缓存命中数',
+         [({'layer': 'memory'}, cache['memory_hits']), ({'layer': 'disk'}, cache['disk_hits'])]),
+        ('cache_misses_total', 'counter', '渲染缓存未命中数', [({}, cache['misses'])]),
+        ('cache_entries', 'gauge', '内存缓存条目数', [({}, cache['entries'])]),
+        ('cache_bytes', 'gauge', '内存缓存占用字节数', [({}, cache['bytes'])]),
+        ('model_cache_hits_total', 'counter', '解析结果（DiagramModel）复用次数', [({}, models['hits'])]),
+        ('model_cache_misses_total', 'counter', '需要重新解析的次数', [({}, models['misses'])]),
+        ('search_index_hits_total', 'counter', '检索复用已建索引的次数', [({}, indexes['hits'])]),
+        ('search_index_misses_total', 'counter', '需要重新建立检索索引的次数', [({}, indexes['misses'])]),
+        ('layout_store_hits_total', 'counter', '布局存储命中数', [({}, layouts['hits'])]),
+        ('layout_store_misses_total', 'counter', '布局存储未命中数', [({}, layouts['misses'])]),
+        ('layout_store_entries', 'gauge', '布局存储条目数', [({}, layouts['entries'])]),
+        ('layout_store_bytes', 'gauge', '布局存储占用字节数', [({}, layouts['bytes'])]),
+        ('live_sessions', 'gauge', '实时预览会话数', [({}, live['sessions'])]),
+        ('live_sessions_evicted_total', 'counter', '因空闲或事件流断开被清理的实时预览会话数', [({}, live['evicted'])]),
+        ('render_running', 'gauge', '正在运行的布局进程数', [({}, scheduler['running'])]),
+        ('render_queued', 'gauge', '排队中的渲染任务数', [({}, scheduler['queued'])]),
+        ('render_tasks_total', 'counter', '渲染任务数',
+         [({'result': 'completed'}, scheduler['completed']), ({'result': 'failed'}, scheduler['failed']),
+          ({'result': 'rejected'}, scheduler['rejected'])]),
+        ('jobs_active', 'gauge', '排队和运行中的异步任务数', [({}, jobs['active'])]),
+        ('jobs_rejected_total', 'counter', '因任务已满被拒绝的异步任务数', [({}, jobs['rejected'])]),
+    ]
+
+metrics.registry.add_collector(collect_component_stats)
+
+# 就绪状态：Graphviz 检查结果与是否正在退出，见 /ready
+readiness = Readiness()
+
+def drain():
+    """进程退出前调用：结束实时预览的事件流，不再接受异步任务，等待进行中的任务和已提交的渲染完成"""
+    readiness.draining = True
+    live_sessions.shutdown()
+    job_manager.shutdown(wait=True)
+    render_scheduler.shutdown(wait=True)
+
+def load_sql(sql_content):
+    """解析SQL并记录解析耗时与表、字段、关系数量"""
+    with timed('parse'):
+        schema = parse_schema(sql_content)
+    metrics.record_schema(schema)
+    return schema
+
+def load_model(source, schema=None):
+    """返回 source（SQL或上传文件的内容标识）对应的 DiagramModel，没有记住时解析 source（或转换给出的 schema）"""
+    return diagram_models.get(source, lambda: DiagramModel.from_schema(schema if schema is not None
+                                                                       else load_sql(source)))
+
+def render_source(source, format, engine='neato', args=(), cancel_check=None):
+    """经 render_scheduler 渲染DOT源码，记录渲染耗时和输出字节数"""
+    with timed('render'):
+        data = render_scheduler.render(source, format, engine, args, cancel_check=cancel_check)
+    metrics.registry.inc('render_bytes_total', len(data), format=format)
+    return data
+
+def render_with_layout(source, format, engine='neato', args=(), cancel_check=None):
+    """一次 neato 运行同时输出 format 格式的图片（标准输出）和带坐标的布局DOT（继承的管道），
+    返回 (布局DOT字节, 图片字节)；format 为 None 时只输出布局"""
+    if format is None:
+        return render_source(source, 'dot', engine, args, cancel_check=cancel_check), None
+    if not render_scheduler.supports_extra_format:
+        # 不支持把管道交给子进程的系统（Windows）上接受两次运行的开销：先布局，再按布局绘制
+        data = render_source(source, 'dot', engine, args, cancel_check=cancel_check)
+        return data, render_source(data.decode('utf-8'), format, 'neato', DRAW_ARGS, cancel_check=cancel_check)
+    with timed('render'):
+        image_data, data = render_scheduler.render(source, format, engine, args, cancel_check=cancel_check,
+                                                   extra_format='dot')
+    metrics.registry.inc('render_bytes_total', len(image_data), format=format)
+    metrics.registry.inc('render_bytes_total', len(data), format='dot')
+    return data, image_data
+
+def render_png(sql_content, table_radius=6, field_radius=2, show_type=False, layout='circle',
+               mode=None, cancel_check=None, format='png', schema=None, source=None):
+    """渲染PNG（或 format 指定的 svg）并返回图片字节
+
+    默认经 render_scheduler 通过管道调用 neato：布局存储中已有布局时以 neato -n2 按布局绘制，
+    否则由 load_layout 运行一次 neato，同时得到图片和要保存的布局；mode='file' 时在当前线程走临时文件渲染。
+    给出 schema（例如读取自数据库文件）时不再解析 sql_content，此时 source 为计算布局键用的文件内容。
+    """
+    if (mode or RENDER_MODE) == 'file':
+        generator = ERDiagramGenerator()
+        generator.load_schema(load_model(source or sql_content, schema), table_radius, field_radius, show_type,
+                              layout)
+        return render_png_via_file(generator, format)
+    _, layout_source, image_data = load_layout(source or sql_content, table_radius, field_radius, show_type, layout,
+                                               schema=schema, cancel_check=cancel_check, format=format)
+    if image_data is None:
+        image_data = render_source(layout_source, format, 'neato', DRAW_ARGS, cancel_check=cancel_check)
+    return image_data
+
+def render_preview(sql_content, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                   schema=None, source=None):
+    """快速预览：在进程内按计算出的坐标直接写出SVG（直线连线），不经过 neato 和渲染队列"""
+    model = load_model(source or sql_content, schema)
+    with timed('preview'):
+        image_data = SvgGenerator().generate_from_schema(model, table_radius, field_radius, show_type,
+                                                         layout).encode('utf-8')
+    metrics.registry.inc('render_bytes_total', len(image_data), format='preview')
+    return image_data
+
+def request_upload(field):
+    """表单中上传的文件，没有上传时返回 None"""
+    upload = request.files.get(field)
+    return upload if upload is not None and upload.filename else None
+
+def read_database(upload):
+    """把上传的数据库文件写入临时文件并读取其目录，返回 (Schema, 文件内容的SHA-256)"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    try:
+        digest = hashlib.sha256()
+        with timed('io'), os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: upload.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+        with timed('introspect'):
+            schema = load_catalog(path)
+    finally:
+        os.unlink(path)
+    metrics.record_schema(schema)
+    return schema, digest.hexdigest()
+
+def read_sql_upload(upload):
+    """分块读取上传的SQL转储（可以是gzip压缩的），返回 (Schema, 文件内容的SHA-256)
+
+    数据语句在解析时边扫描边丢弃，内存占用只与最长的建表语句有关，与文件大小无关。
+    """
+    stream = upload.stream
+    magic = stream.read(2)
+    stream.seek(0)
+    raw = gzip.GzipFile(fileobj=stream) if magic == b'\x1f\x8b' else stream
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    parser = SchemaParser(max_statement=MAX_STATEMENT_SIZE)
+    with timed('parse'):
+        for chunk in iter(lambda: raw.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b'', final=True))
+        schema = parser.close()
+    metrics.record_schema(schema)
+    return schema, digest.hexdigest()
+
+def read_uploaded_schema():
+    """读取表单中上传的数据库文件（database）或SQL转储（sql_file）
+
+    返回 (Schema, 缓存键使用的来源标识)；没有上传文件时返回 (None, None)。
+    """
+    database = request_upload('database')
+    if database is not None:
+        schema, digest = read_database(database)
+        return schema, f"catalog:{digest}"
+    sql_file = request_upload('sql_file')
+    if sql_file is not None:
+        schema, digest = read_sql_upload(sql_file)
+        return schema, f"upload:{digest}"
+    return None, None
+
+def render_png_via_file(generator, format='png'):
+    """旧的文件渲染方式：写入临时目录后读回"""
+    # 创建临时目录
+    temp_dir = tempfile.mkdtemp()
+    try:
+        # 使用完整的绝对路径
+        output_base = os.path.join(os.path.abspath(temp_dir), 'er_diagram')
         
-        table_angle_step = 360 / table_count if table_count > 1 else 0
+        # 生成图片，graphviz会自动添加格式后缀
+        with timed('render'):
+            output_path = generator.generate(output_base, format)
         
-        for i, table in enumerate(tables):
-            table_name = table.group(1)
-            fields_text = table.group(2)
-            
-            table_angle = i * table_angle_step
-            table_x = table_radius * math.cos(math.radians(table_angle))
-            table_y = table_radius * math.sin(math.radians(table_angle))
-            
-            self.dot.node(table_name, table_name, 
-                         pos=f"{table_x},{table_y}!",
-                         fontname='Microsoft YaHei')
-            
-            field_pattern = r'`?(\w+)`?\s+([^,\n]+)'
-            field_count = len(list(re.finditer(field_pattern, fields_text)))
-            angle_step = 360 / field_count
-            
-            for j, field in enumerate(re.finditer(field_pattern, fields_text)):
-                field_name = field.group(1)
-                field_type = field.group(2).strip()
-                
-                field_angle = j * angle_step
-                field_x = table_x + field_radius * math.cos(math.radians(field_angle))
-                field_y = table_y + field_radius * math.sin(math.radians(field_angle))
-                
-                field_node_name = f"{table_name}_{field_name}"
-                field_label = f"{field_name}\n{field_type}" if show_type else field_name
-                
-                self.dot.node(field_node_name, 
-                            field_label,
-                            shape='ellipse',
-                            pos=f"{field_x},{field_y}!",
-                            fontname='Microsoft YaHei')
-                
-                self.dot.edge(table_name, field_node_name)
-
-    def generate(self, output_file):
-        try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_file)
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            
-            # 生成图片
-            result = self.dot.render(output_file, format='png', cleanup=True)
-            
-            # 验证输出文件是否存在
-            if not os.path.exists(result):
-                raise Exception("图片生成失败")
-                
-            return result
-        except Exception as e:
-            raise Exception(f"Graphviz错误: {str(e)}")
-
-class DrawioGenerator:
-    def __init__(self):
-        self.next_id = 2  # 从2开始，因为0和1已被根节点使用
-
-    def get_next_id(self):
-        current_id = f"node_{self.next_id}"
-        self.next_id += 1
-        return current_id
-
-    def generate_drawio(self, sql_content, table_radius=6, field_radius=2, show_type=False):
-        xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<mxfile host="app.diagrams.net" modified="2024-01-01T00:00:00.000Z" agent="SQL ER Generator" version="21.1.1">
-  <diagram id="ER-Diagram" name="ER图">
-    <mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="1169" pageHeight="827" background="#ffffff" math="0" shadow="0">
-      <root>
-        <mxCell id="0"/>
-        <mxCell id="1" parent="0"/>
-'''
+        # 确保文件存在
+        if not os.path.exists(output_path):
+            raise Exception("生成的图片文件未找到")
         
-        table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\(([\s\S]*?)\);'
-        tables = list(re.finditer(table_pattern, sql_content, re.IGNORECASE))
-        table_count = len(tables)
-        center_x, center_y = 400, 300
+        # 读取图片
+        with timed('io'), open(output_path, 'rb') as f:
+            image_data = f.read()
+        metrics.registry.inc('render_bytes_total', len(image_data), format=format)
         
-        for i, table in enumerate(tables):
-            table_name = table.group(1)
-            fields_text = table.group(2)
-            
-            angle = (2 * math.pi * i) / table_count if table_count > 1 else 0
-            table_x = center_x + table_radius * 50 * math.cos(angle)
-            table_y = center_y + table_radius * 50 * math.sin(angle)
-            
-            table_id = self.get_next_id()
-            xml += f'''        <mxCell id="{table_id}" value="{table_name}" style="whiteSpace=wrap;html=1;" vertex="1" parent="1">
-          <mxGeometry x="{table_x}" y="{table_y}" width="120" height="40" as="geometry"/>
-        </mxCell>
-'''
-            
-            field_pattern = r'`?(\w+)`?\s+([^,\n]+)'
-            fields = list(re.finditer(field_pattern, fields_text))
-            
-            for j, field in enumerate(fields):
-                field_name = field.group(1)
-                field_type = field.group(2).strip()
-                
-                field_angle = (2 * math.pi * j) / len(fields)
-                field_x = table_x + field_radius * 100 * math.cos(field_angle)
-                field_y = table_y + field_radius * 100 * math.sin(field_angle)
-                
-                field_value = f"{field_name}&#10;{field_type}" if show_type else field_name
-                
-                field_id = self.get_next_id()
-                xml += f'''        <mxCell id="{field_id}" value="{field_value}" style="ellipse;whiteSpace=wrap;html=1;" vertex="1" parent="1">
-          <mxGeometry x="{field_x}" y="{field_y}" width="120" height="60" as="geometry"/>
-        </mxCell>
-'''
-                
-                line_id = self.get_next_id()
-                xml += f'''        <mxCell id="{line_id}" style="endArrow=none;html=1;edgeStyle=none;" edge="1" parent="1" source="{table_id}" target="{field_id}">
-          <mxGeometry relative="1" as="geometry"/>
-        </mxCell>
-'''
+        # 清理临时文件
+        try:
+            os.unlink(output_path)  # 删除图片文件
+            dot_file = f"{output_base}.dot"  # graphviz生成的dot文件
+            if os.path.exists(dot_file):
+                os.unlink(dot_file)
+        finally:
+            os.rmdir(temp_dir)
         
-        xml += '''      </root>
-    </mxGraphModel>
-  </diagram>
-</mxfile>'''
+        return image_data
         
-        return xml
+    except Exception as e:
+        # 清理临时目录
+        if os.path.exists(temp_dir):
+            for file in os.listdir(temp_dir):
+                os.unlink(os.path.join(temp_dir, file))
+            os.rmdir(temp_dir)
+        raise Exception(f"生成图片失败: {str(e)}")
+
+def build_table_bundle(fileobj, schema, formats, table_radius, field_radius, show_type, layout='circle',
+                       depth=0, names=None, cancel_check=None):
+    """每张表（连同 depth 层内的关联表）各生成一组文件写入zip，图片经 render_scheduler 并行渲染"""
+    # 只有单表时沿用原单表导出的参数，表放在中心
+    radius = table_radius if depth else 0
+    image_formats = [fmt for fmt in formats if fmt != 'drawio']
+
+    def render_table(name, subset):
+        files = {}
+        if 'drawio' in formats:
+            xml_content = DrawioGenerator().generate_from_schema(subset, radius, field_radius, show_type, layout)
+            files['drawio'] = xml_content.encode('utf-8')
+        if image_formats:
+            generator = ERDiagramGenerator()
+            generator.load_schema(subset, radius, field_radius, show_type, layout)
+            for fmt in image_formats:
+                files[fmt] = render_source(generator.dot.source, fmt, generator.dot.engine,
+                                           cancel_check=cancel_check)
+        return files
+
+    return write_table_bundle(fileobj, schema, render_table, names, depth,
+                              max_workers=render_scheduler.max_workers, cancel_check=cancel_check)
+
+def build_partition_bundle(fileobj, schema, partitions, format, table_radius, field_radius, show_type,
+                           layout='circle', cancel_check=None):
+    """各分区分别布局、渲染成图片，连同总览图和 index.json 写入zip"""
+    def render_partition(subset):
+        generator = ERDiagramGenerator()
+        generator.load_schema(subset, table_radius, field_radius, show_type, layout)
+        return render_source(generator.dot.source, format, generator.dot.engine, cancel_check=cancel_check)
+
+    def render_overview(dot):
+        return render_source(dot.source, format, dot.engine, cancel_check=cancel_check)
+
+    return write_partition_bundle(fileobj, schema, partitions, format, render_partition, render_overview,
+                                  max_workers=PARTITION_WORKERS, cancel_check=cancel_check)
+
+def read_partition_options(form):
+    """读取分区导出的参数，返回 (参数字典, 错误信息)"""
+    strategy = form.get('strategy', 'components')
+    if strategy not in PARTITION_STRATEGIES:
+        return None, f"未知的分区方式: {strategy}"
+    fmt = form.get('format', 'drawio')
+    if fmt not in PARTITION_FORMATS:
+        return None, f"不支持的输出格式: {fmt}"
+    try:
+        max_tables = int(form.get('max_tables') or PARTITION_MAX_TABLES)
+        max_nodes = int(form.get('max_nodes') or DEFAULT_MAX_NODES)
+    except ValueError:
+        return None, '分区大小必须是整数'
+    if max_tables < 1 or max_nodes < 1:
+        return None, '分区大小必须大于 0'
+    return {'strategy': strategy, 'format': fmt, 'max_tables': max_tables, 'max_nodes': max_nodes}, None
+
+def run_diagram_job(job, sql_content, table_radius, field_radius, show_type, layout='circle', bundle=None):
+    """后台任务：SQL只解析一次，依次生成请求的各种格式
+
+    任务被取消后在进入下一步之前返回；正在进行的一步中，Draw.io 生成会做完，按表拆分和 neato 渲染立即停止。
+    """
+    cancelled = job.cancel_event.is_set
+    job.set_progress(5, 'parse')
+    # 按表拆分需要完整的 Schema，此时解析一次，DiagramModel 由它转换，不再解析第二遍
+    schema = load_sql(sql_content) if 'zip' in job.formats else None
+    model = load_model(sql_content, schema)
+    
+    done = 0
+    step = 90 / len(job.formats)
+    if 'drawio' in job.formats:
+        if cancelled():
+            return
+        job.set_progress(10, 'drawio')
+        with timed('drawio'):
+            xml_content = DrawioGenerator().generate_from_schema(model, table_radius, field_radius, show_type,
+                                                                 layout)
+        job.add_artifact('drawio', xml_content.encode('utf-8'), JOB_FORMATS['drawio'])
+        done += 1
+    
+    if 'zip' in job.formats:
+        if cancelled():
+            return
+        job.set_progress(int(10 + done * step), 'zip')
+        buffer = io.BytesIO()
+        build_table_bundle(buffer, schema, bundle['formats'], table_radius, field_radius, show_type, layout,
+                           bundle['depth'], bundle['tables'], cancel_check=cancelled)
+        job.add_artifact('zip', buffer.getvalue(), JOB_FORMATS['zip'])
+        done += 1
+    
+    image_formats = [fmt for fmt in job.formats if fmt not in ('drawio', 'zip')]
+    # 各图片格式共用一次布局，之后每种格式只做绘制
+    layout_source = None
+    for fmt in image_formats:
+        if cancelled():
+            return
+        job.set_progress(int(10 + done * step), fmt)
+        key = cache_key(sql_content, fmt, show_type=show_type, layout=layout,
+                        table_radius=table_radius, field_radius=field_radius)
+        data = render_cache.get(key)
+        if data is None:
+            if layout_source is None:
+                # 需要计算布局时顺带输出第一种格式的图片
+                _, layout_source, data = load_layout(sql_content, table_radius, field_radius, show_type, layout,
+                                                     schema=model, cancel_check=cancelled, format=fmt)
+            if data is None:
+                data = render_source(layout_source, fmt, 'neato', DRAW_ARGS, cancel_check=cancelled)
+            render_cache.put(key, data)
+        job.add_artifact(fmt, data, JOB_FORMATS[fmt])
+        done += 1
+
+def load_layout(source, table_radius, field_radius, show_type, layout='circle', schema=None, cancel_check=None,
+                format=None):
+    """计算（或从布局存储取回）带坐标的完整布局，返回 (布局ID, 布局DOT文本, 图片字节或None)
+
+    布局ID由 source（SQL或上传文件内容）和布局参数决定，之后的渲染和图块请求凭它取回布局，
+    以 neato -n2 只做绘制不再重新布局。只切换 show_type 时沿用同一表结构已保存的节点位置，
+    neato 只需重新布线。给出 schema（Schema 或 DiagramModel）时不再解析 source。
+    给出 format 且需要运行 neato 时，同一次运行还输出该格式的图片，不必再以 -n2 绘制一遍；
+    布局取自布局存储时图片为 None。
+    """
+    key = cache_key(source, 'layout', show_type=show_type, layout=layout,
+                    table_radius=table_radius, field_radius=field_radius)
+    data = layout_store.get(key)
+    if data is not None:
+        return key, data.decode('utf-8'), None
+
+    model = load_model(source, schema)
+    # 节点位置与显示样式无关，键中不含 show_type
+    positions_key = cache_key(source, 'positions', layout=layout,
+                              table_radius=table_radius, field_radius=field_radius)
+    pinned = layout_store.get(positions_key)
+    generator = ERDiagramGenerator()
+    if pinned is not None:
+        generator.load_schema(model, table_radius, field_radius, show_type, layout, pinned=json.loads(pinned))
+        if generator.unpinned:
+            generator, pinned = ERDiagramGenerator(), None
+    if pinned is not None:
+        data, image_data = render_with_layout(generator.dot.source, format, 'neato', DRAW_ARGS,
+                                              cancel_check=cancel_check)
+    else:
+        generator.load_schema(model, table_radius, field_radius, show_type, layout)
+        data, image_data = render_with_layout(generator.dot.source, format, generator.dot.engine,
+                                              cancel_check=cancel_check)
+        positions = extract_positions(data.decode('utf-8'))
+        layout_store.put(positions_key, json.dumps(positions, ensure_ascii=False).encode('utf-8'))
+    layout_store.put(key, data)
+    return key, data.decode('utf-8'), image_data
+
+def render_error_response(e):
+    """把渲染过程中的异常映射为JSON错误响应"""
+    if isinstance(e, (SQLParseError, CatalogError)):
+        # 输入有误（消息中带有出错语句的行号），与服务端故障区分开
+        return jsonify({'error': str(e)}), 400
+    if isinstance(e, RenderQueueFull):
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    if isinstance(e, RenderUnavailable):
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    if isinstance(e, RenderTimeout):
+        return jsonify({'error': str(e)}), 504
+    if isinstance(e, (RenderCancelled, BundleCancelled)):
+        # 客户端已断开，响应不会被读取
+        return jsonify({'error': str(e)}), 499
+    return jsonify({'error': str(e)}), 500
+
+def read_bundle_options(form):
+    """读取按表批量导出的参数，返回 (参数字典, 错误信息)"""
+    formats = [fmt.strip() for fmt in form.get('table_formats', 'png,drawio').split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in BUNDLE_FORMATS]
+    if not formats or unknown:
+        return None, f"不支持的输出格式: {', '.join(unknown)}"
+    try:
+        depth = int(form.get('depth', 0))
+    except ValueError:
+        return None, '关联深度必须是整数'
+    if depth < 0:
+        return None, '关联深度不能为负数'
+    tables = [name.strip() for name in form.get('tables', '').split(',') if name.strip()]
+    return {'formats': formats, 'depth': depth, 'tables': tables or None}, None
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+    g.profile = profiler.start() if profiler is not None else None
+
+@app.after_request
+def finish_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or 'unknown'
+    if profiler is not None:
+        profiler.stop(g.profile, elapsed, endpoint)
+    metrics.registry.observe('request_seconds', elapsed, endpoint=endpoint)
+    metrics.registry.inc('requests_total', endpoint=endpoint, status=response.status_code)
+    # 流式响应（如 /export-drawio）此时尚未生成正文，不计字节数
+    if not response.is_streamed and response.content_length:
+        metrics.registry.inc('response_bytes_total', response.content_length, endpoint=endpoint)
+    response.headers['Server-Timing'] = metrics.server_timing(metrics.finish_request(), elapsed)
+    return response
 
 @app.route('/')
 def index():
@@ -163,85 +528,552 @@ def generate():
     show_type = request.form.get('show_type') == 'true'
     table_radius = float(request.form.get('table_radius', 6))
     field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    output_format = request.form.get('format', 'png')
+    # preview=true 时由 svg_writer 直接生成SVG预览，输出格式固定为 svg
+    preview = request.form.get('preview') == 'true'
+    if preview:
+        output_format = 'svg'
     
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    if output_format not in TILE_FORMATS:
+        return jsonify({'error': f'不支持的输出格式: {output_format}'}), 400
+
+    # 上传了数据库文件或SQL转储时直接从文件得到表结构，缓存键按文件内容计算
+    try:
+        schema, source = read_uploaded_schema()
+    except (CatalogError, SQLParseError) as e:
+        return jsonify({'error': str(e)}), 400
+    if schema is None:
+        if not sql_content:
+            return jsonify({'error': '请输入SQL语句'}), 400
+        source = sql_content
+
+    # 相同的SQL和参数总是得到相同的图片，缓存键同时作为ETag
+    key = cache_key(source, 'preview' if preview else output_format, show_type=show_type, layout=layout,
+                    table_radius=table_radius, field_radius=field_radius)
+    if request.if_none_match.contains(key):
+        response = app.response_class(status=304)
+        response.set_etag(key)
+        return response
+
+    try:
+        if preview:
+            # 预览生成得比读缓存慢不了多少，不占用渲染缓存的条目
+            image_data = render_preview(sql_content, table_radius, field_radius, show_type, layout,
+                                        schema=schema, source=source)
+            response = app.response_class(image_data, mimetype=TILE_FORMATS['svg'])
+            response.set_etag(key)
+            return response
+
+        image_data = render_cache.get(key)
+        if image_data is None:
+            environ = request.environ
+            image_data = render_png(sql_content, table_radius, field_radius, show_type, layout=layout,
+                                    cancel_check=lambda: client_disconnected(environ), format=output_format,
+                                    schema=schema, source=source)
+            render_cache.put(key, image_data)
+        
+        response = app.response_class(image_data, mimetype=TILE_FORMATS[output_format])
+        response.set_etag(key)
+        return response
+    
+    except Exception as e:
+        return render_error_response(e)
+
+@app.route('/cache-stats')
+def cache_stats():
+    return jsonify(render_cache.stats())
+
+@app.route('/render-stats')
+def render_stats():
+    return jsonify(render_scheduler.stats())
+
+@app.route('/ready')
+def ready():
+    """就绪检查：Graphviz 不可用、正在退出或渲染队列已满时返回 503，负载均衡据此摘除该实例"""
+    problems = readiness.problems()
+    render = render_scheduler.stats()
+    if render['queued'] >= render['queue_capacity']:
+        problems.append('渲染队列已满')
+    body = readiness.to_dict()
+    body['render'] = render
+    if problems:
+        body['error'] = '；'.join(problems)
+        return jsonify(body), 503
+    return jsonify(body)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus 文本格式的指标"""
+    return app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def read_live_options(form):
+    """读取实时预览的布局参数，表单中没有的参数保持不变；返回 (参数字典, 错误信息)"""
+    options = {}
+    try:
+        for name in ('table_radius', 'field_radius'):
+            if name in form:
+                options[name] = float(form[name])
+    except ValueError:
+        return None, '请输入有效的数值'
+    if 'show_type' in form:
+        options['show_type'] = form['show_type'] == 'true'
+    if 'layout' in form:
+        if form['layout'] not in LAYOUT_MODES:
+            return None, f"未知的布局方式: {form['layout']}"
+        options['layout'] = form['layout']
+    return options, None
+
+@app.route('/live', methods=['POST'])
+def create_live_session():
+    """打开实时预览会话，表单字段与 /generate 相同；之后从 events_url 接收图，向 delta_url 上传改动"""
+    if readiness.draining:
+        return jsonify({'error': '服务正在退出，请稍后重试'}), 503, {'Retry-After': '5'}
+    options, error = read_live_options(request.form)
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        session = live_sessions.create(options)
+    except LiveSessionLimit as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    version = session.replace(request.form.get('sql', ''))
+    return jsonify({
+        'session': session.id,
+        'version': version,
+        'events_url': url_for('live_events', session_id=session.id),
+        'delta_url': url_for('live_delta', session_id=session.id),
+    }), 201
+
+@app.route('/live/<session_id>/events')
+def live_events(session_id):
+    """SSE 事件流：reset 为完整快照，patch 为增量，closed 表示会话已结束（浏览器应重新打开会话）"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': '会话不存在或已过期'}), 404
+    return app.response_class(session.events(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/live/<session_id>/delta', methods=['POST'])
+def live_delta(session_id):
+    """上传改动：base 为浏览器所知的版本，把该版本文本的 [start, end) 替换为 text（下标按 UTF-16 码元计）；
+    也可以用 sql 字段上传全文。版本不一致时返回 409 和当前版本，浏览器应改为上传全文"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': '会话不存在或已过期'}), 404
+    options, error = read_live_options(request.form)
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        if 'sql' in request.form:
+            version = session.replace(request.form['sql'], options)
+        else:
+            version = session.apply(int(request.form['base']), int(request.form['start']),
+                                    int(request.form['end']), request.form.get('text', ''), options)
+    except VersionConflict as e:
+        return jsonify({'error': str(e), 'version': e.version}), 409
+    except KeyError as e:
+        return jsonify({'error': f'缺少参数: {e.args[0]}'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'version': version})
+
+@app.route('/live/<session_id>', methods=['DELETE'])
+def close_live_session(session_id):
+    if live_sessions.close(session_id) is None:
+        return jsonify({'error': '会话不存在或已过期'}), 404
+    return jsonify({'closed': session_id})
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    sql_content = request.form.get('sql', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    formats = [fmt.strip() for fmt in request.form.get('formats', 'png,drawio').split(',') if fmt.strip()]
+    layout = request.form.get('layout', 'circle')
+    
+    if readiness.draining:
+        return jsonify({'error': '服务正在退出，请稍后重试'}), 503, {'Retry-After': '5'}
     if not sql_content:
         return jsonify({'error': '请输入SQL语句'}), 400
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    unknown = [fmt for fmt in formats if fmt not in JOB_FORMATS]
+    if not formats or unknown:
+        return jsonify({'error': f"不支持的输出格式: {', '.join(unknown)}"}), 400
+    bundle = None
+    if 'zip' in formats:
+        bundle, error = read_bundle_options(request.form)
+        if error:
+            return jsonify({'error': error}), 400
 
     try:
-        generator = ERDiagramGenerator()
-        generator.parse_sql(sql_content, table_radius, field_radius, show_type)
+        job = job_manager.submit(formats, run_diagram_job, sql_content, table_radius, field_radius, show_type,
+                                 layout, bundle)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429, {'Retry-After': '5'}
+    status_url = url_for('job_status', job_id=job.id)
+    return jsonify({'job_id': job.id, 'status_url': status_url}), 202, {'Location': status_url}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    status = job.to_dict()
+    status['results'] = {fmt: url_for('job_result', job_id=job.id, fmt=fmt) for fmt in status['ready']}
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result/<fmt>')
+def job_result(job_id, fmt):
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    if fmt not in job.formats:
+        return jsonify({'error': f'任务未请求 {fmt} 格式'}), 404
+    artifact = job.artifact(fmt)
+    if artifact is None:
+        if job.finished:
+            return jsonify({'error': job.error or '结果不可用'}), 410
+        return jsonify({'error': '任务尚未完成', 'status': job.status}), 409
+    data, mimetype = artifact
+    if fmt == 'zip':
+        return send_file(io.BytesIO(data), mimetype=mimetype,
+                         as_attachment=True, download_name='er_tables.zip')
+    if fmt == 'drawio' and request.args.get('download') == 'true':
+        return send_file(io.BytesIO(data), mimetype=mimetype,
+                         as_attachment=True, download_name='er_diagram.drawio')
+    return app.response_class(data, mimetype=mimetype)
+
+@app.route('/export-drawio', methods=['POST'])
+def export_drawio():
+    sql_content = request.form.get('sql', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    # compressed=true 时 diagram 内容按 draw.io 的压缩格式（deflate + base64）输出
+    compressed = (request.args.get('compressed') or request.form.get('compressed')) == 'true'
+    
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+
+    try:
+        # 先解析，SQL错误仍以JSON返回；之后XML按块流式输出，不在内存中拼出整个文档
+        schema, source = read_uploaded_schema()
+        if schema is None:
+            if not sql_content:
+                return jsonify({'error': '请输入SQL语句'}), 400
+            source = sql_content
+        chunks = DrawioGenerator().iter_drawio(load_model(source, schema), table_radius, field_radius, show_type, layout,
+                                               compressed=compressed)
+        headers = {}
         
-        # 创建临时目录
-        temp_dir = tempfile.mkdtemp()
-        try:
-            # 使用完整的绝对路径
-            output_base = os.path.join(os.path.abspath(temp_dir), 'er_diagram')
-            
-            # 生成图片，graphviz会自动添加.png后缀
-            output_path = generator.generate(output_base)
-            
-            # 确保文件存在
-            if not os.path.exists(output_path):
-                raise Exception("生成的图片文件未找到")
-            
-            # 读取图片并返回
-            with open(output_path, 'rb') as f:
-                image_data = f.read()
-            
-            # 清理临时文件
-            try:
-                os.unlink(output_path)  # 删除.png文件
-                dot_file = f"{output_base}.dot"  # graphviz生成的dot文件
-                if os.path.exists(dot_file):
-                    os.unlink(dot_file)
-            finally:
-                os.rmdir(temp_dir)
-            
-            return send_file(
-                io.BytesIO(image_data),
-                mimetype='image/png',
-                as_attachment=False
-            )
-            
-        except Exception as e:
-            # 清理临时目录
-            if os.path.exists(temp_dir):
-                for file in os.listdir(temp_dir):
-                    os.unlink(os.path.join(temp_dir, file))
-                os.rmdir(temp_dir)
-            raise Exception(f"生成图片失败: {str(e)}")
+        # 检查是否需要下载文件
+        if request.args.get('download') == 'true':
+            headers['Content-Disposition'] = 'attachment; filename=er_diagram.drawio'
+        return app.response_class(chunks, mimetype='application/xml', headers=headers)
     
+    except (CatalogError, SQLParseError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/export-drawio', methods=['POST'])
-def export_drawio():
+@app.route('/tiles', methods=['POST'])
+def create_tiles():
+    """计算布局并返回分块信息，客户端随后按需请求可见区域的图块"""
     sql_content = request.form.get('sql', '')
     show_type = request.form.get('show_type') == 'true'
     table_radius = float(request.form.get('table_radius', 6))
     field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    tile_format = request.form.get('format', 'png')
     
     if not sql_content:
         return jsonify({'error': '请输入SQL语句'}), 400
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    if tile_format not in TILE_FORMATS:
+        return jsonify({'error': f'不支持的输出格式: {tile_format}'}), 400
+
+    try:
+        environ = request.environ
+        layout_id, layout_source, _ = load_layout(sql_content, table_radius, field_radius, show_type, layout,
+                                                  cancel_check=lambda: client_disconnected(environ))
+        grid = TileGrid.from_layout(layout_source)
+    except Exception as e:
+        return render_error_response(e)
+
+    info = grid.describe()
+    info['layout_id'] = layout_id
+    info['tile_url'] = f"{request.script_root}/tiles/{layout_id}/{{z}}/{{x}}/{{y}}.{tile_format}"
+    return jsonify(info)
+
+@app.route('/tiles/<layout_id>/<int:zoom>/<int:x>/<int:y>.<fmt>')
+def tile(layout_id, zoom, x, y, fmt):
+    if fmt not in TILE_FORMATS or not re.fullmatch(r'[0-9a-f]{64}', layout_id):
+        return jsonify({'error': '图块不存在'}), 404
+    layout_source = layout_store.get(layout_id)
+    if layout_source is None:
+        # 布局已被淘汰，客户端需要重新 POST /tiles
+        return jsonify({'error': '布局不存在或已过期'}), 404
+    layout_source = layout_source.decode('utf-8')
+    grid = TileGrid.from_layout(layout_source)
+    if not grid.contains(zoom, x, y):
+        return jsonify({'error': '图块不存在'}), 404
+
+    # 图块内容完全由布局ID和坐标决定，可以长期缓存
+    key = cache_key(layout_id, fmt, zoom=zoom, x=x, y=y)
+    if request.if_none_match.contains(key):
+        response = app.response_class(status=304)
+        response.set_etag(key)
+        return response
+    try:
+        data = render_cache.get(key)
+        if data is None:
+            environ = request.environ
+            data = render_source(layout_source, fmt, 'neato', grid.render_args(zoom, x, y),
+                                 cancel_check=lambda: client_disconnected(environ))
+            render_cache.put(key, data)
+    except Exception as e:
+        return render_error_response(e)
+    response = app.response_class(data, mimetype=TILE_FORMATS[fmt])
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response
+
+@app.route('/diff', methods=['POST'])
+def diff():
+    """比较新旧两版DDL
+
+    output=json（默认）返回新增、删除、修改的表和列；png/svg 返回高亮差异图；
+    drawio 返回新版本的 Draw.io 文件。后两者沿用旧版本的表位置，只为新增的表找位置。
+    """
+    old_sql = request.form.get('old_sql', '')
+    new_sql = request.form.get('new_sql', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    output = request.form.get('output', 'json')
+    
+    if not old_sql and not new_sql:
+        return jsonify({'error': '请输入SQL语句'}), 400
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    if output not in ('json', 'png', 'svg', 'drawio'):
+        return jsonify({'error': f'不支持的输出格式: {output}'}), 400
 
     try:
-        generator = DrawioGenerator()
-        xml_content = generator.generate_drawio(sql_content, table_radius, field_radius, show_type)
+        old_schema = load_sql(old_sql)
+        new_schema = load_sql(new_sql)
+        schema_diff = diff_schemas(old_schema, new_schema)
+        if output == 'json':
+            return jsonify(schema_diff.to_dict())
         
-        # 检查是否需要下载文件
-        if request.args.get('download') == 'true':
-            return send_file(
-                io.BytesIO(xml_content.encode('utf-8')),
-                mimetype='application/xml',
-                as_attachment=True,
-                download_name='er_diagram.drawio'
-            )
+        if output == 'drawio':
+            with timed('layout'):
+                positions = stable_layout(old_schema, new_schema, layout, *layout_scale(table_radius, field_radius))
+            chunks = DrawioGenerator().iter_drawio(new_schema, table_radius, field_radius, show_type, layout,
+                                                   positions=positions)
+            return app.response_class(chunks, mimetype='application/xml',
+                                      headers={'Content-Disposition': 'attachment; filename=er_diagram.drawio'})
+        
+        key = cache_key(f"{old_sql}\0{new_sql}", f"diff-{output}", show_type=show_type, layout=layout,
+                        table_radius=table_radius, field_radius=field_radius)
+        data = render_cache.get(key)
+        if data is None:
+            display_schema, highlight = diff_display_schema(old_schema, new_schema, schema_diff)
+            with timed('layout'):
+                positions = stable_layout(old_schema, new_schema, layout, table_radius, 2 * field_radius + 1)
+            generator = ERDiagramGenerator()
+            generator.load_schema(display_schema, table_radius, field_radius, show_type, layout,
+                                  positions=positions, highlight=highlight)
+            environ = request.environ
+            data = render_source(generator.dot.source, output, generator.dot.engine,
+                                 cancel_check=lambda: client_disconnected(environ))
+            render_cache.put(key, data)
+        response = app.response_class(data, mimetype=TILE_FORMATS[output])
+        response.set_etag(key)
+        return response
+    except Exception as e:
+        return render_error_response(e)
+
+def load_search_index(source, schema=None):
+    """返回 source 对应的检索索引，没有记住时解析 source（或使用给出的 schema）建立"""
+    def build():
+        indexed = schema if schema is not None else load_sql(source)
+        with timed('index'):
+            return SchemaIndex(indexed)
+    return search_indexes.get(source, build)
+
+@app.route('/search', methods=['POST'])
+def search():
+    """按表名、字段名、类型和注释检索，只画命中的表
+
+    q 为查询语句，例如 column:*_id type:int；depth>0 时子图同时包含命中的表 depth 层内的关联表。
+    output=json（默认）返回命中的表和字段；preview/svg/png/drawio 返回子图，其余参数同 /generate。
+    """
+    sql_content = request.form.get('sql', '')
+    query = request.form.get('q', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    output = request.form.get('output', 'json')
+
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    if output not in ('json', 'preview', 'png', 'svg', 'drawio'):
+        return jsonify({'error': f'不支持的输出格式: {output}'}), 400
+    try:
+        depth = int(request.form.get('depth', 0))
+    except ValueError:
+        return jsonify({'error': '关联深度必须是整数'}), 400
+
+    try:
+        schema, source = read_uploaded_schema()
+        if schema is None:
+            if not sql_content:
+                return jsonify({'error': '请输入SQL语句'}), 400
+            source = sql_content
+        index = load_search_index(source, schema)
+        with timed('search'):
+            result = index.search(query)
+    except (CatalogError, SQLParseError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    if output == 'json':
+        return jsonify(result.to_dict())
+    if not result.tables:
+        return jsonify({'error': '没有匹配的表'}), 404
+
+    subset = index.subgraph(result.tables, depth)
+    # 子图按命中的表区分缓存与布局：同一份输入、同样的命中结果共用一张图
+    subset_source = f"{source}\0search:{depth}\0" + '\0'.join(subset.table_names())
+    if output == 'drawio':
+        chunks = DrawioGenerator().iter_drawio(load_model(subset_source, subset), table_radius, field_radius,
+                                               show_type, layout)
+        return app.response_class(chunks, mimetype='application/xml',
+                                  headers={'Content-Disposition': 'attachment; filename=er_search.drawio'})
+
+    key = cache_key(subset_source, output, show_type=show_type, layout=layout,
+                    table_radius=table_radius, field_radius=field_radius)
+    if request.if_none_match.contains(key):
+        response = app.response_class(status=304)
+        response.set_etag(key)
+        return response
+    try:
+        if output == 'preview':
+            image_data = render_preview(subset_source, table_radius, field_radius, show_type, layout,
+                                        schema=subset, source=subset_source)
+            output = 'svg'
         else:
-            # 直接返回 XML 内容
-            return xml_content, 200, {'Content-Type': 'application/xml'}
+            image_data = render_cache.get(key)
+            if image_data is None:
+                environ = request.environ
+                image_data = render_png(subset_source, table_radius, field_radius, show_type, layout=layout,
+                                        cancel_check=lambda: client_disconnected(environ), format=output,
+                                        schema=subset, source=subset_source)
+                render_cache.put(key, image_data)
+        response = app.response_class(image_data, mimetype=TILE_FORMATS[output])
+        response.set_etag(key)
+        return response
+    except Exception as e:
+        return render_error_response(e)
+
+@app.route('/export-tables', methods=['POST'])
+def export_tables():
+    """每张表一张图，打包为zip下载；depth>0 时每张图同时包含 depth 层内的关联表"""
+    sql_content = request.form.get('sql', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
     
+    if not sql_content:
+        return jsonify({'error': '请输入SQL语句'}), 400
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    bundle, error = read_bundle_options(request.form)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # 压缩包先写入临时文件，较大时落到磁盘，不占用内存
+    archive = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    try:
+        schema = load_sql(sql_content)
+        environ = request.environ
+        build_table_bundle(archive, schema, bundle['formats'], table_radius, field_radius, show_type, layout,
+                           bundle['depth'], bundle['tables'], cancel_check=lambda: client_disconnected(environ))
+    except ValueError as e:
+        archive.close()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        archive.close()
+        return render_error_response(e)
+    archive.seek(0)
+    return send_file(archive, mimetype='application/zip', as_attachment=True, download_name='er_tables.zip')
+
+@app.route('/export-partitioned', methods=['POST'])
+def export_partitioned():
+    """把表结构分区后导出：format=drawio 时为多页 Draw.io 文件（第一页为总览），
+    png/svg 时为各分区的图片、总览图和 index.json 打包的zip"""
+    sql_content = request.form.get('sql', '')
+    show_type = request.form.get('show_type') == 'true'
+    table_radius = float(request.form.get('table_radius', 6))
+    field_radius = float(request.form.get('field_radius', 2))
+    layout = request.form.get('layout', 'circle')
+    compressed = request.form.get('compressed') == 'true'
+
+    if layout not in LAYOUT_MODES:
+        return jsonify({'error': f'未知的布局方式: {layout}'}), 400
+    options, error = read_partition_options(request.form)
+    if error:
+        return jsonify({'error': error}), 400
+
+    archive = None
+    try:
+        schema, _ = read_uploaded_schema()
+        if schema is None:
+            if not sql_content:
+                return jsonify({'error': '请输入SQL语句'}), 400
+            schema = load_sql(sql_content)
+        with timed('partition'):
+            partitions = partition_schema(schema, options['strategy'], options['max_tables'], options['max_nodes'])
+        metrics.registry.inc('partitions_total', len(partitions), strategy=options['strategy'])
+
+        if options['format'] == 'drawio':
+            # 逐页生成、流式输出，同一时间只有一个分区的布局在内存中
+            chunks = iter_partitioned_drawio(schema, partitions, table_radius, field_radius, show_type, layout,
+                                             compressed=compressed)
+            return app.response_class(chunks, mimetype='application/xml',
+                                      headers={'Content-Disposition': 'attachment; filename=er_partitions.drawio'})
+
+        # 压缩包先写入临时文件，较大时落到磁盘，不占用内存
+        archive = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+        environ = request.environ
+        build_partition_bundle(archive, schema, partitions, options['format'], table_radius, field_radius,
+                               show_type, layout, cancel_check=lambda: client_disconnected(environ))
+    except (CatalogError, SQLParseError, ValueError) as e:
+        if archive is not None:
+            archive.close()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        if archive is not None:
+            archive.close()
+        return render_error_response(e)
+    archive.seek(0)
+    return send_file(archive, mimetype='application/zip', as_attachment=True, download_name='er_partitions.zip')
 
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""SQLite 目录读取基准
+
+生成含 N 张表（随机外键、唯一索引）的 SQLite 数据库，比较 catalog.load_catalog
+（pragma 表值函数批量查询）与逐表执行 pragma 的耗时，并与导出 DDL 后再解析的方式对比。
+
+用法: python benchmarks/bench_catalog.py [--tables 500,5000] [--columns 10]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog  # noqa: E402
+from sql_parser import parse_schema  # noqa: E402
+
+
+def make_database(path, table_count, columns, seed=42):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    statements = []
+    for i in range(table_count):
+        cols = ["id INTEGER PRIMARY KEY"] + [f"col_{j} VARCHAR(32)" for j in range(columns)]
+        if i > 0:
+            cols.append(f"parent_id INTEGER REFERENCES t_{rng.randrange(i)}(id)")
+        statements.append(f"CREATE TABLE t_{i} ({', '.join(cols)});")
+        statements.append(f"CREATE UNIQUE INDEX ux_{i} ON t_{i}(col_0);")
+    connection.executescript('\n'.join(statements))
+    connection.commit()
+    connection.close()
+
+
+def per_table(path):
+    """逐表执行 pragma 的做法，作为对照"""
+    connection = sqlite3.connect(path)
+    count = 0
+    names = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for name in names:
+        count += len(connection.execute(f'PRAGMA table_info("{name}")').fetchall())
+        connection.execute(f'PRAGMA foreign_key_list("{name}")').fetchall()
+        for index in connection.execute(f'PRAGMA index_list("{name}")').fetchall():
+            connection.execute(f'PRAGMA index_info("{index[1]}")').fetchall()
+    connection.close()
+    return count
+
+
+def dump_and_parse(path):
+    connection = sqlite3.connect(path)
+    ddl = ';\n'.join(row[0] for row in connection.execute("SELECT sql FROM sqlite_master WHERE sql IS NOT NULL"))
+    connection.close()
+    return parse_schema(ddl + ';')
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='500,5000')
+    parser.add_argument('--columns', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'tables':>7} {'catalog(s)':>11} {'per-table(s)':>13} {'ddl+parse(s)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in [int(x) for x in args.tables.split(',')]:
+            path = os.path.join(tmp, f"bench_{count}.db")
+            make_database(path, count, args.columns)
+            schema = load_catalog(path)
+            assert len(schema) == count
+            print(f"{count:7d} {timed(load_catalog, path):11.3f} {timed(per_table, path):13.3f} "
+                  f"{timed(dump_and_parse, path):13.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""各方言解析吞吐量基准
+
+用 synthetic_schema 为每种方言生成相同规模的 DDL（附带 INSERT 数据），分别计时：
+  sniff     dialects.sniff_dialect（只检查开头 SNIFF_SIZE 个字符）
+  auto      parse_schema 自动识别方言
+  explicit  parse_schema 直接指定方言
+  chunked   SchemaParser 按 1MB 分块送入（与上传 SQL 文件时相同）
+并核对各方言解析出的表、字段、外键数量一致，识别出的方言与生成时的方言一致。
+
+用法: python benchmarks/bench_dialects.py [--tables 200,2000] [--insert-rows 20] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import DIALECTS, SchemaSpec, generate_ddl  # noqa: E402
+
+from dialects import sniff_dialect  # noqa: E402
+from sql_parser import SchemaParser, parse_schema  # noqa: E402
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_chunked(sql, dialect):
+    parser = SchemaParser(dialect=dialect)
+    for i in range(0, len(sql), CHUNK_SIZE):
+        parser.feed(sql[i:i + CHUNK_SIZE])
+    return parser.close()
+
+
+def best_of(repeat, func, *args):
+    """重复 repeat 次取最短耗时，返回 (秒, 最后一次的结果)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def summary(schema):
+    return (len(schema), sum(len(table.columns) for table in schema),
+            sum(len(table.foreign_keys) for table in schema))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='200,2000', help='逗号分隔的表数量')
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--fk-density', type=float, default=1.0)
+    parser.add_argument('--insert-rows', type=int, default=20, help='每张表附带的 INSERT 行数')
+    parser.add_argument('--dialects', default=','.join(DIALECTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'dialect':>10} {'tables':>7} {'MB':>7} {'sniff(ms)':>10} {'auto(s)':>8} {'explicit(s)':>12} "
+          f"{'chunked(s)':>11} {'MB/s':>7} {'tables/s':>9}")
+    for count in [int(x) for x in args.tables.split(',')]:
+        expected = None
+        for dialect in args.dialects.split(','):
+            sql = generate_ddl(SchemaSpec(count, args.columns, args.fk_density, dialect,
+                                          insert_rows=args.insert_rows))
+            size_mb = len(sql.encode('utf-8')) / 1024 / 1024
+            sniff_seconds, sniffed = best_of(args.repeat, sniff_dialect, sql)
+            if sniffed.name != dialect:
+                raise SystemExit(f"{dialect} 被识别为 {sniffed.name}")
+            auto_seconds, schema = best_of(args.repeat, parse_schema, sql)
+            explicit_seconds, _ = best_of(args.repeat, parse_schema, sql, dialect)
+            chunked_seconds, chunked = best_of(args.repeat, parse_chunked, sql, dialect)
+            counts = summary(schema)
+            if summary(chunked) != counts or (expected is not None and counts != expected):
+                raise SystemExit(f"{dialect} 解析结果不一致: {counts} / {summary(chunked)} / {expected}")
+            expected = counts
+            print(f"{dialect:>10} {count:7d} {size_mb:7.2f} {sniff_seconds * 1000:10.2f} {auto_seconds:8.3f} "
+                  f"{explicit_seconds:12.3f} {chunked_seconds:11.3f} {size_mb / explicit_seconds:7.2f} "
+                  f"{count / explicit_seconds:9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""draw.io 导出基准
+
+构造字段很多的 schema，分别计时完整生成（generate_from_schema）、逐块消费 iter_drawio
+（模拟流式响应，不保留整个文档）和压缩格式输出，并用 tracemalloc 记录峰值内存。
+
+用法: python benchmarks/bench_drawio.py [--columns 3000,30000] [--per-table 20]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drawio_writer import DrawioGenerator  # noqa: E402
+from sql_parser import Column, Schema, Table  # noqa: E402
+
+
+def make_schema(column_count, per_table):
+    schema = Schema()
+    for i in range(0, column_count, per_table):
+        table = Table(f"t_{i // per_table}")
+        for j in range(min(per_table, column_count - i)):
+            table.add_column(Column(f"c_{j}", 'VARCHAR(32)', 'VARCHAR(32) NOT NULL'))
+        schema.add_table(table)
+    return schema
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--columns', default='3000,30000')
+    parser.add_argument('--per-table', type=int, default=20)
+    args = parser.parse_args()
+
+    def full(schema):
+        return len(DrawioGenerator().generate_from_schema(schema, layout='grid', show_type=True))
+
+    def streamed(schema, compressed=False):
+        return sum(len(chunk) for chunk in DrawioGenerator().iter_drawio(
+            schema, layout='grid', show_type=True, compressed=compressed))
+
+    print(f"{'columns':>8} {'mode':>10} {'seconds':>9} {'peak MB':>9} {'chars':>11}")
+    for count in [int(x) for x in args.columns.split(',')]:
+        schema = make_schema(count, args.per_table)
+        for name, run in (('full', lambda: full(schema)),
+                          ('stream', lambda: streamed(schema)),
+                          ('compressed', lambda: streamed(schema, compressed=True))):
+            elapsed, peak, size = measure(run)
+            print(f"{count:8d} {name:>10} {elapsed:9.3f} {peak / 1e6:9.1f} {size:11d}")
+
+
+if __name__ == '__main__':
+    main()
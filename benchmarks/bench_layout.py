@@ -0,0 +1,80 @@
+"""布局算法基准
+
+对 100/1k/10k 张表的合成 schema（随机外键），以及同样数量、彼此没有关系的表和一条外键长链，
+分别计时 layout.compute_layout 的各种布局方式，并报告画布尺寸及其面积与 grid 布局之比。
+force 布局的面积超过 grid 的 --max-ratio 倍时退出码为 1（孤立的表、分开的几组表不应被斥力越推越远）。
+
+用法: python benchmarks/bench_layout.py [--tables 100,1000,10000] [--modes grid,force,hierarchical]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from layout import LAYOUT_MODES, compute_layout  # noqa: E402
+from sql_parser import parse_schema  # noqa: E402
+
+
+def make_sql(table_count, fk_per_table=1.5, seed=42):
+    rng = random.Random(seed)
+    statements = []
+    for i in range(table_count):
+        cols = ["  id INT PRIMARY KEY", "  name VARCHAR(50)"]
+        fks = []
+        if i > 0:
+            for j in range(int(fk_per_table) + (rng.random() < fk_per_table % 1)):
+                parent = rng.randrange(i)
+                cols.append(f"  ref_{j} INT")
+                fks.append(f"  FOREIGN KEY (ref_{j}) REFERENCES t_{parent}(id)")
+        statements.append(f"CREATE TABLE t_{i} (\n" + ",\n".join(cols + fks) + "\n);")
+    return "\n".join(statements)
+
+
+def make_chain_sql(table_count):
+    """每张表引用前一张表的一条长链"""
+    return "\n".join(f"CREATE TABLE t_{i} (id INT PRIMARY KEY" + (f", prev INT REFERENCES t_{i - 1}(id)" if i else "")
+                     + ");" for i in range(table_count))
+
+
+def canvas(positions):
+    xs = [x for x, _ in positions.values()]
+    ys = [y for _, y in positions.values()]
+    return max(xs) - min(xs), max(ys) - min(ys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='100,1000,10000')
+    parser.add_argument('--modes', default=','.join(LAYOUT_MODES))
+    parser.add_argument('--max-ratio', type=float, default=4.0, help="force 布局面积与 grid 之比的上限")
+    args = parser.parse_args()
+
+    modes = args.modes.split(',')
+    node_size = 5
+    failed = False
+    print(f"{'tables':>7} {'schema':>8} {'mode':>13} {'seconds':>9} {'width':>9} {'height':>9} {'vs grid':>8}")
+    for count in [int(x) for x in args.tables.split(',')]:
+        for kind, sql in (('random', make_sql(count)), ('isolated', make_sql(count, fk_per_table=0)),
+                          ('chain', make_chain_sql(count))):
+            schema = parse_schema(sql)
+            # 面积至少按一张表计，避免只有一行或一列时除以 0
+            grid_width, grid_height = canvas(compute_layout(schema, 'grid', table_radius=6, node_size=node_size))
+            grid_area = (grid_width + node_size) * (grid_height + node_size)
+            for mode in modes:
+                start = time.perf_counter()
+                positions = compute_layout(schema, mode, table_radius=6, node_size=node_size)
+                elapsed = time.perf_counter() - start
+                width, height = canvas(positions)
+                ratio = (width + node_size) * (height + node_size) / grid_area
+                print(f"{count:7d} {kind:>8} {mode:>13} {elapsed:9.3f} {width:9.1f} {height:9.1f} {ratio:8.1f}")
+                if mode == 'force' and ratio > args.max_ratio:
+                    print(f"  force 布局的面积超过 grid 的 {args.max_ratio:g} 倍")
+                    failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
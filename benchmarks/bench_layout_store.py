@@ -0,0 +1,77 @@
+"""布局存储基准
+
+对比三种情况下 render_png（管道渲染）的耗时：
+  cold    布局存储为空：neato 完整布局（重叠消除 + 样条布线）后再按布局绘制
+  warm    布局已保存：只以 neato -n2 绘制
+  toggle  只切换 show_type：沿用已保存的节点位置，neato -n2 重新布线后绘制
+需要本机安装 Graphviz（neato 可执行文件在 PATH 中）。
+
+用法: python benchmarks/bench_layout_store.py [--tables 20,100] [--repeat 3]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+import app  # noqa: E402
+from layout_store import LayoutStore  # noqa: E402
+
+
+def measure(repeat, func, reset=None):
+    samples = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='20,100', help='逗号分隔的表数量')
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--format', default='png', choices=['png', 'svg'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if shutil.which('neato') is None:
+        print("未找到 neato，请先安装 Graphviz")
+        return 1
+
+    def reset():
+        app.layout_store = LayoutStore()
+
+    print(f"{'tables':>7} {'cold p50(s)':>12} {'warm p50(s)':>12} {'toggle p50(s)':>14} {'speedup':>8}")
+    for count in [int(x) for x in args.tables.split(',')]:
+        sql = generate_ddl(SchemaSpec(count, args.columns))
+
+        def render(show_type=False):
+            app.render_png(sql, show_type=show_type, format=args.format)
+
+        cold = measure(args.repeat, render, reset)
+        reset()
+        render()
+        warm = measure(args.repeat, render)
+        samples = []
+        for _ in range(args.repeat):
+            # 存储中只有 show_type=False 的布局与节点位置，再渲染 show_type=True
+            reset()
+            render()
+            start = time.perf_counter()
+            render(show_type=True)
+            samples.append(time.perf_counter() - start)
+        print(f"{count:7d} {cold:12.4f} {warm:12.4f} {statistics.median(samples):14.4f} {cold / warm:8.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""实时预览增量更新基准
+
+对各规模的合成 schema 打开 live_preview 会话并连上事件流，在中间一张表里反复改一个字段名，
+计时每次改动（上传增量、增量解析、生成并排队 patch）的中位耗时。编辑已有的表时的开销应与表的总数基本无关，
+只剩拼接新文本的内存复制随文本长度增长。--target 为最大规模下每次改动的目标耗时（毫秒），超过时退出码为 1。
+
+用法: python benchmarks/bench_live.py [--tables 200,2000,8000] [--columns 8] [--edits 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+from live_preview import LiveSession  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='200,2000,8000', help='逗号分隔的表数量')
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--layout', default='grid')
+    parser.add_argument('--edits', type=int, default=20)
+    parser.add_argument('--target', type=float, default=20.0)
+    args = parser.parse_args()
+
+    counts = [int(x) for x in args.tables.split(',')]
+    print(f"{'tables':>7} {'chars':>9} {'open(ms)':>9} {'edit(ms)':>9} {'patches':>8}")
+    elapsed = None
+    for count in counts:
+        sql = generate_ddl(SchemaSpec(count, args.columns))
+        start = time.perf_counter()
+        session = LiveSession({'layout': args.layout})
+        session.replace(sql)
+        stream = session.events(heartbeat=0.01)
+        next(stream)  # 第一条事件是完整快照
+        opened = time.perf_counter() - start
+
+        # 来回改中间一张表的一个普通字段的名字，表的集合与关系都不变
+        original = 'col_1'
+        offset = sql.index(f'`{original}`', len(sql) // 2) + 1
+        samples = []
+        for i in range(args.edits):
+            replacement = original + 'x' if i % 2 == 0 else original
+            start = time.perf_counter()
+            session.apply(session.version, offset, offset + len(original) + (i % 2), replacement)
+            samples.append(time.perf_counter() - start)
+        patches = next(stream).count('event: patch')
+        session.close()
+        stream.close()
+        elapsed = statistics.median(samples) * 1000
+        print(f"{count:7d} {len(sql):9d} {opened * 1000:9.0f} {elapsed:9.2f} {patches:8d}")
+
+    if elapsed is not None and elapsed > args.target:
+        print(f"  {counts[-1]} 张表时每次改动超过目标 {args.target:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""DDL 解析性能基准
+
+生成不同大小的 mysqldump 风格 SQL（建表语句 + INSERT 数据），分别计时
+sql_parser.parse_schema 与旧版逐表正则扫描，验证新解析器耗时随输入线性增长。
+
+用法: python benchmarks/bench_parser.py [--sizes 1,2,4,8]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sql_parser import parse_schema  # noqa: E402
+
+
+def make_dump(target_mb, columns=12, rows_per_insert=20):
+    """生成约 target_mb MB 的 SQL 文本"""
+    parts = ['-- MySQL dump 10.13\n/*!40101 SET NAMES utf8mb4 */;\n']
+    size = 0
+    i = 0
+    target = target_mb * 1024 * 1024
+    while size < target:
+        cols = ["  `id` int(11) unsigned NOT NULL AUTO_INCREMENT"]
+        for j in range(columns):
+            cols.append(f"  `col_{j}` DECIMAL(10,2) DEFAULT NULL COMMENT 'c{j}; note'")
+        cols.append("  PRIMARY KEY (`id`)")
+        ddl = f"CREATE TABLE `table_{i}` (\n" + ",\n".join(cols) + "\n) ENGINE=InnoDB;\n"
+        values = ",".join(
+            "(" + ",".join(["%d" % r] + ["'v;%d'" % k for k in range(columns)]) + ")"
+            for r in range(rows_per_insert))
+        data = f"INSERT INTO `table_{i}` VALUES {values};\n"
+        parts.append(ddl)
+        parts.append(data)
+        size += len(ddl) + len(data)
+        i += 1
+    return ''.join(parts)
+
+
+def legacy_parse(sql_content):
+    """基线版本 parse_sql 中的正则扫描（每表两次 field_pattern）"""
+    table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\(([\s\S]*?)\);'
+    count = 0
+    for table in re.finditer(table_pattern, sql_content, re.IGNORECASE):
+        field_pattern = r'`?(\w+)`?\s+([^,\n]+)'
+        len(list(re.finditer(field_pattern, table.group(2))))
+        for field in re.finditer(field_pattern, table.group(2)):
+            count += 1
+    return count
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,2,4,8', help='逗号分隔的输入大小（MB）')
+    args = parser.parse_args()
+
+    print(f"{'MB':>6} {'tables':>8} {'parser(s)':>10} {'MB/s':>8} {'s/MB':>8} {'legacy(s)':>10}")
+    for mb in [float(x) for x in args.sizes.split(',')]:
+        sql = make_dump(mb)
+        actual_mb = len(sql.encode('utf-8')) / 1024 / 1024
+        elapsed, schema = timed(parse_schema, sql)
+        legacy_elapsed, _ = timed(legacy_parse, sql)
+        print(f"{actual_mb:6.1f} {len(schema):8d} {elapsed:10.3f} {actual_mb / elapsed:8.1f} "
+              f"{elapsed / actual_mb:8.3f} {legacy_elapsed:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
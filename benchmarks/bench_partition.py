@@ -0,0 +1,80 @@
+"""分区渲染基准
+
+对合成 schema（默认 3000 张表）按三种分区方式计时 partition.partition_schema，报告分区数、最大分区的表数
+与节点数以及跨分区的关系数；再比较整张图的 Draw.io 生成与分区后多页 Draw.io 生成的耗时和峰值内存
+（tracemalloc，输出逐块丢弃）。分区耗时超过 --target 毫秒或有分区超出上限时退出码为 1。
+
+用法: python benchmarks/bench_partition.py [--tables 3000] [--columns 8] [--max-tables 150]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+from drawio_writer import DrawioGenerator  # noqa: E402
+from partition import (DEFAULT_MAX_NODES, PARTITION_STRATEGIES, cross_links, iter_partitioned_drawio,  # noqa: E402
+                       partition_schema)
+from sql_parser import parse_schema  # noqa: E402
+
+
+def consume(make_chunks):
+    """生成并丢弃全部输出，返回 (耗时秒数, 峰值内存字节数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in make_chunks():
+        pass
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, default=3000)
+    parser.add_argument('--columns', type=int, default=8)
+    parser.add_argument('--max-tables', type=int, default=150)
+    parser.add_argument('--max-nodes', type=int, default=DEFAULT_MAX_NODES)
+    parser.add_argument('--layout', default='grid')
+    parser.add_argument('--target', type=float, default=200.0)
+    args = parser.parse_args()
+
+    schema = parse_schema(generate_ddl(SchemaSpec(args.tables, args.columns)))
+    print(f"{len(schema)} 张表，{len(schema.relationships())} 个关系")
+
+    failed = False
+    print(f"{'strategy':<12} {'parts':>6} {'max tables':>11} {'max nodes':>10} {'cross':>7} {'ms':>8}")
+    for strategy in PARTITION_STRATEGIES:
+        start = time.perf_counter()
+        partitions = partition_schema(schema, strategy, args.max_tables, args.max_nodes)
+        elapsed = (time.perf_counter() - start) * 1000
+        links = sum(cross_links(schema, partitions).values())
+        largest = max(len(partition) for partition in partitions)
+        nodes = max(partition.nodes for partition in partitions)
+        print(f"{strategy:<12} {len(partitions):6d} {largest:11d} {nodes:10d} {links:7d} {elapsed:8.1f}")
+        covered = sum(len(partition) for partition in partitions)
+        # 单张表本身超过节点上限时只能独占一区
+        if covered != len(schema) or largest > args.max_tables or (nodes > args.max_nodes and largest > 1):
+            print("  分区没有覆盖全部表或超出上限")
+            failed = True
+        if elapsed > args.target:
+            print(f"  超过目标 {args.target:.0f}ms")
+            failed = True
+
+    partitions = partition_schema(schema, 'components', args.max_tables, args.max_nodes)
+    whole = consume(lambda: DrawioGenerator().iter_drawio(schema, layout=args.layout))
+    paged = consume(lambda: iter_partitioned_drawio(schema, partitions, layout=args.layout))
+    print(f"{'drawio':<12} {'seconds':>8} {'peak MB':>8}")
+    for label, (elapsed, peak) in (('whole', whole), ('partitioned', paged)):
+        print(f"{label:<12} {elapsed:8.2f} {peak / 1024 / 1024:8.1f}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""快速预览基准
+
+对各规模的合成 schema 计时 svg_writer 的快速预览（布局已在模型中算好，只计生成 SVG 的时间）
+与 Graphviz 渲染 SVG（neato 完整布局 + 绘制，不经过布局存储），后者需要本机安装 Graphviz，
+未安装时跳过。--target 为快速预览在 500 张表时的目标耗时（毫秒），超过时退出码为 1。
+
+用法: python benchmarks/bench_preview.py [--tables 100,500,2000] [--columns 12] [--show-type]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+from diagram_model import DiagramModel  # noqa: E402
+from graphviz_writer import ERDiagramGenerator  # noqa: E402
+from sql_parser import parse_schema  # noqa: E402
+from svg_writer import SvgGenerator, build_scene  # noqa: E402
+
+
+def measure(repeat, func):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='100,500,2000', help='逗号分隔的表数量')
+    parser.add_argument('--columns', type=int, default=12)
+    parser.add_argument('--layout', default='grid')
+    parser.add_argument('--show-type', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target', type=float, default=50.0)
+    args = parser.parse_args()
+
+    graphviz = shutil.which('neato') is not None
+    if not graphviz:
+        print("未找到 neato，只计时快速预览")
+
+    failed = False
+    print(f"{'tables':>7} {'fields':>7} {'scene(ms)':>10} {'svg(ms)':>9} {'size(KB)':>9} {'graphviz(ms)':>13}")
+    for count in [int(x) for x in args.tables.split(',')]:
+        model = DiagramModel.from_schema(parse_schema(generate_ddl(SchemaSpec(count, args.columns))))
+        model.layout(args.layout, 6, node_size=5)
+        size = len(SvgGenerator().generate_from_schema(model, show_type=args.show_type, layout=args.layout))
+        scene = measure(args.repeat, lambda: build_scene(model, show_type=args.show_type, layout=args.layout))
+        svg = measure(args.repeat, lambda: SvgGenerator().generate_from_schema(
+            model, show_type=args.show_type, layout=args.layout))
+        native = '-'
+        if graphviz:
+            def render():
+                generator = ERDiagramGenerator()
+                generator.load_schema(model, show_type=args.show_type, layout=args.layout)
+                generator.pipe('svg')
+            native = f"{measure(1, render) * 1000:.0f}"
+        print(f"{count:7d} {len(model.column_names):7d} {scene * 1000:10.1f} {svg * 1000:9.1f} "
+              f"{size / 1024:9.0f} {native:>13}")
+        if count == 500 and svg * 1000 > args.target:
+            print(f"  500 张表的快速预览超过目标 {args.target:.0f}ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Graphviz 渲染路径基准
+
+对比 ERDiagramGenerator 的管道渲染（pipe）与临时文件渲染（file）两种方式的耗时。
+需要本机安装 Graphviz（neato 可执行文件在 PATH 中）。
+
+用法: python benchmarks/bench_render.py [--tables 5,20,50] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import render_png  # noqa: E402
+
+
+def make_schema(table_count, columns=6):
+    statements = []
+    for i in range(table_count):
+        cols = [f"    id_{i} INT PRIMARY KEY"]
+        cols += [f"    字段_{i}_{j} VARCHAR(100)" for j in range(columns)]
+        statements.append(f"CREATE TABLE 表_{i} (\n" + ",\n".join(cols) + "\n);")
+    return "\n\n".join(statements)
+
+
+def measure(sql, mode, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render_png(sql, mode=mode)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='5,20,50', help='逗号分隔的表数量')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if shutil.which('neato') is None:
+        print("未找到 neato，请先安装 Graphviz")
+        return 1
+
+    print(f"{'tables':>7} {'pipe p50(s)':>12} {'file p50(s)':>12} {'speedup':>8}")
+    for count in [int(x) for x in args.tables.split(',')]:
+        sql = make_schema(count)
+        render_png(sql, mode='pipe')  # 预热
+        pipe_p50, _ = measure(sql, 'pipe', args.repeat)
+        file_p50, _ = measure(sql, 'file', args.repeat)
+        print(f"{count:7d} {pipe_p50:12.4f} {file_p50:12.4f} {file_p50 / pipe_p50:8.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""检索索引基准
+
+对合成 schema（默认约 5 万个字段，三成中文名）计时建立 schema_index.SchemaIndex 的耗时，
+以及一组典型查询的耗时与命中数。--target 为选择性查询（命中不超过一成的表）的目标耗时（毫秒），
+超过时退出码为 1；命中几乎所有表的查询耗时主要花在列出命中的字段上，只打印不检查。
+
+用法: python benchmarks/bench_search.py [--tables 4200] [--columns 12] [--unicode 0.3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+from schema_index import SchemaIndex  # noqa: E402
+from sql_parser import parse_schema  # noqa: E402
+
+QUERIES = (
+    '客户',
+    '编号',
+    'table:订单*',
+    'table:table_1?? column:col_?',
+    'table:客户* type:int*',
+    'column:*_id type:int*',
+    'column:col_1*',
+    'type:varchar',
+    'id',
+)
+
+
+def measure(repeat, func):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, default=4200)
+    parser.add_argument('--columns', type=int, default=12)
+    parser.add_argument('--unicode', type=float, default=0.3, help='中文表名、字段名所占比例')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--target', type=float, default=5.0)
+    args = parser.parse_args()
+
+    schema = parse_schema(generate_ddl(SchemaSpec(args.tables, args.columns, unicode_ratio=args.unicode)))
+    build = measure(1, lambda: SchemaIndex(schema))
+    index = SchemaIndex(schema)
+    print(f"{len(index.table_names)} 张表，{len(index.column_names)} 个字段；建立索引 {build * 1000:.0f}ms")
+
+    failed = False
+    print(f"{'query':<32} {'tables':>7} {'columns':>8} {'ms':>8}")
+    for query in QUERIES:
+        result = index.search(query)
+        elapsed = measure(args.repeat, lambda: index.search(query)) * 1000
+        columns = sum(len(names) for names in result.columns.values())
+        print(f"{query:<32} {len(result):7d} {columns:8d} {elapsed:8.2f}")
+        if len(result) * 10 <= len(index.table_names) and elapsed > args.target:
+            print(f"  选择性查询超过目标 {args.target:.0f}ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
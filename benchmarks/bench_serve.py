@@ -0,0 +1,116 @@
+"""HTTP 负载测试
+
+对一个正在运行的服务（例如 `gunicorn` 启动的生产部署）以固定并发持续发送请求，
+报告吞吐量、延迟分位数和各状态码数量。每个客户端线程复用一条 keep-alive 连接。
+场景：
+  ready     GET /ready
+  drawio    POST /export-drawio（纯 Python 生成，不经过 Graphviz）
+  generate  POST /generate，SQL 固定，第一次之后命中渲染缓存
+  render    POST /generate，每个请求的表间距不同，都要经过 neato 绘制（需要 Graphviz）
+
+用法: python benchmarks/bench_serve.py [--url http://127.0.0.1:8000] [--scenarios ready,drawio]
+      [--concurrency 16] [--duration 10] [--tables 50]
+"""
+import argparse
+import http.client
+import itertools
+import os
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import SchemaSpec, generate_ddl  # noqa: E402
+
+SCENARIOS = ('ready', 'drawio', 'generate', 'render')
+
+
+def build_requests(scenario, sql):
+    """返回生成 (方法, 路径, 表单) 的无限迭代器"""
+    if scenario == 'ready':
+        return itertools.repeat(('GET', '/ready', None))
+    if scenario == 'drawio':
+        return itertools.repeat(('POST', '/export-drawio', {'sql': sql}))
+    if scenario == 'generate':
+        return itertools.repeat(('POST', '/generate', {'sql': sql}))
+    return (('POST', '/generate', {'sql': sql, 'table_radius': 6 + i / 1000}) for i in itertools.count())
+
+
+def run(url, scenario, sql, concurrency, duration):
+    parts = urlsplit(url)
+    requests = build_requests(scenario, sql)
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+        while time.perf_counter() < deadline:
+            with lock:
+                method, path, form = next(requests)
+            body = urlencode(form) if form is not None else None
+            headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form is not None else {}
+            start = time.perf_counter()
+            try:
+                connection.request(method, parts.path.rstrip('/') + path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / wall,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0,
+        'statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenarios', default='ready,drawio,generate')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--tables', type=int, default=50, help='drawio/generate/render 场景的表数量')
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"未知的场景: {', '.join(unknown)}")
+    sql = generate_ddl(SchemaSpec(args.tables))
+
+    print(f"{'scenario':>9} {'requests':>9} {'req/s':>9} {'p50(ms)':>9} {'p99(ms)':>9}  statuses")
+    for scenario in scenarios:
+        result = run(args.url, scenario, sql, args.concurrency, args.duration)
+        statuses = ' '.join(f"{status}:{count}" for status, count in sorted(result['statuses'].items(),
+                                                                             key=lambda item: str(item[0])))
+        print(f"{scenario:>9} {result['requests']:9d} {result['rps']:9.1f} {result['p50'] * 1000:9.1f} "
+              f"{result['p99'] * 1000:9.1f}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
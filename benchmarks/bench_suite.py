@@ -0,0 +1,212 @@
+"""综合性能基准与回归比较
+
+用 synthetic_schema 生成各规模、各方言的 DDL，分别计时：
+  parse   sql_parser.parse_schema
+  layout  layout.compute_layout
+  dot     ERDiagramGenerator.load_schema（由 schema 生成 DOT，不含 Graphviz 渲染）
+  drawio  DrawioGenerator.generate_from_schema
+  svg     SvgGenerator.generate_from_schema（快速预览，不经过 Graphviz）
+  index   schema_index.SchemaIndex（建立检索用的倒排索引）
+  route_generate       经 Flask 测试客户端请求 /generate（需要 Graphviz，未安装时跳过）
+  route_export_drawio  经 Flask 测试客户端请求 /export-drawio
+每项重复 --repeat 次，报告 p50/p99 耗时、吞吐量（表/秒、MB/秒），再单独运行一次用
+tracemalloc 记录峰值内存。结果写成 JSON；--compare 指定以前的结果文件时逐项对比，
+p50 变慢超过 --threshold 的项目视为回归，退出码为 1。
+
+用法: python benchmarks/bench_suite.py [--tables 50,500] [--dialects mysql,postgres]
+                                      [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_schema import DIALECTS, SchemaSpec, generate_ddl  # noqa: E402
+
+from app import app  # noqa: E402
+from graphviz_writer import ERDiagramGenerator  # noqa: E402
+from drawio_writer import DrawioGenerator  # noqa: E402
+from layout import compute_layout  # noqa: E402
+from schema_index import SchemaIndex  # noqa: E402
+from svg_writer import SvgGenerator  # noqa: E402
+from sql_parser import parse_schema  # noqa: E402
+
+CASES = ('parse', 'layout', 'dot', 'drawio', 'svg', 'index', 'route_generate', 'route_export_drawio')
+
+
+def percentile(samples, fraction):
+    """最近秩法百分位数"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def post(client, path, data):
+    response = client.post(path, data=data)
+    # 流式响应需要读完正文才算完成
+    body = response.get_data()
+    if response.status_code != 200:
+        raise RuntimeError(f"{path} 返回 {response.status_code}: {body[:200]!r}")
+    return len(body)
+
+
+def make_cases(sql, options, client):
+    """返回 {项目名: 可重复调用的函数}；每次调用的输入相同，路由请求通过追加注释绕开渲染缓存"""
+    schema = parse_schema(sql)
+    layout_mode = options['layout']
+    counter = iter(range(1 << 30))
+
+    def form():
+        return {'sql': f"{sql}\n-- run {next(counter)}", 'layout': layout_mode,
+                'table_radius': options['table_radius'], 'field_radius': options['field_radius']}
+
+    return {
+        'parse': lambda: parse_schema(sql),
+        'layout': lambda: compute_layout(schema, layout_mode, options['table_radius'],
+                                         node_size=2 * options['field_radius'] + 1),
+        'dot': lambda: ERDiagramGenerator().load_schema(schema, options['table_radius'], options['field_radius'],
+                                                        layout=layout_mode),
+        'drawio': lambda: DrawioGenerator().generate_from_schema(schema, options['table_radius'],
+                                                                 options['field_radius'], layout=layout_mode),
+        'svg': lambda: SvgGenerator().generate_from_schema(schema, options['table_radius'], options['field_radius'],
+                                                           layout=layout_mode),
+        'index': lambda: SchemaIndex(schema),
+        'route_generate': lambda: post(client, '/generate', form()),
+        'route_export_drawio': lambda: post(client, '/export-drawio', form()),
+    }
+
+
+def measure(run, repeat):
+    run()  # 预热
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return samples, peak
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """打印与基线的对比，返回回归的项目数；两次 p50 都低于 min_seconds 的项目受噪声影响大，不判定回归"""
+    previous = {(r['case'], r['dialect'], r['tables']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\n对比 {baseline['meta'].get('revision') or '-'} ({baseline['meta'].get('timestamp')})")
+    print(f"{'case':>20} {'dialect':>9} {'tables':>7} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for result in results:
+        base = previous.get((result['case'], result['dialect'], result['tables']))
+        if base is None:
+            continue
+        change = result['p50'] / base['p50'] - 1 if base['p50'] else 0.0
+        flag = ''
+        if change > threshold and result['p50'] >= min_seconds:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{result['case']:>20} {result['dialect']:>9} {result['tables']:7d} {base['p50']:10.4f} "
+              f"{result['p50']:10.4f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', default='50,500', help='逗号分隔的表数量')
+    parser.add_argument('--columns', type=int, default=10, help='每张表的字段数')
+    parser.add_argument('--fk-density', type=float, default=1.0, help='每张表平均外键数')
+    parser.add_argument('--unicode', type=float, default=0.2, help='中文表名/字段名比例')
+    parser.add_argument('--dialects', default=','.join(DIALECTS))
+    parser.add_argument('--cases', default=','.join(CASES))
+    parser.add_argument('--layout', default='grid', help='布局方式（默认 grid）')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='结果 JSON 路径（默认 benchmarks/results/<时间>-<提交>.json）')
+    parser.add_argument('--compare', help='作为基线的结果 JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='p50 变慢超过该比例视为回归（默认 0.2）')
+    parser.add_argument('--min-seconds', type=float, default=0.005, help='p50 低于该值的项目不判定回归')
+    args = parser.parse_args()
+
+    cases = [case for case in args.cases.split(',') if case]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"未知的项目: {', '.join(unknown)}")
+    if 'route_generate' in cases and shutil.which('neato') is None:
+        print("未找到 Graphviz（neato），跳过 route_generate", file=sys.stderr)
+        cases.remove('route_generate')
+
+    options = {'layout': args.layout, 'table_radius': 6, 'field_radius': 2}
+    client = app.test_client()
+    results = []
+    print(f"{'case':>20} {'dialect':>9} {'tables':>7} {'p50(s)':>9} {'p99(s)':>9} {'tables/s':>10} "
+          f"{'MB/s':>8} {'peak MB':>8}")
+    for dialect in args.dialects.split(','):
+        for table_count in [int(x) for x in args.tables.split(',')]:
+            spec = SchemaSpec(table_count, args.columns, args.fk_density, dialect, args.unicode, seed=args.seed)
+            sql = generate_ddl(spec)
+            size_mb = len(sql.encode('utf-8')) / 1024 / 1024
+            runs = make_cases(sql, options, client)
+            for case in cases:
+                samples, peak = measure(runs[case], args.repeat)
+                p50 = percentile(samples, 0.5)
+                result = {
+                    'case': case, 'dialect': dialect, 'tables': table_count, 'columns': args.columns,
+                    'input_bytes': len(sql.encode('utf-8')), 'repeat': args.repeat,
+                    'p50': p50, 'p99': percentile(samples, 0.99), 'min': min(samples),
+                    'mean': sum(samples) / len(samples),
+                    'tables_per_second': table_count / p50 if p50 else None,
+                    'mb_per_second': size_mb / p50 if p50 else None,
+                    'peak_bytes': peak,
+                }
+                results.append(result)
+                print(f"{case:>20} {dialect:>9} {table_count:7d} {p50:9.4f} {result['p99']:9.4f} "
+                      f"{result['tables_per_second'] or 0:10.0f} {result['mb_per_second'] or 0:8.2f} "
+                      f"{peak / 1e6:8.1f}")
+
+    revision = git_revision()
+    report = {
+        'meta': {
+            'revision': revision,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'options': {**vars(args), 'cases': cases},
+        },
+        'results': results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(os.path.join(ROOT, 'benchmarks', 'results'), exist_ok=True)
+        output = os.path.join(ROOT, 'benchmarks', 'results',
+                              f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{revision or 'unknown'}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_seconds):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
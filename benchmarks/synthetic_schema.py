@@ -0,0 +1,203 @@
+"""合成 DDL 生成器
+
+按表数量、每表字段数、外键密度生成可复现的建表语句，供各基准脚本使用。
+支持 MySQL（反引号、ENGINE/COMMENT 表选项、KEY 索引、条件注释）、PostgreSQL
+（双引号、schema 限定名、IF NOT EXISTS、数组与带时区类型、$$ 函数体、COMMENT ON）、
+SQLite（.dump 格式，AUTOINCREMENT、列级 REFERENCES、CREATE INDEX）与 SQL Server
+（SSMS 生成脚本格式，[方括号] 标识符、GO 分隔、IDENTITY、ALTER TABLE ... ADD CONSTRAINT 外键）
+四种写法，并可按比例混入中文表名和字段名。相同参数与 seed 总是得到相同的文本。
+
+用法: python benchmarks/synthetic_schema.py --tables 20 --dialect postgres > sample.sql
+"""
+import argparse
+import random
+import sys
+
+DIALECTS = ('mysql', 'postgres', 'sqlite', 'sqlserver')
+
+_MYSQL_TYPES = ('int(11)', 'bigint(20) unsigned', 'varchar(64)', 'decimal(10,2)', 'datetime', 'tinyint(1)',
+                "enum('a','b','c')", 'text')
+_POSTGRES_TYPES = ('integer', 'bigint', 'varchar(64)', 'numeric(10,2)', 'timestamp with time zone', 'boolean',
+                   'text[]', 'jsonb')
+_SQLITE_TYPES = ('INTEGER', 'TEXT', 'REAL', 'BLOB', 'NUMERIC(10,2)', 'VARCHAR(64)', 'DATETIME', 'BOOLEAN')
+_SQLSERVER_TYPES = ('[int]', '[bigint]', '[nvarchar](64)', '[decimal](10, 2)', '[datetime2](7)', '[bit]',
+                    '[uniqueidentifier]', '[nvarchar](max)')
+_UNICODE_TABLES = ('客户', '订单', '产品', '库存', '供应商', '员工', '部门', '账户')
+_UNICODE_COLUMNS = ('名称', '编号', '地址', '电话', '金额', '日期', '状态', '备注')
+
+
+class SchemaSpec:
+    """生成参数
+
+    fk_density 为每张表平均引用的父表数（可以是小数，按概率取整）；
+    unicode_ratio 为使用中文名的表和字段所占比例；insert_rows 为每张表附带的 INSERT 行数。
+    """
+
+    def __init__(self, tables=100, columns=10, fk_density=1.0, dialect='mysql', unicode_ratio=0.0,
+                 insert_rows=0, seed=42):
+        if dialect not in DIALECTS:
+            raise ValueError(f"未知的方言: {dialect}")
+        self.tables = tables
+        self.columns = columns
+        self.fk_density = fk_density
+        self.dialect = dialect
+        self.unicode_ratio = unicode_ratio
+        self.insert_rows = insert_rows
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _quote(name, dialect):
+    if dialect == 'mysql':
+        return '`' + name.replace('`', '``') + '`'
+    if dialect == 'sqlserver':
+        return '[' + name.replace(']', ']]') + ']'
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_name(i, rng, spec):
+    if rng.random() < spec.unicode_ratio:
+        return f"{_UNICODE_TABLES[i % len(_UNICODE_TABLES)]}表_{i}"
+    return f"table_{i}"
+
+
+def _column_name(j, rng, spec):
+    if rng.random() < spec.unicode_ratio:
+        return f"{_UNICODE_COLUMNS[j % len(_UNICODE_COLUMNS)]}_{j}"
+    return f"col_{j}"
+
+
+def _mysql_table(name, columns, parents, rng):
+    q = lambda ident: _quote(ident, 'mysql')  # noqa: E731
+    lines = [f"  {q('id')} int(11) unsigned NOT NULL AUTO_INCREMENT"]
+    for column in columns:
+        lines.append(f"  {q(column)} {rng.choice(_MYSQL_TYPES)} DEFAULT NULL COMMENT '{column}; 说明'")
+    for parent in parents:
+        lines.append(f"  {q(f'{parent}_id')} int(11) unsigned NOT NULL")
+    lines.append(f"  PRIMARY KEY ({q('id')}) USING BTREE")
+    for k, parent in enumerate(parents):
+        lines.append(f"  KEY {q(f'idx_{name}_{k}')} ({q(f'{parent}_id')})")
+        lines.append(f"  CONSTRAINT {q(f'fk_{name}_{k}')} FOREIGN KEY ({q(f'{parent}_id')}) "
+                     f"REFERENCES {q(parent)} ({q('id')}) ON DELETE CASCADE")
+    return (f"DROP TABLE IF EXISTS {q(name)};\n"
+            f"/*!40101 SET @saved_cs_client = @@character_set_client */;\n"
+            f"CREATE TABLE {q(name)} (\n" + ",\n".join(lines) +
+            f"\n) ENGINE=InnoDB AUTO_INCREMENT=1 DEFAULT CHARSET=utf8mb4 COMMENT='{name}';\n")
+
+
+def _postgres_table(name, columns, parents, rng):
+    q = lambda ident: _quote(ident, 'postgres')  # noqa: E731
+    lines = [f"  {q('id')} serial PRIMARY KEY"]
+    for column in columns:
+        lines.append(f"  {q(column)} {rng.choice(_POSTGRES_TYPES)} DEFAULT NULL")
+    for parent in parents:
+        lines.append(f"  {q(f'{parent}_id')} integer NOT NULL REFERENCES public.{q(parent)} ({q('id')})")
+    return (f"CREATE TABLE IF NOT EXISTS public.{q(name)} (\n" + ",\n".join(lines) + "\n);\n"
+            f"COMMENT ON TABLE public.{q(name)} IS '{name}; 说明';\n")
+
+
+def _sqlite_table(name, columns, parents, rng):
+    q = lambda ident: _quote(ident, 'sqlite')  # noqa: E731
+    lines = [f"  {q('id')} INTEGER PRIMARY KEY AUTOINCREMENT"]
+    for column in columns:
+        lines.append(f"  {q(column)} {rng.choice(_SQLITE_TYPES)} DEFAULT NULL")
+    for parent in parents:
+        lines.append(f"  {q(f'{parent}_id')} INTEGER NOT NULL REFERENCES {q(parent)} ({q('id')}) ON DELETE CASCADE")
+    ddl = f"CREATE TABLE {q(name)} (\n" + ",\n".join(lines) + "\n);\n"
+    for k, parent in enumerate(parents):
+        ddl += f"CREATE INDEX {q(f'idx_{name}_{k}')} ON {q(name)} ({q(f'{parent}_id')});\n"
+    return ddl
+
+
+def _sqlserver_table(name, columns, parents, rng):
+    q = lambda ident: _quote(ident, 'sqlserver')  # noqa: E731
+    lines = [f"\t{q('id')} [int] IDENTITY(1,1) NOT NULL"]
+    for column in columns:
+        lines.append(f"\t{q(column)} {rng.choice(_SQLSERVER_TYPES)} NULL")
+    for parent in parents:
+        lines.append(f"\t{q(f'{parent}_id')} [int] NOT NULL")
+    lines.append(f" CONSTRAINT {q(f'PK_{name}')} PRIMARY KEY CLUSTERED \n(\n\t{q('id')} ASC\n)"
+                 "WITH (PAD_INDEX = OFF, STATISTICS_NORECOMPUTE = OFF, IGNORE_DUP_KEY = OFF) ON [PRIMARY]")
+    return (f"SET ANSI_NULLS ON\nGO\nSET QUOTED_IDENTIFIER ON\nGO\n"
+            f"CREATE TABLE [dbo].{q(name)}(\n" + ",\n".join(lines) + "\n) ON [PRIMARY]\nGO\n")
+
+
+def _sqlserver_foreign_keys(name, parents):
+    """SSMS 把外键放在全部建表语句之后，用 ALTER TABLE 添加"""
+    q = lambda ident: _quote(ident, 'sqlserver')  # noqa: E731
+    parts = []
+    for k, parent in enumerate(parents):
+        constraint = q(f'FK_{name}_{k}')
+        parts.append(f"ALTER TABLE [dbo].{q(name)}  WITH CHECK ADD  CONSTRAINT {constraint} "
+                     f"FOREIGN KEY({q(f'{parent}_id')})\nREFERENCES [dbo].{q(parent)} ({q('id')})\nGO\n"
+                     f"ALTER TABLE [dbo].{q(name)} CHECK CONSTRAINT {constraint}\nGO\n")
+    return ''.join(parts)
+
+
+def _insert(name, column_count, rows, dialect):
+    prefix = 'N' if dialect == 'sqlserver' else ''
+    values = ",".join("(" + ",".join([str(r)] + [f"{prefix}'v;{r}-{k}'" for k in range(column_count)]) + ")"
+                      for r in range(rows))
+    if dialect == 'sqlserver':
+        return f"INSERT INTO [dbo].{_quote(name, dialect)} VALUES {values}\nGO\n"
+    return f"INSERT INTO {_quote(name, dialect)} VALUES {values};\n"
+
+
+def generate_ddl(spec):
+    """按 spec 生成完整的 SQL 文本"""
+    rng = random.Random(spec.seed)
+    tail = []  # 放在全部建表语句之后的内容
+    footer = ''
+    if spec.dialect == 'mysql':
+        parts = ["-- MySQL dump 10.13\n/*!40101 SET NAMES utf8mb4 */;\nSET FOREIGN_KEY_CHECKS=0;\n"]
+    elif spec.dialect == 'sqlite':
+        parts = ["PRAGMA foreign_keys=OFF;\nBEGIN TRANSACTION;\n"]
+        footer = "COMMIT;\n"
+    elif spec.dialect == 'sqlserver':
+        parts = ["USE [sample]\nGO\n"]
+    else:
+        parts = ["-- PostgreSQL database dump\nSET client_encoding = 'UTF8';\n",
+                 "CREATE FUNCTION touch() RETURNS trigger AS $$\nBEGIN NEW.updated := now(); RETURN NEW; END;\n"
+                 "$$ LANGUAGE plpgsql;\n"]
+    names = []
+    for i in range(spec.tables):
+        name = _table_name(i, rng, spec)
+        columns = [_column_name(j, rng, spec) for j in range(spec.columns)]
+        parents = []
+        if names:
+            wanted = int(spec.fk_density) + (rng.random() < spec.fk_density % 1)
+            parents = sorted(set(rng.choice(names) for _ in range(wanted)))
+        if spec.dialect == 'mysql':
+            parts.append(_mysql_table(name, columns, parents, rng))
+        elif spec.dialect == 'sqlite':
+            parts.append(_sqlite_table(name, columns, parents, rng))
+        elif spec.dialect == 'sqlserver':
+            parts.append(_sqlserver_table(name, columns, parents, rng))
+            tail.append(_sqlserver_foreign_keys(name, parents))
+        else:
+            parts.append(_postgres_table(name, columns, parents, rng))
+        if spec.insert_rows:
+            parts.append(_insert(name, len(columns), spec.insert_rows, spec.dialect))
+        names.append(name)
+    return ''.join(parts) + ''.join(tail) + footer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--fk-density', type=float, default=1.0)
+    parser.add_argument('--dialect', default='mysql', choices=DIALECTS)
+    parser.add_argument('--unicode', type=float, default=0.0, help='中文名所占比例（0~1）')
+    parser.add_argument('--insert-rows', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    spec = SchemaSpec(args.tables, args.columns, args.fk_density, args.dialect, args.unicode,
+                      args.insert_rows, args.seed)
+    sys.stdout.write(generate_ddl(spec))
+
+
+if __name__ == '__main__':
+    main()
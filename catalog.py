@@ -0,0 +1,163 @@
+import sqlite3
+from collections import defaultdict
+from urllib.parse import quote
+
+from sql_parser import Column, Constraint, Schema, Table
+
+# 直接读取数据库自身的目录（元数据）得到 Schema，不经过 DDL 文本。
+# 每种来源是 CatalogSource 的子类，用 register_source 注册后即可按名字或文件头选用；
+# 得到的 Schema 与 parse_schema 的结果相同，可直接交给 ERDiagramGenerator / DrawioGenerator。
+
+
+class CatalogError(Exception):
+    pass
+
+
+CATALOG_SOURCES = {}  # 来源名 -> CatalogSource 子类
+
+
+def register_source(cls):
+    CATALOG_SOURCES[cls.name] = cls
+    return cls
+
+
+class CatalogSource:
+    """目录来源基类：子类设置 name，实现 read_schema()；
+    matches(header) 根据文件开头的字节判断能否处理该文件"""
+
+    name = None
+
+    def __init__(self, target):
+        self.target = target
+
+    @classmethod
+    def matches(cls, header):
+        return False
+
+    def read_schema(self):
+        raise NotImplementedError
+
+
+@register_source
+class SQLiteSource(CatalogSource):
+    """从 SQLite 数据库文件读取表结构
+
+    各 pragma 都以表值函数的形式与 sqlite_master 连接，整个库只需四条查询，
+    不必对每张表分别执行 pragma。
+    """
+
+    name = 'sqlite'
+    HEADER = b'SQLite format 3\x00'
+
+    _TABLES = ("SELECT name FROM sqlite_master "
+               "WHERE type = 'table' AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\' ORDER BY rowid")
+    _COLUMNS = ("SELECT m.name, p.name, p.type, p.\"notnull\", p.dflt_value, p.pk "
+                "FROM sqlite_master AS m, pragma_table_info(m.name) AS p "
+                "WHERE m.type = 'table' ORDER BY m.rowid, p.cid")
+    _FOREIGN_KEYS = ("SELECT m.name, f.id, f.\"table\", f.\"from\", f.\"to\" "
+                     "FROM sqlite_master AS m, pragma_foreign_key_list(m.name) AS f "
+                     "WHERE m.type = 'table' ORDER BY m.rowid, f.id, f.seq")
+    _UNIQUE_INDEXES = ("SELECT m.name, i.name, c.name "
+                       "FROM sqlite_master AS m, pragma_index_list(m.name) AS i, pragma_index_info(i.name) AS c "
+                       "WHERE m.type = 'table' AND i.\"unique\" AND i.origin != 'pk' "
+                       "ORDER BY m.rowid, i.seq, c.seqno")
+
+    @classmethod
+    def matches(cls, header):
+        return header.startswith(cls.HEADER)
+
+    def read_schema(self):
+        try:
+            # 只读打开，不会创建不存在的文件，也不会修改数据库
+            connection = sqlite3.connect(f"file:{quote(self.target)}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            raise CatalogError(f"无法打开数据库: {e}")
+        try:
+            return self._read(connection)
+        except sqlite3.Error as e:
+            raise CatalogError(f"读取数据库结构失败: {e}")
+        finally:
+            connection.close()
+
+    def _read(self, connection):
+        tables = {}
+        for (name,) in connection.execute(self._TABLES):
+            tables[name] = Table(name)
+
+        rows = connection.execute(self._COLUMNS).fetchall()
+        primary_keys = defaultdict(list)
+        for table_name, name, _, _, _, pk in rows:
+            if pk:
+                primary_keys[table_name].append((pk, name))
+        for table_name, name, data_type, not_null, default, pk in rows:
+            table = tables.get(table_name)
+            if table is None:
+                continue
+            # 按 DDL 的写法拼出字段定义，显示字段类型时使用
+            definition = data_type
+            if pk and len(primary_keys[table_name]) == 1:
+                definition += ' PRIMARY KEY'
+            if not_null:
+                definition += ' NOT NULL'
+            if default is not None:
+                definition += f' DEFAULT {default}'
+            table.add_column(Column(name, data_type, definition.lstrip(), nullable=not not_null,
+                                    primary_key=bool(pk), default=default))
+        for table_name, columns in primary_keys.items():
+            if len(columns) > 1:
+                # 复合主键：table_info 的 pk 字段是列在主键中的序号
+                tables[table_name].constraints.append(
+                    Constraint(Constraint.PRIMARY_KEY, [name for _, name in sorted(columns)]))
+
+        foreign_keys = {}
+        for table_name, fk_id, ref_table, column, ref_column in connection.execute(self._FOREIGN_KEYS):
+            key = (table_name, fk_id)
+            if key not in foreign_keys:
+                foreign_keys[key] = (ref_table, [], [])
+            foreign_keys[key][1].append(column)
+            if ref_column is not None:
+                foreign_keys[key][2].append(ref_column)
+        for (table_name, _), (ref_table, columns, ref_columns) in foreign_keys.items():
+            if table_name in tables:
+                # 省略被引用列时引用的是父表主键，ref_columns 为空与 DDL 中的写法一致
+                tables[table_name].constraints.append(
+                    Constraint(Constraint.FOREIGN_KEY, columns, None, ref_table, ref_columns))
+
+        unique_indexes = {}
+        for table_name, index_name, column in connection.execute(self._UNIQUE_INDEXES):
+            if column is not None:  # 表达式索引没有列名
+                unique_indexes.setdefault((table_name, index_name), []).append(column)
+        for (table_name, index_name), columns in unique_indexes.items():
+            table = tables.get(table_name)
+            if table is None:
+                continue
+            table.constraints.append(Constraint(Constraint.UNIQUE, columns, index_name))
+            if len(columns) == 1 and table.column(columns[0]) is not None:
+                table.column(columns[0]).unique = True
+
+        return Schema(tables.values())
+
+
+def detect_source(path):
+    """根据文件头判断来源，无法识别时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(64)
+    except OSError:
+        return None
+    for cls in CATALOG_SOURCES.values():
+        if cls.matches(header):
+            return cls.name
+    return None
+
+
+def load_catalog(target, source=None):
+    """从数据库目录读取 Schema；source 为来源名，省略时按文件头自动识别"""
+    if source is None:
+        source = detect_source(target)
+        if source is None:
+            raise CatalogError("无法识别的数据库文件")
+    cls = CATALOG_SOURCES.get(source)
+    if cls is None:
+        raise CatalogError(f"不支持的数据库类型: {source}")
+    return cls(target).read_schema()
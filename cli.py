@@ -0,0 +1,308 @@
+"""命令行批量生成ER图
+
+    python cli.py schema.sql migrations/ "db/**/*.sql" -o er_output --formats png,svg,drawio
+    cat schema.sql | python cli.py - -o er_output
+
+输入可以是文件、目录（递归查找 *.sql）、glob 模式或 -（标准输入）；SQLite 数据库文件
+直接读取其目录，不需要先导出 DDL。多个输入在进程池中
+并行渲染，输出目录下的 manifest.json 记录每个输入的内容哈希与产物；再次运行时，
+哈希未变且产物仍在的输入会被跳过。
+
+表很多时可以用 --partition 把表结构分区，每区单独布局、渲染：drawio 输出为多页文件（第一页为总览），
+图片输出到 <名称>_partitions/ 目录，内含各区的图片、总览图和 index.json。
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from catalog import detect_source, load_catalog
+from diagram_model import DiagramModel
+from drawio_writer import DrawioGenerator
+from graphviz_writer import ERDiagramGenerator
+from layout import LAYOUT_MODES
+from partition import (DEFAULT_MAX_TABLES, PARTITION_STRATEGIES, cross_links, iter_partitioned_drawio,
+                       overview_graph, partition_files, partition_index, partition_schema, render_partitions)
+from render_cache import cache_key
+from schema_index import SchemaIndex
+from sql_parser import parse_schema
+
+OUTPUT_FORMATS = ('png', 'svg', 'drawio')
+MANIFEST_NAME = 'manifest.json'
+
+
+def expand_inputs(patterns):
+    """把命令行参数展开为 [(路径或'-', 输出名)]，按路径去重并保持顺序"""
+    paths = []
+    for pattern in patterns:
+        if pattern == '-':
+            paths.append('-')
+        elif os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '**', '*.sql'), recursive=True)))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+            paths.extend(matches if matches else [pattern])
+
+    inputs = []
+    seen = set()
+    for path in paths:
+        key = path if path == '-' else os.path.abspath(path)
+        if key in seen:
+            continue
+        seen.add(key)
+        inputs.append((path, output_name(path)))
+    return inputs
+
+
+def output_name(path):
+    """输入路径对应的输出文件名（不含扩展名），子目录用 __ 连接，避免不同目录的同名文件互相覆盖"""
+    if path == '-':
+        return 'stdin'
+    relative = os.path.relpath(path)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(path)
+    parts = [part for part in os.path.splitext(relative)[0].split(os.sep) if part not in ('', os.curdir)]
+    return '__'.join(parts)
+
+
+def render_schema(name, sql_content, output_dir, formats, options, catalog_path=None):
+    """在工作进程中渲染一个输入，返回该输入的 manifest 条目；给出 catalog_path 时从数据库文件读取表结构"""
+    timings = {}
+    outputs = {}
+    start = time.perf_counter()
+    if catalog_path is not None:
+        schema = load_catalog(catalog_path)
+        timings['introspect'] = time.perf_counter() - start
+    else:
+        schema = parse_schema(sql_content)
+        timings['parse'] = time.perf_counter() - start
+    if options.get('search'):
+        # 只画检索到的表（以及 search_depth 层内的关联表）
+        start = time.perf_counter()
+        index = SchemaIndex(schema)
+        schema = index.subgraph(index.search(options['search']).tables, options.get('search_depth', 0))
+        timings['search'] = time.perf_counter() - start
+    if options.get('partition'):
+        return render_partitioned(name, schema, output_dir, formats, options, timings)
+    # drawio 与图片共用同一个模型，布局只计算一次
+    schema = DiagramModel.from_schema(schema)
+
+    if 'drawio' in formats:
+        start = time.perf_counter()
+        path = os.path.join(output_dir, f"{name}.drawio")
+        chunks = DrawioGenerator().iter_drawio(schema, options['table_radius'], options['field_radius'],
+                                               options['show_type'], options['layout'])
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+        outputs['drawio'] = path
+        timings['drawio'] = time.perf_counter() - start
+
+    image_formats = [fmt for fmt in formats if fmt != 'drawio']
+    if image_formats:
+        start = time.perf_counter()
+        generator = ERDiagramGenerator()
+        generator.load_schema(schema, options['table_radius'], options['field_radius'],
+                              options['show_type'], options['layout'])
+        timings['layout'] = time.perf_counter() - start
+        for fmt in image_formats:
+            start = time.perf_counter()
+            path = os.path.join(output_dir, f"{name}.{fmt}")
+            data = generator.pipe(fmt)
+            with open(path, 'wb') as f:
+                f.write(data)
+            outputs[fmt] = path
+            timings[fmt] = time.perf_counter() - start
+
+    return {'tables': len(schema), 'outputs': outputs, 'timings': timings}
+
+
+def render_partitioned(name, schema, output_dir, formats, options, timings):
+    """分区渲染一个输入：drawio 为多页文件，图片写入 <名称>_partitions/ 目录；各分区依次渲染，
+    进程的内存占用取决于最大的分区"""
+    outputs = {}
+    start = time.perf_counter()
+    partitions = partition_schema(schema, options['partition'], options['max_tables'])
+    timings['partition'] = time.perf_counter() - start
+    render_options = (options['table_radius'], options['field_radius'], options['show_type'], options['layout'])
+
+    if 'drawio' in formats:
+        start = time.perf_counter()
+        path = os.path.join(output_dir, f"{name}.drawio")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(iter_partitioned_drawio(schema, partitions, *render_options))
+        outputs['drawio'] = path
+        timings['drawio'] = time.perf_counter() - start
+
+    image_formats = [fmt for fmt in formats if fmt != 'drawio']
+    if image_formats:
+        directory = os.path.join(output_dir, f"{name}_partitions")
+        os.makedirs(directory, exist_ok=True)
+        links = cross_links(schema, partitions)
+        files = {fmt: partition_files(partitions, fmt) for fmt in image_formats}
+
+        def render_partition(subset):
+            generator = ERDiagramGenerator()
+            generator.load_schema(subset, *render_options)
+            return [generator.pipe(fmt) for fmt in image_formats]
+
+        start = time.perf_counter()
+        for index, images in render_partitions(schema, partitions, render_partition, max_workers=1):
+            for fmt, data in zip(image_formats, images):
+                with open(os.path.join(directory, files[fmt][index]), 'wb') as f:
+                    f.write(data)
+        overview = {}
+        for fmt in image_formats:
+            overview[fmt] = f"overview.{fmt}"
+            with open(os.path.join(directory, overview[fmt]), 'wb') as f:
+                f.write(overview_graph(partitions, links, files[fmt]).pipe(fmt))
+        index_path = os.path.join(directory, 'index.json')
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(partition_index(partitions, links, files, overview), f, ensure_ascii=False, indent=2)
+        for fmt in image_formats:
+            outputs[fmt] = os.path.join(directory, overview[fmt])
+        outputs['index'] = index_path
+        timings['images'] = time.perf_counter() - start
+
+    return {'tables': len(schema), 'partitions': len(partitions), 'outputs': outputs, 'timings': timings}
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('inputs', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(path, entries):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': datetime.now().isoformat(timespec='seconds'), 'inputs': entries},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(entry, content_hash):
+    """上次运行成功、哈希一致且产物都还在时无需重新渲染"""
+    return (entry is not None and entry.get('status') == 'ok' and entry.get('hash') == content_hash
+            and all(os.path.exists(path) for path in entry.get('outputs', {}).values()))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='批量把 SQL 建表语句渲染为 ER 图')
+    parser.add_argument('inputs', nargs='+', help="SQL 文件、SQLite 数据库文件、目录、glob 模式，或 - 表示标准输入")
+    parser.add_argument('-o', '--output-dir', default='er_output', help="输出目录（默认 er_output）")
+    parser.add_argument('-f', '--formats', default='png,drawio',
+                        help="逗号分隔的输出格式，可选 png、svg、drawio（默认 png,drawio）")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 2, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument('--layout', default='circle', choices=LAYOUT_MODES, help="布局方式（默认 circle）")
+    parser.add_argument('--table-radius', type=float, default=6, help="表间距")
+    parser.add_argument('--field-radius', type=float, default=2, help="字段到表距离")
+    parser.add_argument('--show-type', action='store_true', help="显示字段数据类型")
+    parser.add_argument('--search', help="只画检索到的表，例如 'column:*_id type:int'（条件写法见 README）")
+    parser.add_argument('--search-depth', type=int, default=0, help="检索结果同时包含几层关联表（默认 0）")
+    parser.add_argument('--partition', choices=PARTITION_STRATEGIES,
+                        help="分区渲染：components 按外键连通分量，prefix 按表名前缀，size 只按大小")
+    parser.add_argument('--max-tables', type=int, default=DEFAULT_MAX_TABLES,
+                        help=f"分区渲染时每区的表数上限（默认 {DEFAULT_MAX_TABLES}）")
+    parser.add_argument('--force', action='store_true', help="忽略 manifest，全部重新渲染")
+    args = parser.parse_args(argv)
+
+    args.formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in args.formats if fmt not in OUTPUT_FORMATS]
+    if not args.formats or unknown:
+        parser.error(f"不支持的输出格式: {', '.join(unknown)}")
+    if args.max_tables < 1:
+        parser.error("--max-tables 必须大于 0")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        'layout': args.layout,
+        'table_radius': args.table_radius,
+        'field_radius': args.field_radius,
+        'show_type': args.show_type,
+    }
+    if args.search:
+        # 不检索时不加入这两项，已有 manifest 的哈希保持不变
+        options.update(search=args.search, search_depth=args.search_depth)
+    if args.partition:
+        options.update(partition=args.partition, max_tables=args.max_tables)
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = os.path.join(args.output_dir, MANIFEST_NAME)
+    previous = {} if args.force else load_manifest(manifest_path)
+    entries = dict(previous)
+
+    pending = []
+    skipped = 0
+    failures = 0
+    for path, name in expand_inputs(args.inputs):
+        catalog_path = None
+        try:
+            if path == '-':
+                sql_content = sys.stdin.read()
+            elif detect_source(path) is not None:
+                # 数据库文件按内容哈希判断是否变化
+                catalog_path = path
+                digest = hashlib.sha256()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                sql_content = f"catalog:{digest.hexdigest()}"
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    sql_content = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            entries[name] = {'source': path, 'status': 'failed', 'error': str(e)}
+            failures += 1
+            print(f"failed  {'-':>8}  {name}: {e}", file=sys.stderr)
+            continue
+        # 哈希同时覆盖渲染参数和输出格式，参数变化时也会重新渲染
+        content_hash = cache_key(sql_content, ','.join(args.formats), **options)
+        if is_fresh(previous.get(name), content_hash):
+            print(f"skipped {'-':>8}  {name}")
+            skipped += 1
+            continue
+        pending.append((path, name, sql_content, content_hash, catalog_path))
+
+    rendered = 0
+    total_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(pending) or 1))) as executor:
+        futures = {}
+        for path, name, sql_content, content_hash, catalog_path in pending:
+            future = executor.submit(render_schema, name, sql_content, args.output_dir, args.formats, options,
+                                     catalog_path)
+            futures[future] = (path, name, content_hash)
+        for future in as_completed(futures):
+            path, name, content_hash = futures[future]
+            entry = {'source': path, 'hash': content_hash}
+            try:
+                entry.update(future.result())
+                entry['status'] = 'ok'
+            except Exception as e:
+                entry.update(status='failed', error=str(e))
+            entry['seconds'] = round(sum(entry.get('timings', {}).values()), 4)
+            entries[name] = entry
+            if entry['status'] == 'ok':
+                rendered += 1
+                phases = ' '.join(f"{phase}={seconds:.3f}" for phase, seconds in entry['timings'].items())
+                print(f"ok      {entry['seconds']:8.3f}  {name} ({entry['tables']} tables; {phases})")
+            else:
+                failures += 1
+                print(f"failed  {'-':>8}  {name}: {entry['error']}", file=sys.stderr)
+
+    write_manifest(manifest_path, entries)
+    print(f"{rendered} rendered, {failures} failed, {skipped} unchanged in {time.perf_counter() - total_start:.2f}s; "
+          f"manifest: {manifest_path}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
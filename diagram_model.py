@@ -0,0 +1,173 @@
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+
+from layout import compute_layout
+from sql_parser import parse_schema
+
+# 渲染用的紧凑只读模型。一份输入只解析一次，得到 DiagramModel；Graphviz（graphviz_writer）
+# 与 Draw.io（drawio_writer）的生成器都以它为输入，按参数算出的布局也记在模型中，
+# 同一份SQL换一种格式导出时只剩序列化。
+# 字段按表的顺序平铺在 column_names / column_types 两个元组中，column_offsets 记录每张表字段的起止位置；
+# 坐标按表的序号存放在 array('d') 中，不为每张表、每个字段创建对象。
+
+
+class Relation:
+    """两张表之间的关系，取自 sql_parser.Relationship 中渲染用到的部分，另记两端表的序号"""
+    __slots__ = ('child', 'parent', 'child_index', 'parent_index', 'label',
+                 'child_cardinality', 'parent_cardinality', 'inferred')
+
+    def __init__(self, child, parent, child_index, parent_index, label, child_cardinality='N',
+                 parent_cardinality='1', inferred=False):
+        self.child = child
+        self.parent = parent
+        self.child_index = child_index
+        self.parent_index = parent_index
+        self.label = label
+        self.child_cardinality = child_cardinality
+        self.parent_cardinality = parent_cardinality
+        self.inferred = inferred
+
+    def __repr__(self):
+        return f"Relation({self.child} {self.child_cardinality}:{self.parent_cardinality} {self.parent})"
+
+
+class TableLayout:
+    """一组布局参数下各表的中心坐标（屏幕方向，y 轴向下），layout[i] 为第 i 张表的 (x, y)"""
+    __slots__ = ('xs', 'ys')
+
+    def __init__(self, xs, ys):
+        self.xs = xs
+        self.ys = ys
+
+    @classmethod
+    def from_positions(cls, names, positions):
+        """由 compute_layout 等返回的 {表名: (x, y)} 构造"""
+        return cls(array('d', (positions[name][0] for name in names)),
+                   array('d', (positions[name][1] for name in names)))
+
+    def __getitem__(self, index):
+        return self.xs[index], self.ys[index]
+
+    def __len__(self):
+        return len(self.xs)
+
+
+class DiagramModel:
+    """一份输入的表、字段与关系，创建后不再修改
+
+    除了按序号访问的属性外，还提供 table_names() / relationships()，
+    与 Schema 的同名方法一致，可以直接交给 compute_layout。
+    """
+    __slots__ = ('names', 'column_offsets', 'column_names', 'column_types', 'relations',
+                 '_index', '_layouts', '_lock')
+
+    def __init__(self, names, column_offsets, column_names, column_types, relations):
+        self.names = names
+        self.column_offsets = column_offsets
+        self.column_names = column_names
+        self.column_types = column_types  # 字段名之后的完整定义文本，即 Column.definition
+        self.relations = relations
+        self._index = {name: i for i, name in enumerate(names)}
+        self._layouts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_schema(cls, schema):
+        names = []
+        offsets = array('l', [0])
+        column_names = []
+        column_types = []
+        for table in schema:
+            names.append(table.name)
+            for column in table.columns:
+                column_names.append(column.name)
+                column_types.append(column.definition)
+            offsets.append(len(column_names))
+        index = {name: i for i, name in enumerate(names)}
+        relations = tuple(
+            Relation(relation.child, relation.parent, index[relation.child], index[relation.parent],
+                     relation.label, relation.child_cardinality, relation.parent_cardinality, relation.inferred)
+            for relation in schema.relationships())
+        return cls(tuple(names), offsets, tuple(column_names), tuple(column_types), relations)
+
+    def columns(self, index):
+        """第 index 张表的 (字段名元组, 字段定义元组)"""
+        start, end = self.column_offsets[index], self.column_offsets[index + 1]
+        return self.column_names[start:end], self.column_types[start:end]
+
+    def index(self, name):
+        return self._index[name]
+
+    def table_names(self):
+        return list(self.names)
+
+    def relationships(self):
+        return self.relations
+
+    def layout(self, mode='circle', table_radius=6, node_size=5):
+        """按参数计算各表坐标，返回 TableLayout；同一组参数只计算一次"""
+        key = (mode, table_radius, node_size)
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = TableLayout.from_positions(self.names, compute_layout(self, mode, table_radius, node_size))
+            with self._lock:
+                layout = self._layouts.setdefault(key, layout)
+        return layout
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __repr__(self):
+        return f"DiagramModel({len(self.names)} tables, {len(self.column_names)} columns)"
+
+
+def as_model(schema):
+    """Schema 转成 DiagramModel；已经是 DiagramModel 时原样返回"""
+    if isinstance(schema, DiagramModel):
+        return schema
+    return DiagramModel.from_schema(schema)
+
+
+class ModelCache:
+    """按输入内容的哈希记住最近用过的 DiagramModel（LRU）"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source, build):
+        """返回 source 对应的模型，没有时调用 build() 创建"""
+        key = hashlib.sha256(source.encode('utf-8', 'surrogatepass')).digest()
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+        model = build()
+        with self._lock:
+            self._models[key] = model
+            while len(self._models) > self.max_entries:
+                self._models.popitem(last=False)
+        return model
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._models)}
+
+
+_models = ModelCache()
+
+
+def load_model(sql, parse=parse_schema):
+    """解析SQL得到 DiagramModel；相同内容的SQL只解析一次"""
+    return _models.get(sql, lambda: DiagramModel.from_schema(parse(sql)))
@@ -0,0 +1,222 @@
+import re
+
+# SQL 方言：字符串转义、引号标识符、注释写法、语句分隔符等词法差异。
+# 每种方言是 Dialect 的子类，用 register_dialect 注册时实例化一次并编译全部正则，
+# sql_parser 切分语句和解析建表语句时直接使用编译好的规则。
+# 未指定方言时由 sniff_dialect 根据输入开头的特征选择，没有明显特征时使用 generic。
+
+DIALECTS = {}  # 方言名 -> Dialect 实例
+
+# 识别方言时只检查输入开头的这么多字符
+SNIFF_SIZE = 64 * 1024
+
+
+def register_dialect(cls):
+    DIALECTS[cls.name] = cls()
+    return cls
+
+
+class Dialect:
+    """方言基类：子类通过类属性描述词法差异，实例化时据此编译正则
+
+    SIGNATURES 为 (正则, 权重) 列表，输入开头每出现一种特征就累加对应权重，
+    得分最高的方言胜出。正则匹配的是转成大写、并在开头补一个换行的文本，
+    不使用 IGNORECASE，也不以 \b、^ 开头（行首写作 \n），这样正则引擎可以按字面前缀快速查找。
+    """
+
+    name = None
+    hash_comments = False  # MySQL 的 # 行注释
+    backslash_escapes = False  # 字符串中的 \' 转义
+    dollar_quotes = False  # PostgreSQL 的 $tag$ 引用体
+    backtick_quotes = False  # `标识符`
+    bracket_quotes = False  # [标识符]
+    batch_separator = False  # SQL Server 单独一行的 GO
+    string_prefix = ''  # 字符串前缀，如 SQL Server 的 N'...'
+    word_chars = r'\w$'
+    SIGNATURES = ()
+
+    def __init__(self):
+        if self.backslash_escapes:
+            string_body = r"[^'\\]*(?:(?:\\[\s\S]|'')[^'\\]*)*"
+        else:
+            string_body = r"[^']*(?:''[^']*)*"
+        quote_bodies = {"'": string_body, '"': r'[^"]*(?:""[^"]*)*'}
+        if self.backtick_quotes:
+            quote_bodies['`'] = r'[^`]*(?:``[^`]*)*'
+        comment = r'/\*[^*]*\*+(?:[^*/][^*]*\*+)*/'
+
+        # 普通文本中不会出现的字符：它们可能开始字符串、注释、引用体或语句分隔符
+        special = ';\'"-/' + ''.join(quote for quote in quote_bodies if quote not in '\'"')
+        if self.hash_comments:
+            special += '#'
+        if self.dollar_quotes:
+            special += '$'
+        if self.batch_separator:
+            special += '\n'
+        plain = f'[^{re.escape(special)}]+'
+        closed = [plain] + [f'{re.escape(quote)}{body}{re.escape(quote)}' for quote, body in quote_bodies.items()]
+        open_ = [plain] + [f'{re.escape(quote)}{body}{re.escape(quote)}?' for quote, body in quote_bodies.items()]
+        closed.append(r'--[^\n]*\n')
+        open_.append(r'--[^\n]*\n?')
+        if self.hash_comments:
+            open_.append(r'\#[^\n]*\n?')
+        closed.append(comment)
+        open_.append(r'/\*[^*]*(?:\*+[^*/][^*]*)*(?:\*+/)?')
+        if self.dollar_quotes:
+            open_.append(r'\$(?P<tag>[A-Za-z_]\w*|)\$(?P<dollar_body>[\s\S]*?\$(?P=tag)\$)?')
+        # 字符串、引号标识符、注释和引用体（允许未闭合），切分方式与 chunk_token 相同；
+        # 它们都以特殊字符开头，finditer 查找时在正则引擎内跳过普通文本（render_cache 规范化空白时使用）
+        self.chunk_literal = re.compile('|'.join(open_[1:]))
+        separator = ';'
+        if self.batch_separator:
+            # 换行只有在后面不可能是 GO 时才能批量跳过；处于分块末尾时留到下一块再判断
+            closed.append(r'\n(?![ \t]*(?:[Gg][Oo]\b|[Gg]?\Z))')
+            separator += r'|\n[ \t]*[Gg][Oo][ \t\r]*(?=\n|\Z)'
+            open_.append(rf'(?P<separator>{separator})')
+            open_.append(r'\n[ \t]*[Gg]?\Z')
+        else:
+            open_.append(rf'(?P<separator>{separator})')
+        open_.append(r'[\s\S]')
+
+        # 语句切分用的词法规则：字符串、引号标识符、注释整体匹配，保证其中的分号不会切断语句。
+        # 每个分支都允许"未闭合"，分块输入时由 SchemaParser 判断是否需要等待更多数据。
+        self.chunk_token = re.compile('|'.join(open_))
+        # 只由完整结构组成的连续片段，用来一次跳过一大段语句内容（主要是 INSERT 数据）
+        # 分组 last 是最后一段结构，用于在分块末尾回退
+        self.chunk_bulk = re.compile('(?:(?P<last>' + '|'.join(closed) + '))+')
+        # 引号内部内容（不含两侧引号），用于跨分块续扫
+        self.quote_body = {quote: re.compile(body) for quote, body in quote_bodies.items()}
+
+        skip = [r'\s+', r'--[^\n]*\n', comment]
+        if self.hash_comments:
+            skip.append(r'\#[^\n]*\n')
+        # 语句开头的首个关键字（跳过前导空白与完整的注释）
+        self.statement_head = re.compile('(?:' + '|'.join(skip) + r')*(\w*)')
+
+        idents = [r'"[^"]*(?:""[^"]*)*"']
+        if self.backtick_quotes:
+            idents.append(r'`[^`]*(?:``[^`]*)*`')
+        if self.bracket_quotes:
+            idents.append(r'\[(?!\])[^\]]*(?:\]\][^\]]*)*\]')
+        skip = [r'\s+', r'--[^\n]*', comment]
+        if self.hash_comments:
+            skip.append(r'\#[^\n]*')
+        # CREATE TABLE 语句内部的词法规则，每次匹配先吞掉前导空白与注释
+        self.token = re.compile(
+            '(?:' + '|'.join(skip) + ')*'
+            '(?:'
+            '(?P<qident>' + '|'.join(idents) + ')'
+            f"|(?P<string>{self.string_prefix}'{string_body}')"
+            f'|(?P<word>[{self.word_chars}]+)'
+            r'|(?P<punct>[(),;.])'
+            r'|(?P<other>\S)'
+            ')')
+
+        self._signatures = [(re.compile(pattern, re.MULTILINE), weight) for pattern, weight in self.SIGNATURES]
+
+    def score(self, sample):
+        """sample 须已按 sniff_dialect 的方式转成大写并补上开头的换行"""
+        return sum(weight for pattern, weight in self._signatures if pattern.search(sample))
+
+    def __repr__(self):
+        return f"Dialect({self.name!r})"
+
+
+@register_dialect
+class GenericDialect(Dialect):
+    """无法识别时使用的宽松规则，同时接受各方言的引号与注释写法"""
+
+    name = 'generic'
+    hash_comments = True
+    backslash_escapes = True
+    dollar_quotes = True
+    backtick_quotes = True
+    bracket_quotes = True
+
+
+@register_dialect
+class MySQLDialect(Dialect):
+    name = 'mysql'
+    hash_comments = True
+    backslash_escapes = True
+    backtick_quotes = True
+    SIGNATURES = (
+        (r'\n-- MYSQL DUMP', 10),
+        (r'/\*!\d{5}', 5),
+        (r'\)\s*ENGINE\s*=', 5),
+        (r'AUTO_INCREMENT\b', 3),
+        (r'DEFAULT\s+CHARSET\b', 3),
+        (r'UNSIGNED\b', 2),
+        (r'`\w', 1),
+    )
+
+
+@register_dialect
+class PostgresDialect(Dialect):
+    name = 'postgres'
+    dollar_quotes = True
+    SIGNATURES = (
+        (r'\n-- POSTGRESQL DATABASE DUMP', 10),
+        (r'FROM\s+STDIN;', 5),
+        (r'ALTER\s+TABLE\s+ONLY\b', 5),
+        (r'SET\s+SEARCH_PATH\b', 5),
+        (r'OWNER\s+TO\b', 3),
+        (r'SERIAL\b', 3),
+        (r'\$[A-Z_]?\w*\$', 3),
+        (r'TIME\s+ZONE\b', 2),
+        (r'JSONB\b', 2),
+        (r'::[A-Z]', 2),
+    )
+
+
+@register_dialect
+class SQLiteDialect(Dialect):
+    name = 'sqlite'
+    backtick_quotes = True
+    bracket_quotes = True
+    SIGNATURES = (
+        (r'AUTOINCREMENT\b', 5),
+        (r'WITHOUT\s+ROWID\b', 5),
+        (r'\nPRAGMA\s', 5),
+        (r'SQLITE_SEQUENCE\b', 5),
+        (r'\nBEGIN\s+TRANSACTION;', 2),
+    )
+
+
+@register_dialect
+class SQLServerDialect(Dialect):
+    name = 'sqlserver'
+    bracket_quotes = True
+    batch_separator = True
+    string_prefix = '[Nn]?'
+    word_chars = r'\w$#@'  # #临时表、@变量
+    SIGNATURES = (
+        (r'\nGO[ \t]*\r?$', 5),
+        (r'\[DBO\]\.', 5),
+        (r'SET\s+ANSI_NULLS\b', 5),
+        (r'IDENTITY\s*\(', 3),
+        (r'CLUSTERED\b', 3),
+        (r'ON\s+\[PRIMARY\]', 3),
+        (r'NVARCHAR\b', 2),
+    )
+
+
+def get_dialect(dialect):
+    """按名字取得方言；dialect 已是 Dialect 实例时原样返回"""
+    if isinstance(dialect, Dialect):
+        return dialect
+    try:
+        return DIALECTS[dialect]
+    except KeyError:
+        raise ValueError(f"未知的SQL方言: {dialect}")
+
+
+def sniff_dialect(sample):
+    """根据输入开头的特征判断方言，没有任何特征时返回 generic"""
+    sample = '\n' + sample[:SNIFF_SIZE].upper()
+    best, best_score = DIALECTS['generic'], 0
+    for dialect in DIALECTS.values():
+        score = dialect.score(sample)
+        if score > best_score:
+            best, best_score = dialect, score
+    return best
@@ -0,0 +1,226 @@
+import base64
+import math
+import zlib
+from urllib.parse import quote, unquote
+
+from diagram_model import TableLayout, as_model, load_model
+
+MXFILE_OPEN = '''<?xml version="1.0" encoding="UTF-8"?>
+<mxfile host="app.diagrams.net" modified="2024-01-01T00:00:00.000Z" agent="SQL ER Generator" version="21.1.1" compressed="{compressed}">'''
+
+DIAGRAM_OPEN = '''
+  <diagram id="{id}" name="{name}">'''
+
+DIAGRAM_CLOSE = '</diagram>'
+
+MXFILE_CLOSE = '''
+</mxfile>'''
+
+MXFILE_HEADER = MXFILE_OPEN + DIAGRAM_OPEN.replace('{id}', 'ER-Diagram').replace('{name}', 'ER图')
+
+MXFILE_FOOTER = DIAGRAM_CLOSE + MXFILE_CLOSE
+
+GRAPH_MODEL_HEADER = '''
+    <mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="1169" pageHeight="827" background="#ffffff" math="0" shadow="0">
+      <root>
+        <mxCell id="0"/>
+        <mxCell id="1" parent="0"/>
+'''
+
+GRAPH_MODEL_FOOTER = '''      </root>
+    </mxGraphModel>
+  '''
+
+EDGE_STYLE = "endArrow=none;html=1;edgeStyle=none;"
+
+# 流式输出时累积到这么多字符再交给调用方，避免每个单元格一次写入
+CHUNK_SIZE = 64 * 1024
+
+_ATTR_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    '\n': '&#10;',
+    '\r': '&#13;',
+    '\t': '&#9;',
+})
+
+
+def escape_attr(value):
+    """转义XML属性值；换行写成 &#10;，否则解析器会把它规整成空格"""
+    return str(value).translate(_ATTR_ESCAPES)
+
+
+def vertex_cell(cell_id, value, style, x, y, width, height):
+    return (f'        <mxCell id="{cell_id}" value="{escape_attr(value)}" style="{style}" vertex="1" parent="1">\n'
+            f'          <mxGeometry x="{x}" y="{y}" width="{width}" height="{height}" as="geometry"/>\n'
+            f'        </mxCell>\n')
+
+
+def edge_cell(cell_id, source, target, style=EDGE_STYLE, value=None):
+    value_attr = f' value="{escape_attr(value)}"' if value is not None else ''
+    return (f'        <mxCell id="{cell_id}"{value_attr} style="{style}" edge="1" parent="1" '
+            f'source="{source}" target="{target}">\n'
+            f'          <mxGeometry relative="1" as="geometry"/>\n'
+            f'        </mxCell>\n')
+
+
+def compress_chunks(chunks):
+    """按 draw.io 的压缩格式编码 mxGraphModel：encodeURIComponent -> raw deflate -> base64
+
+    逐块压缩并输出，base64 只在凑满3字节的边界上切分，拼接结果与一次性编码相同。
+    """
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    pending = b''
+    for chunk in chunks:
+        pending += compressor.compress(quote(chunk, safe="-_.!~*'()").encode('ascii'))
+        cut = len(pending) - len(pending) % 3
+        if cut:
+            yield base64.b64encode(pending[:cut]).decode('ascii')
+            pending = pending[cut:]
+    pending += compressor.flush()
+    yield base64.b64encode(pending).decode('ascii')
+
+
+def decompress_diagram(data):
+    """compress_chunks 的逆操作，返回 mxGraphModel 文本"""
+    return unquote(zlib.decompress(base64.b64decode(data), -15).decode('ascii'))
+
+
+def layout_scale(table_radius, field_radius):
+    """draw.io 中布局使用的 (表间距, 单表占位直径)，单位为像素：表间距每单位50像素，字段环每单位100像素"""
+    return table_radius * 50, field_radius * 200 + 160
+
+
+def buffered(chunks, size=CHUNK_SIZE):
+    """把小片段合并成至少 size 个字符的块"""
+    parts = []
+    length = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def iter_pages(pages, compressed=False):
+    """多页的 draw.io 文件：pages 依次为 (页名, 该页 mxGraphModel 的XML片段)，可以是生成器，
+    逐页取用，同一时间只有一页的内容在内存中"""
+    yield MXFILE_OPEN.format(compressed='true' if compressed else 'false')
+    for number, (name, cells) in enumerate(pages, 1):
+        yield DIAGRAM_OPEN.format(id=f"page-{number}", name=escape_attr(name))
+        if compressed:
+            yield from compress_chunks(buffered(cells))
+        else:
+            yield from buffered(cells)
+        yield DIAGRAM_CLOSE
+    yield MXFILE_CLOSE
+
+
+class DrawioGenerator:
+    """生成 draw.io 文件
+
+    iter_drawio 是一个生成器，按顺序产出XML片段，可直接用于流式响应或逐块写文件，
+    整个文档不会在内存中反复拼接；generate_drawio / generate_from_schema 返回完整字符串。
+    schema 可以是 Schema 或 DiagramModel，布局取自模型中记住的结果。
+    """
+
+    def __init__(self):
+        self.next_id = 2  # 从2开始，因为0和1已被根节点使用
+
+    def get_next_id(self):
+        # 使用字符串ID避免重复
+        current_id = f"node_{self.next_id}"
+        self.next_id += 1
+        return current_id
+
+    def generate_drawio(self, sql_content, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                        relationships=True, compressed=False):
+        return self.generate_from_schema(load_model(sql_content), table_radius, field_radius, show_type,
+                                         layout, relationships, compressed)
+
+    def generate_from_schema(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                             relationships=True, compressed=False, positions=None):
+        return ''.join(self.iter_drawio(schema, table_radius, field_radius, show_type, layout,
+                                        relationships, compressed, positions))
+
+    def iter_drawio(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                    relationships=True, compressed=False, positions=None):
+        # 布局在返回生成器之前算好，布局方式错误等异常不会出现在流式响应中途
+        model = as_model(schema)
+        table_layout = self._table_layout(model, table_radius, field_radius, layout, positions)
+        cells = self._iter_cells(model, table_layout, field_radius, show_type, relationships)
+        return self._iter_document(cells, compressed)
+
+    def iter_cells(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                   relationships=True, positions=None):
+        """一页 mxGraphModel 的XML片段，供 iter_pages 拼成多页文件；开始迭代时才转换模型、计算布局"""
+        model = as_model(schema)
+        table_layout = self._table_layout(model, table_radius, field_radius, layout, positions)
+        yield from self._iter_cells(model, table_layout, field_radius, show_type, relationships)
+
+    def _table_layout(self, model, table_radius, field_radius, layout, positions):
+        if positions is None:
+            return model.layout(layout, *layout_scale(table_radius, field_radius))
+        return TableLayout.from_positions(model.names, positions)
+
+    def _iter_document(self, cells, compressed):
+        yield MXFILE_HEADER.format(compressed='true' if compressed else 'false')
+        if compressed:
+            yield from compress_chunks(buffered(cells))
+        else:
+            yield from buffered(cells)
+        yield MXFILE_FOOTER
+
+    def _iter_cells(self, model, table_layout, field_radius, show_type, relationships):
+        yield GRAPH_MODEL_HEADER
+
+        center_x, center_y = 400, 300
+        table_ids = []
+
+        for i, table_name in enumerate(model.names):
+            table_x, table_y = table_layout[i]
+            table_x += center_x
+            table_y += center_y
+
+            table_id = self.get_next_id()
+            table_ids.append(table_id)
+            yield vertex_cell(table_id, table_name, "whiteSpace=wrap;html=1;", table_x, table_y, 120, 40)
+
+            field_names, field_types = model.columns(i)
+            for j, field_name in enumerate(field_names):
+                field_angle = (2 * math.pi * j) / len(field_names)
+                field_x = table_x + field_radius * 100 * math.cos(field_angle)
+                field_y = table_y + field_radius * 100 * math.sin(field_angle)
+
+                field_value = f"{field_name}\n{field_types[j]}" if show_type else field_name
+
+                field_id = self.get_next_id()
+                yield vertex_cell(field_id, field_value, "ellipse;whiteSpace=wrap;html=1;",
+                                  field_x, field_y, 120, 60)
+                yield edge_cell(self.get_next_id(), table_id, field_id)
+
+        if relationships:
+            for relation in model.relations:
+                parent_x, parent_y = table_layout[relation.parent_index]
+                child_x, child_y = table_layout[relation.child_index]
+                rel_x = center_x + (parent_x + child_x) / 2
+                rel_y = center_y + (parent_y + child_y) / 2
+                if relation.parent == relation.child:
+                    rel_x += field_radius * 100
+                    rel_y -= field_radius * 100
+
+                rel_id = self.get_next_id()
+                edge_style = EDGE_STYLE + ("dashed=1;" if relation.inferred else "")
+                yield vertex_cell(rel_id, relation.label, "rhombus;whiteSpace=wrap;html=1;", rel_x, rel_y, 120, 60)
+                yield edge_cell(self.get_next_id(), table_ids[relation.parent_index], rel_id,
+                                value=relation.parent_cardinality)
+                yield edge_cell(self.get_next_id(), rel_id, table_ids[relation.child_index], edge_style,
+                                value=relation.child_cardinality)
+
+        yield GRAPH_MODEL_FOOTER
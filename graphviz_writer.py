@@ -0,0 +1,156 @@
+import math
+import os
+
+import graphviz
+
+from diagram_model import TableLayout, as_model, load_model
+from metrics import timed
+from schema_diff import ALTERED, DIFF_COLORS, REMOVED
+
+# 用 Graphviz（neato）绘制ER图：表为矩形，字段为围绕表的椭圆，关系为菱形。
+# 网页版（app.py）、桌面版（sql_er_diagram_gui.py）和命令行（cli.py）共用这里的生成器，
+# 输入为 DiagramModel（也接受 Schema，自动转换），布局取自模型中记住的结果。
+
+
+def diff_style(status):
+    """差异图中新增/删除/修改的节点样式，status 为 None 时不加样式"""
+    if status is None:
+        return {}
+    fill, border = DIFF_COLORS[status]
+    style = 'filled,dashed' if status == REMOVED else 'filled'
+    return {'style': style, 'fillcolor': fill, 'color': border}
+
+
+class ERDiagramGenerator:
+    def __init__(self):
+        self.dot = graphviz.Graph('ER', 
+                                 engine='neato',  
+                                 graph_attr={
+                                     'splines': 'spline',
+                                     'overlap': 'scale',
+                                     'sep': '+30',
+                                     'esep': '+20',
+                                     'nodesep': '1.0',
+                                     'charset': 'utf8'
+                                 })
+        self.dot.attr('node', shape='rectangle', fontname='Microsoft YaHei')
+
+    def parse_sql(self, sql_content, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                  relationships=True):
+        self.load_schema(load_model(sql_content), table_radius, field_radius, show_type, layout, relationships)
+
+    def load_schema(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                    relationships=True, positions=None, highlight=None, pinned=None):
+        """schema 为 Schema 或 DiagramModel；positions 为预先算好的 {表名: (x, y)}（例如差异图沿用旧版本的位置）；
+        highlight 为 {表名: (表状态, {列名: 列状态})}，按 DIFF_COLORS 着色；
+        pinned 为之前 neato 布局得到的 {节点ID: "x,y"}（单位为点），给出时各节点直接放在该位置，
+        须以 neato -n2 渲染，缺少位置的节点数记在 self.unpinned"""
+        model = as_model(schema)
+        # 单位为英寸；每张表连同字段环约占 2*field_radius+1 英寸
+        if positions is None:
+            with timed('layout'):
+                table_layout = model.layout(layout, table_radius, node_size=2 * field_radius + 1)
+        else:
+            table_layout = TableLayout.from_positions(model.names, positions)
+        highlight = highlight or {}
+        self.pinned = pinned
+        self.unpinned = 0
+        if layout != 'circle' or pinned is not None:
+            # 预先计算的布局已保证表之间不重叠，无需 neato 再缩放
+            self.dot.graph_attr['overlap'] = 'true'
+        
+        with timed('dot'):
+            for i, table_name in enumerate(model.names):
+                # Graphviz 的 y 轴向上，布局坐标的 y 轴向下
+                table_x, table_y = table_layout[i]
+                table_y = -table_y
+            
+                table_status, column_status = highlight.get(table_name, (None, {}))
+                self.dot.node(table_name, table_name, 
+                             pos=self.node_pos(table_name, table_x, table_y),
+                             fontname='Microsoft YaHei',
+                             **diff_style(table_status))
+            
+                field_names, field_types = model.columns(i)
+                field_count = len(field_names)
+                angle_step = 360 / field_count if field_count else 0
+            
+                for j, field_name in enumerate(field_names):
+                    field_type = field_types[j]
+                
+                    field_angle = j * angle_step
+                    field_x = table_x + field_radius * math.cos(math.radians(field_angle))
+                    field_y = table_y + field_radius * math.sin(math.radians(field_angle))
+                
+                    field_node_name = f"{table_name}_{field_name}"
+                    field_label = f"{field_name}\n{field_type}" if show_type else field_name
+                
+                    self.dot.node(field_node_name, 
+                                field_label,
+                                shape='ellipse',
+                                pos=self.node_pos(field_node_name, field_x, field_y),
+                                fontname='Microsoft YaHei',
+                                **diff_style(column_status.get(field_name,
+                                                               None if table_status == ALTERED else table_status)))
+                
+                    self.dot.edge(table_name, field_node_name)
+            if relationships:
+                self.add_relationships(model, table_layout, field_radius)
+
+    def add_relationships(self, model, table_layout, field_radius=2):
+        """为表之间的关系添加菱形节点和标注基数的连线"""
+        for i, relation in enumerate(model.relations):
+            parent_x, parent_y = table_layout[relation.parent_index]
+            child_x, child_y = table_layout[relation.child_index]
+            rel_x = (parent_x + child_x) / 2
+            rel_y = -(parent_y + child_y) / 2
+            if relation.parent == relation.child:
+                # 自引用关系放在表的右上方，避免与表重叠
+                rel_x += field_radius
+                rel_y += field_radius
+            
+            rel_node_name = f"__rel_{i}"
+            self.dot.node(rel_node_name,
+                          relation.label,
+                          shape='diamond',
+                          pos=self.node_pos(rel_node_name, rel_x, rel_y),
+                          fontname='Microsoft YaHei')
+            self.dot.edge(relation.parent, rel_node_name, label=relation.parent_cardinality)
+            self.dot.edge(rel_node_name, relation.child, label=relation.child_cardinality,
+                          style='dashed' if relation.inferred else 'solid')
+
+    def node_pos(self, name, x, y):
+        """节点的 pos 属性：有 pinned 时取之前布局的位置，否则固定在计算出的坐标（英寸）"""
+        if self.pinned is None:
+            return f"{x},{y}!"
+        pos = self.pinned.get(name)
+        if pos is None:
+            self.unpinned += 1
+            return f"{x},{y}!"
+        return pos
+
+    def pipe(self, format='png'):
+        """通过stdin/stdout与布局引擎交互，直接返回图片字节，不产生临时文件"""
+        try:
+            return self.dot.pipe(format=format)
+        except Exception as e:
+            raise Exception(f"Graphviz错误: {str(e)}")
+
+    def generate(self, output_file='er_diagram', format='png', view=False):
+        """渲染到文件并返回文件路径；view=True 时用系统默认程序打开（桌面版）"""
+        try:
+            # 确保输出目录存在
+            output_dir = os.path.dirname(output_file)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            
+            # 生成图片
+            result = self.dot.render(output_file, format=format, cleanup=True, view=view)
+            
+            # 验证输出文件是否存在
+            if not os.path.exists(result):
+                raise Exception("图片生成失败")
+                
+            return result
+        except Exception as e:
+            raise Exception(f"Graphviz错误: {str(e)}")
@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+import signal
+import threading
+
+# gunicorn 配置：在项目目录下运行 `gunicorn` 即可，参数可用环境变量调整（见 README "生产部署"）
+
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('SQL2ER_BIND', '0.0.0.0:8000')
+# 实时预览会话和异步任务保存在工作进程的内存中，后续的改动上传和状态查询必须回到同一进程，
+# 因此默认只用一个工作进程；neato 在子进程中运行，单个工作进程的渲染调度器即可用满所有核
+workers = int(os.environ.get('SQL2ER_WORKERS', 1))
+# 每个工作进程用多个线程处理请求，等待 neato 时不占用 CPU
+worker_class = 'gthread'
+threads = int(os.environ.get('SQL2ER_THREADS', 8))
+# 在主进程中导入应用、完成启动检查与预热，工作进程 fork 后以写时复制共享
+preload_app = True
+# 收到 SIGTERM 后等待进行中的请求、异步任务和渲染完成的最长时间（秒）
+graceful_timeout = int(os.environ.get('SQL2ER_GRACEFUL_TIMEOUT', 90))
+keepalive = 5
+
+# 每个工作进程各有一个渲染调度器，默认让所有进程的 neato 并发数之和约等于 CPU 核数
+os.environ.setdefault('SQL2ER_RENDER_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def post_worker_init(worker):
+    # 收到 SIGTERM 时先把 /ready 切换为 503，结束实时预览的事件流（否则这些长连接会一直占住退出等待时间），
+    # 再交给 gunicorn 停止接受新连接。关闭会话要取锁，放到单独的线程中做，不在信号处理函数里等待
+    from app import live_sessions, readiness
+    handle_exit = worker.handle_exit
+
+    def handle_term(sig, frame):
+        readiness.draining = True
+        threading.Thread(target=live_sessions.shutdown, name='live-session-shutdown', daemon=True).start()
+        handle_exit(sig, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_exit(server, worker):
+    # 进行中的请求已处理完，再等待后台异步任务与渲染调度器中的任务
+    from app import drain
+    drain()
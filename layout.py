@@ -0,0 +1,425 @@
+import math
+from collections import defaultdict, deque
+
+# 可选的布局方式
+#   circle       所有表排在一个圆上（原有行为）
+#   grid         按关系连通分量排序后紧凑排成网格
+#   force        力导向布局，斥力用四叉树（Barnes-Hut）近似，O(n log n)；各连通分量分别布局后逐行排放
+#   hierarchical 按表之间的引用关系分层，被引用的表在上方
+LAYOUT_MODES = ('circle', 'grid', 'force', 'hierarchical')
+
+
+def relationship_edges(schema):
+    """返回表之间去重后的 (子表, 父表) 边列表，包括由同名列推断出的关系"""
+    edges = []
+    seen = set()
+    for relation in schema.relationships():
+        if relation.parent == relation.child:
+            continue
+        if (relation.child, relation.parent) not in seen:
+            seen.add((relation.child, relation.parent))
+            edges.append((relation.child, relation.parent))
+    return edges
+
+
+def compute_layout(schema, mode='circle', table_radius=6, node_size=5, edges=None):
+    """计算每张表的中心坐标
+
+    坐标采用屏幕方向（y 轴向下），单位由调用方决定；node_size 是一张表连同
+    字段环所占的直径，grid/force/hierarchical 布局保证表中心间距不小于它。
+    返回 {表名: (x, y)}。
+    """
+    names = schema.table_names()
+    if mode not in LAYOUT_MODES:
+        raise ValueError(f"未知的布局方式: {mode}")
+    if not names:
+        return {}
+    if edges is None and mode != 'circle':
+        edges = relationship_edges(schema)
+
+    if mode == 'circle':
+        return circle_layout(names, table_radius)
+    if mode == 'grid':
+        return grid_layout(_connected_order(names, edges), node_size)
+    if mode == 'force':
+        return force_layout(names, edges, node_size)
+    return hierarchical_layout(names, edges, node_size)
+
+
+def circle_layout(names, radius):
+    count = len(names)
+    angle_step = 360 / count if count > 1 else 0
+    positions = {}
+    for i, name in enumerate(names):
+        angle = math.radians(i * angle_step)
+        positions[name] = (radius * math.cos(angle), radius * math.sin(angle))
+    return positions
+
+
+def grid_layout(names, node_size, columns=None):
+    count = len(names)
+    columns = columns or max(1, math.ceil(math.sqrt(count)))
+    rows = math.ceil(count / columns)
+    offset_x = (columns - 1) * node_size / 2
+    offset_y = (rows - 1) * node_size / 2
+    positions = {}
+    for i, name in enumerate(names):
+        row, col = divmod(i, columns)
+        positions[name] = (col * node_size - offset_x, row * node_size - offset_y)
+    return positions
+
+
+def _adjacency(names, edges):
+    neighbours = defaultdict(list)
+    for child, parent in edges or ():
+        neighbours[child].append(parent)
+        neighbours[parent].append(child)
+    return neighbours
+
+
+def _components(names, edges):
+    """连通分量列表，每个分量内按广度优先顺序排列"""
+    neighbours = _adjacency(names, edges)
+    visited = set()
+    components = []
+    for name in names:
+        if name in visited:
+            continue
+        visited.add(name)
+        order = []
+        queue = deque([name])
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for other in neighbours.get(current, ()):
+                if other not in visited:
+                    visited.add(other)
+                    queue.append(other)
+        components.append(order)
+    return components
+
+
+def _connected_order(names, edges):
+    """按连通分量做广度优先遍历，使有关系的表在顺序上相邻"""
+    return [name for members in _components(names, edges) for name in members]
+
+
+class _Quad:
+    """Barnes-Hut 四叉树节点"""
+    __slots__ = ('cx', 'cy', 'half', 'mass', 'mx', 'my', 'children', 'index')
+
+    def __init__(self, cx, cy, half):
+        self.cx = cx
+        self.cy = cy
+        self.half = half
+        self.mass = 0
+        self.mx = 0.0
+        self.my = 0.0
+        self.children = None
+        self.index = -1
+
+
+def _build_quadtree(xs, ys):
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+    half = max(max_x - min_x, max_y - min_y) / 2 + 1
+    root = _Quad((min_x + max_x) / 2, (min_y + max_y) / 2, half)
+    for i in range(len(xs)):
+        _insert(root, i, xs[i], ys[i])
+    _finalize(root)
+    return root
+
+
+def _insert(root, index, x, y):
+    node = root
+    while True:
+        if node.children is None:
+            if node.mass == 0:
+                node.mass = 1
+                node.mx = x
+                node.my = y
+                node.index = index
+                return
+            if node.half < 1e-6:
+                node.mass += 1
+                node.mx += x
+                node.my += y
+                return
+            # 叶子中已有一个点：分裂后把旧点下沉
+            ox, oy, old = node.mx, node.my, node.index
+            h = node.half / 2
+            node.children = [_Quad(node.cx - h, node.cy - h, h), _Quad(node.cx + h, node.cy - h, h),
+                             _Quad(node.cx - h, node.cy + h, h), _Quad(node.cx + h, node.cy + h, h)]
+            node.index = -1
+            child = node.children[(1 if ox >= node.cx else 0) + (2 if oy >= node.cy else 0)]
+            child.mass = 1
+            child.mx = ox
+            child.my = oy
+            child.index = old
+        node.mass += 1
+        node.mx += x
+        node.my += y
+        node = node.children[(1 if x >= node.cx else 0) + (2 if y >= node.cy else 0)]
+
+
+def _finalize(node):
+    """把质量加权和换算成质心坐标"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.mass:
+            current.mx /= current.mass
+            current.my /= current.mass
+        if current.children is not None:
+            # 去掉空的子象限，遍历时不必再判断
+            current.children = [c for c in current.children if c.mass]
+            stack.extend(current.children)
+
+
+def _repulsion(root, index, x, y, k2, theta2):
+    fx = fy = 0.0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        dx = x - node.mx
+        dy = y - node.my
+        dist2 = dx * dx + dy * dy
+        if node.children is None:
+            if node.index == index and node.mass == 1:
+                continue
+        elif 4 * node.half * node.half >= theta2 * dist2:
+            stack.extend(node.children)
+            continue
+        if dist2 < 1e-9:
+            # 重合点给一个确定的小偏移
+            dx, dy, dist2 = 0.01 * ((index % 7) - 3 or 1), 0.01, 0.0002
+        force = k2 * node.mass / dist2
+        fx += dx * force
+        fy += dy * force
+    return fx, fy
+
+
+def force_layout(names, edges, node_size, iterations=None, theta=1.0, gravity=1.0):
+    """Fruchterman-Reingold 力导向布局，斥力由四叉树近似
+
+    各连通分量分别布局，再按包围盒逐行排放（见 pack_components）：不相连的表之间没有引力，
+    放在一起计算时只会被斥力越推越远，画布比网格布局大上百倍。分量内另加指向重心的引力 gravity，
+    长链、星形等稀疏结构也收拢成大致方形，而不是铺成一条长线。
+    """
+    count = len(names)
+    if count == 1:
+        return {names[0]: (0.0, 0.0)}
+
+    components = _components(names, edges)
+    component_of = {name: i for i, members in enumerate(components) for name in members}
+    component_edges = [[] for _ in components]
+    for a, b in edges or ():
+        if a in component_of and component_of[a] == component_of.get(b):
+            component_edges[component_of[a]].append((a, b))
+
+    layouts = []
+    for members, member_edges in zip(components, component_edges):
+        if len(members) == 1:
+            layouts.append({members[0]: (0.0, 0.0)})
+        else:
+            layouts.append(_force_component(members, member_edges, node_size, iterations, theta, gravity))
+    positions = pack_components(layouts, node_size)
+    return {name: positions[name] for name in names}
+
+
+def _force_component(names, edges, node_size, iterations, theta, gravity):
+    """一个连通分量的力导向布局"""
+    count = len(names)
+    if iterations is None:
+        iterations = 50 if count <= 500 else 30 if count <= 5000 else 15
+
+    index = {name: i for i, name in enumerate(names)}
+    edge_pairs = [(index[a], index[b]) for a, b in edges]
+
+    # 以广度优先顺序的网格作为初始位置，相关的表一开始就彼此靠近
+    k = node_size * 1.5
+    start = grid_layout(names, k)
+    xs = [start[name][0] for name in names]
+    ys = [start[name][1] for name in names]
+
+    k2 = k * k
+    theta2 = theta * theta
+    temperature = k * math.sqrt(count) / 4
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        root = _build_quadtree(xs, ys)
+        cx = sum(xs) / count
+        cy = sum(ys) / count
+        dxs = [0.0] * count
+        dys = [0.0] * count
+        for i in range(count):
+            fx, fy = _repulsion(root, i, xs[i], ys[i], k2, theta2)
+            # 指向重心的引力与距离成正比，与斥力平衡时分量的半径约为 k * sqrt(count / gravity) / 2
+            dxs[i] = fx - gravity * 4 * (xs[i] - cx)
+            dys[i] = fy - gravity * 4 * (ys[i] - cy)
+        for a, b in edge_pairs:
+            dx = xs[a] - xs[b]
+            dy = ys[a] - ys[b]
+            dist = math.sqrt(dx * dx + dy * dy) or 0.01
+            force = dist / k
+            dxs[a] -= dx * force
+            dys[a] -= dy * force
+            dxs[b] += dx * force
+            dys[b] += dy * force
+        for i in range(count):
+            length = math.sqrt(dxs[i] * dxs[i] + dys[i] * dys[i])
+            if length > 0:
+                step = min(length, temperature) / length
+                xs[i] += dxs[i] * step
+                ys[i] += dys[i] * step
+        temperature -= cooling
+
+    remove_overlaps(xs, ys, node_size)
+    return _centered(names, xs, ys)
+
+
+def pack_components(layouts, node_size):
+    """把各分量的布局（{表名: 坐标}，各自以原点为中心）按包围盒从高到低逐行排放，
+    行宽取总面积的平方根，整体接近方形；分量之间留出 node_size 的间隔。返回合并后的坐标"""
+    boxes = []
+    for layout in layouts:
+        xs = [x for x, _ in layout.values()]
+        ys = [y for _, y in layout.values()]
+        boxes.append((min(xs), min(ys), max(xs) - min(xs) + node_size, max(ys) - min(ys) + node_size))
+    row_width = max(math.ceil(math.sqrt(sum(w * h for _, _, w, h in boxes)) / node_size) * node_size,
+                    max(w for _, _, w, _ in boxes))
+
+    positions = {}
+    x = y = row_height = 0.0
+    for i in sorted(range(len(layouts)), key=lambda i: -boxes[i][3]):
+        left, top, width, height = boxes[i]
+        if x > 0 and x + width > row_width + 1e-9:
+            x = 0.0
+            y += row_height
+            row_height = 0.0
+        for name, (px, py) in layouts[i].items():
+            positions[name] = (x + px - left, y + py - top)
+        x += width
+        row_height = max(row_height, height)
+    names = list(positions)
+    return _centered(names, [positions[name][0] for name in names], [positions[name][1] for name in names])
+
+
+def remove_overlaps(xs, ys, min_distance, passes=20):
+    """基于空间哈希的重叠消除：把距离小于 min_distance 的表推开"""
+    count = len(xs)
+    for _ in range(passes):
+        buckets = defaultdict(list)
+        for i in range(count):
+            buckets[(int(xs[i] // min_distance), int(ys[i] // min_distance))].append(i)
+        moved = False
+        for (bx, by), members in buckets.items():
+            for ox in (-1, 0, 1):
+                for oy in (-1, 0, 1):
+                    others = buckets.get((bx + ox, by + oy))
+                    if not others:
+                        continue
+                    for i in members:
+                        for j in others:
+                            if j <= i:
+                                continue
+                            dx = xs[j] - xs[i]
+                            dy = ys[j] - ys[i]
+                            dist = math.sqrt(dx * dx + dy * dy)
+                            if dist >= min_distance:
+                                continue
+                            if dist < 1e-9:
+                                dx, dy, dist = 1.0, 0.0, 1.0
+                            push = (min_distance - dist) / 2 / dist
+                            xs[i] -= dx * push
+                            ys[i] -= dy * push
+                            xs[j] += dx * push
+                            ys[j] += dy * push
+                            moved = True
+        if not moved:
+            break
+
+
+def _centered(names, xs, ys):
+    cx = (min(xs) + max(xs)) / 2
+    cy = (min(ys) + max(ys)) / 2
+    return {name: (xs[i] - cx, ys[i] - cy) for i, name in enumerate(names)}
+
+
+def _layers(names, edges):
+    """最长路径分层：不引用其他表的表在第0层，子表在其父表的下一层；环上的回边被忽略"""
+    parents = defaultdict(list)
+    for child, parent in edges or ():
+        parents[child].append(parent)
+    layer = {}
+    on_stack = set()
+    for name in names:
+        if name in layer:
+            continue
+        # 迭代式DFS，避免深层引用链触发递归上限
+        stack = [(name, iter(parents.get(name, ())))]
+        on_stack.add(name)
+        while stack:
+            current, it = stack[-1]
+            advanced = False
+            for parent in it:
+                if parent in layer or parent in on_stack:
+                    continue
+                on_stack.add(parent)
+                stack.append((parent, iter(parents.get(parent, ()))))
+                advanced = True
+                break
+            if advanced:
+                continue
+            stack.pop()
+            on_stack.discard(current)
+            layer[current] = 1 + max((layer[p] for p in parents.get(current, ()) if p in layer), default=-1)
+    return layer
+
+
+def hierarchical_layout(names, edges, node_size, max_row=None):
+    """分层布局：同层内按父表位置的重心排序，过宽的层折成多行；无关系的表放在最下方的网格中"""
+    neighbours = _adjacency(names, edges)
+    related = [name for name in names if neighbours.get(name)]
+    isolated = [name for name in names if not neighbours.get(name)]
+    max_row = max_row or max(4, math.ceil(math.sqrt(len(names))) * 2)
+
+    layer = _layers(related, edges)
+    by_layer = defaultdict(list)
+    for name in related:
+        by_layer[layer[name]].append(name)
+
+    parents = defaultdict(list)
+    for child, parent in edges or ():
+        parents[child].append(parent)
+
+    positions = {}
+    order = {}
+    row = 0
+    for depth in sorted(by_layer):
+        members = by_layer[depth]
+        if depth > 0:
+            # 重心法：按已排好的父表序号的平均值排序，减少连线交叉
+            def barycenter(name):
+                ranks = [order[p] for p in parents.get(name, ()) if p in order]
+                return sum(ranks) / len(ranks) if ranks else 0
+            members.sort(key=barycenter)
+        for i, name in enumerate(members):
+            order[name] = i * (max_row / max(len(members), 1))
+        for start in range(0, len(members), max_row):
+            chunk = members[start:start + max_row]
+            offset = (len(chunk) - 1) * node_size / 2
+            for i, name in enumerate(chunk):
+                positions[name] = (i * node_size - offset, row * node_size)
+            row += 1
+
+    if isolated:
+        grid = grid_layout(isolated, node_size, columns=min(max_row, len(isolated)))
+        top = min(y for _, y in grid.values())
+        for name, (x, y) in grid.items():
+            positions[name] = (x, y - top + row * node_size)
+
+    xs = [positions[name][0] for name in names]
+    ys = [positions[name][1] for name in names]
+    return _centered(names, xs, ys)
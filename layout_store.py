@@ -0,0 +1,126 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# 持久化的布局存储：保存 neato -Tdot 输出的带坐标DOT（节点位置与连线路径），
+# 以布局键（SQL或上传文件内容 + 布局参数的哈希）为键。之后无论输出PNG、SVG还是分块，
+# 都以 neato -n2 按已有坐标直接绘制，不再做布局、重叠消除和样条布线。
+# 另外按不含显示样式的键保存节点位置，只切换 show_type 时沿用原来的位置。
+
+_NUMBER = r'-?[\d.]+(?:e[-+]?\d+)?'
+_QUOTED = r'"(?:[^"\\]|\\[\s\S])*"'
+# -Tdot 输出中的节点语句：制表符缩进的节点ID后直接跟属性列表（边语句在ID之间有 -- 或 ->）
+_NODE_STATEMENT = re.compile(
+    rf'^\t(?P<id>{_QUOTED}|[^\s\[\]{{}};,="]+)\s*\[(?P<attrs>(?:[^\]"]|{_QUOTED})*)\]', re.MULTILINE)
+_POS = re.compile(rf'(?:^|[\s,\[])pos="({_NUMBER},{_NUMBER})"')
+_KEYWORDS = frozenset(['graph', 'node', 'edge', 'digraph', 'subgraph', 'strict'])
+
+
+def extract_positions(layout_source):
+    """从 neato -Tdot 的输出中读取各节点坐标（单位为点），返回 {节点ID: "x,y"}"""
+    # 旧版 Graphviz 用反斜杠加换行折断过长的行
+    layout_source = layout_source.replace('\\\n', '')
+    positions = {}
+    for m in _NODE_STATEMENT.finditer(layout_source):
+        node_id = m.group('id')
+        if node_id[0] == '"':
+            node_id = node_id[1:-1].replace('\\"', '"')
+        elif node_id.lower() in _KEYWORDS:
+            continue
+        pos = _POS.search(m.group('attrs'))
+        if pos is not None:
+            positions[node_id] = pos.group(1)
+    return positions
+
+
+class LayoutStore:
+    """以 SQLite 保存布局结果，总大小超过 max_bytes 时淘汰最久未用的条目
+
+    path 为 ':memory:' 时只在本进程内有效。文件库使用 WAL 模式，多个进程可以共用；
+    连接按进程打开，预先导入后 fork 出的工作进程（gunicorn preload_app）各自重新连接。
+    读写出错时按未命中处理，不影响渲染。
+    """
+
+    def __init__(self, path=':memory:', max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        self._pid = os.getpid()
+        self._connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        if self.path != ':memory:':
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS layouts ('
+                                 'key TEXT PRIMARY KEY, data BLOB NOT NULL, '
+                                 'size INTEGER NOT NULL, accessed REAL NOT NULL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS layouts_accessed ON layouts (accessed)')
+
+    def _check_process(self):
+        # SQLite 连接不能跨 fork 使用，子进程中第一次访问时重新打开（不关闭继承来的连接）
+        if self._pid != os.getpid():
+            self._connect()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._check_process()
+                row = self._connection.execute('SELECT data FROM layouts WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._connection.execute('UPDATE layouts SET accessed = ? WHERE key = ?', (time.time(), key))
+            except sqlite3.Error:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return bytes(row[0])
+
+    def put(self, key, data):
+        with self._lock:
+            try:
+                self._check_process()
+                self._connection.execute('INSERT OR REPLACE INTO layouts (key, data, size, accessed) '
+                                         'VALUES (?, ?, ?, ?)', (key, data, len(data), time.time()))
+                self._evict()
+            except sqlite3.Error:
+                pass
+
+    def __contains__(self, key):
+        with self._lock:
+            try:
+                self._check_process()
+                return self._connection.execute('SELECT 1 FROM layouts WHERE key = ?', (key,)).fetchone() is not None
+            except sqlite3.Error:
+                return False
+
+    def stats(self):
+        with self._lock:
+            try:
+                self._check_process()
+                entries, size = self._connection.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM layouts').fetchone()
+            except sqlite3.Error:
+                entries, size = 0, 0
+            return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _evict(self):
+        total = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM layouts').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._connection.execute('SELECT key, size FROM layouts ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany('DELETE FROM layouts WHERE key = ?', evicted)
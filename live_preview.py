@@ -0,0 +1,371 @@
+import json
+import re
+import threading
+import time
+import uuid
+
+from layout import compute_layout, relationship_edges
+from sql_parser import IncrementalSchema
+from svg_writer import POINTS_PER_INCH, STYLE, TableMarkup, bounds, relation_center, relation_markup
+
+# 网页实时预览的会话。
+# 浏览器打开一个会话后，通过 SSE（GET /live/<id>/events）接收图的更新，编辑时只上传改动的文本片段
+# （POST /live/<id>/delta）。服务器为每个会话保留 IncrementalSchema，只重新解析改动所在的语句；
+# 推送的 patch 只包含定义有变化的表（其 SVG 片段以表中心为原点，与位置无关）、位置有变化的表的新坐标，
+# 以及关系或位置有变化时的关系层。编辑已有的表时 IncrementalSchema 只替换这几张表、只重新计算受影响的关系，
+# 这里也只在表的集合或关系有变化时才遍历全部的表和关系，编辑一张表时的开销与表的总数基本无关。
+# 一段时间没有编辑的会话由后台线程定时淘汰，其事件流随之结束。
+
+# 积压的事件超过这么多条（浏览器读得太慢）时丢弃，改为发送一次完整快照
+MAX_PENDING_EVENTS = 64
+# 事件流没有数据时每隔这么多秒发送一次注释行，既保持连接也能及时发现浏览器已断开
+HEARTBEAT_SECONDS = 15
+
+# 基本多文种平面之外的字符：浏览器中占两个 UTF-16 码元，Python 中只占一个下标
+_ASTRAL = re.compile('[\U00010000-\U0010FFFF]')
+
+DEFAULT_OPTIONS = {'table_radius': 6.0, 'field_radius': 2.0, 'show_type': False, 'layout': 'circle'}
+
+
+class VersionConflict(Exception):
+    """增量的基准版本与会话当前版本不一致，浏览器应改为上传全文"""
+
+    def __init__(self, version):
+        super().__init__(f"版本不一致，当前版本为 {version}")
+        self.version = version
+
+
+class LiveSessionLimit(Exception):
+    pass
+
+
+def utf16_index(text, offset, astral=True):
+    """把浏览器中字符串的下标（UTF-16 码元）换算成 Python 字符串的下标；
+    已知 text 中没有基本多文种平面之外的字符时可传 astral=False，省去查找"""
+    if not astral or _ASTRAL.search(text, 0, offset) is None:
+        return offset
+    units = 0
+    for index, ch in enumerate(text):
+        if units >= offset:
+            return index
+        units += 2 if ord(ch) > 0xFFFF else 1
+    return len(text)
+
+
+def _relation_keys(relations):
+    """关系层中用到的各关系属性，用来判断关系层是否需要重新发送"""
+    return tuple((r.child, r.parent, r.label, r.child_cardinality, r.parent_cardinality, r.inferred)
+                 for r in relations)
+
+
+def format_event(event, data):
+    """一条 SSE 消息；data 序列化为单行 JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+class LiveSession:
+    """一个浏览器标签页的实时预览状态"""
+
+    def __init__(self, options=None):
+        self.id = uuid.uuid4().hex
+        self.version = 0
+        self.last_active = time.time()
+        self.closed = False
+        self.options = dict(DEFAULT_OPTIONS, **(options or {}))
+        self._schema = IncrementalSchema()
+        self._condition = threading.Condition()
+        self._pending = []
+        self._needs_reset = True
+        self._stream = 0  # 当前事件流的序号，新的事件流连上后旧的结束
+        self._astral = False  # 文本中可能有基本多文种平面之外的字符（上传全文时重新判断）
+        self.streaming = 0  # 正在输出的事件流个数（各占一个请求线程）
+        self._reset_state()
+
+    def _reset_state(self):
+        self._markup = TableMarkup(self.options['field_radius'], self.options['show_type'])
+        self._names = ()
+        self._edges = ()
+        self._relation_keys = ()
+        self._positions = {}
+        self._extent = None  # 各表中心坐标的 (最小x, 最小y, 最大x, 最大y)
+        self._bounds = None
+
+    # 编辑
+
+    def apply(self, base, start, end, text, options=None):
+        """把上一版文本的 [start, end) 替换为 text，返回新版本号；下标按 UTF-16 码元计（即浏览器中的下标）。
+        base 不是当前版本时抛出 VersionConflict"""
+        with self._condition:
+            if base != self.version:
+                raise VersionConflict(self.version)
+            current = self._schema.text
+            if not 0 <= start <= end:
+                raise ValueError("改动范围无效")
+            start = utf16_index(current, start, self._astral)
+            end = utf16_index(current, end, self._astral)
+            if end > len(current):
+                raise ValueError("改动范围超出了文本长度")
+            self._astral = self._astral or _ASTRAL.search(text) is not None
+            return self._update(current[:start] + text + current[end:], options, (start, end))
+
+    def replace(self, text, options=None):
+        """上传全文（打开会话或版本冲突之后），返回新版本号"""
+        with self._condition:
+            self._astral = _ASTRAL.search(text) is not None
+            return self._update(text, options)
+
+    def _update(self, text, options, edit=None):
+        self.last_active = time.time()
+        changed = self._schema.update(text, edit)
+        self.version += 1
+        options = dict(self.options, **options) if options else self.options
+        if options != self.options:
+            # 参数变了，所有表的片段和位置都要重新生成
+            self.options = options
+            self._reset_state()
+            self._needs_reset = True
+        elif changed and not self._needs_reset:
+            # 等待发送完整快照时不必计算增量
+            patch = self._patch(changed)
+            if patch:
+                self._push('patch', patch)
+        if self._needs_reset:
+            self._condition.notify_all()
+        return self.version
+
+    def _push(self, event, data):
+        if len(self._pending) >= MAX_PENDING_EVENTS:
+            self._pending = []
+            self._needs_reset = True
+        else:
+            data['version'] = self.version
+            self._pending.append((event, data))
+        self._condition.notify_all()
+
+    # 生成图的片段
+
+    def _table_fragment(self, table):
+        names = [column.name for column in table.columns]
+        definitions = [column.definition for column in table.columns]
+        return [self._markup.edges(len(names)), self._markup.nodes(table.name, names, definitions)]
+
+    def _layout(self, schema, edges):
+        options = self.options
+        positions = compute_layout(schema, options['layout'], options['table_radius'],
+                                   node_size=2 * options['field_radius'] + 1, edges=list(edges))
+        return {name: (round(x * POINTS_PER_INCH), round(y * POINTS_PER_INCH)) for name, (x, y) in positions.items()}
+
+    def _relations(self, relations):
+        positions = self._positions
+        ring = self._markup.ring
+        items = []
+        for relation in relations:
+            parent = positions[relation.parent]
+            child = positions[relation.child]
+            items.append((relation, parent, child, relation_center(relation, parent, child, ring)))
+        return list(relation_markup(items, self._markup.sizes))
+
+    def _patch(self, changed):
+        """与上次推送相比的变化；没有可见变化时返回 None"""
+        schema = self._schema.schema
+        relations_changed = self._schema.relations_changed
+        # 只替换了几张表时表的集合和顺序不变；关系也没变时不必遍历全部的关系
+        names = tuple(schema.table_names()) if relations_changed is None else self._names
+        if relations_changed is None or relations_changed:
+            edges = tuple(relationship_edges(schema))
+            relation_keys = _relation_keys(schema.relationships())
+        else:
+            edges = self._edges
+            relation_keys = self._relation_keys
+        patch = {}
+
+        moved = {}
+        if names != self._names or edges != self._edges:
+            # 表的集合、顺序或表之间的引用有变化时才重新布局
+            self._set_positions(self._layout(schema, edges), moved)
+            self._names = names
+            self._edges = edges
+        if moved:
+            patch['positions'] = moved
+
+        removed = [name for name in changed if name not in self._positions]
+        if removed:
+            patch['removed'] = removed
+        tables = {name: self._table_fragment(schema.get(name)) for name in changed if name in self._positions}
+        if tables:
+            patch['tables'] = tables
+
+        if moved or relation_keys != self._relation_keys:
+            self._relation_keys = relation_keys
+            patch['relations'] = self._relations(schema.relationships())
+
+        if moved or tables:
+            box = self._box()
+            if box != self._bounds:
+                self._bounds = patch['bounds'] = box
+        return patch or None
+
+    def _set_positions(self, positions, moved=None):
+        """换成新的布局；moved 不为 None 时填入坐标有变化的表"""
+        if moved is not None:
+            moved.update((name, position) for name, position in positions.items()
+                         if self._positions.get(name) != position)
+        self._positions = positions
+        if positions:
+            xs = [x for x, _ in positions.values()]
+            ys = [y for _, y in positions.values()]
+            self._extent = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self._extent = None
+
+    def _box(self):
+        """画布范围：布局不变时只有最大的节点大小可能变化，只用各表坐标的极值计算"""
+        if self._extent is None:
+            xs = ys = []
+        else:
+            left, top, right, bottom = self._extent
+            xs, ys = (left, right), (top, bottom)
+        return [round(value) for value in bounds(xs, ys, self._markup.sizes, self._markup.ring)]
+
+    def snapshot(self):
+        """完整状态：所有表的片段、位置、关系层和画布范围"""
+        schema = self._schema.schema
+        self._reset_state()
+        self._names = tuple(schema.table_names())
+        self._edges = tuple(relationship_edges(schema))
+        relations = schema.relationships()
+        self._relation_keys = _relation_keys(relations)
+        self._set_positions(self._layout(schema, self._edges))
+        tables = {table.name: self._table_fragment(table) for table in schema}
+        self._bounds = self._box()
+        return {'version': self.version, 'style': STYLE, 'options': self.options,
+                'positions': self._positions, 'tables': tables, 'relations': self._relations(relations),
+                'bounds': self._bounds}
+
+    # 事件流
+
+    def events(self, heartbeat=HEARTBEAT_SECONDS):
+        """SSE 消息生成器：先发完整快照，之后推送 patch；会话关闭或有新的事件流连上时结束"""
+        with self._condition:
+            self.last_active = time.time()
+            self._stream += 1
+            stream = self._stream
+            self._needs_reset = True
+            self.streaming += 1
+            self._condition.notify_all()
+        try:
+            while True:
+                with self._condition:
+                    if not (self.closed or stream != self._stream or self._needs_reset or self._pending):
+                        self._condition.wait(heartbeat)
+                    if self.closed:
+                        yield format_event('closed', {'reason': '会话已结束'})
+                        return
+                    if stream != self._stream:
+                        return
+                    if self._needs_reset:
+                        self._needs_reset = False
+                        self._pending = []
+                        messages = [format_event('reset', self.snapshot())]
+                    else:
+                        messages = [format_event(event, data) for event, data in self._pending]
+                        self._pending = []
+                yield ''.join(messages) if messages else ': ping\n\n'
+        finally:
+            # 浏览器断开时服务器关闭生成器，也会走到这里
+            with self._condition:
+                self.streaming -= 1
+                self.last_active = time.time()
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class LiveSessions:
+    """实时预览会话表：超过 idle_timeout 秒没有编辑的会话由后台线程每 sweep_interval 秒清理一次
+
+    每个会话的事件流在 gthread 工作进程中一直占用一个请求线程，max_sessions 应小于每个进程的线程数，
+    留出处理普通请求（包括这些会话自己的 delta 请求）的线程。会话已满时，事件流已断开超过
+    HEARTBEAT_SECONDS 两倍时间的会话（浏览器多半已经关闭）先让出位置。
+    """
+
+    def __init__(self, max_sessions=4, idle_timeout=300, sweep_interval=30):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.evicted = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper = None
+
+    def create(self, options=None):
+        abandoned = None
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                abandoned = self._abandoned(time.time() - 2 * HEARTBEAT_SECONDS)
+                if abandoned is None:
+                    raise LiveSessionLimit("实时预览会话已满，请稍后重试")
+                del self._sessions[abandoned.id]
+                self.evicted += 1
+            session = LiveSession(options)
+            self._sessions[session.id] = session
+            # 后台线程在第一次创建会话时才启动：preload 的主进程中不创建线程，fork 出的工作进程各自启动
+            if self._sweeper is None and not self._stop.is_set():
+                self._sweeper = threading.Thread(target=self._sweep, name='live-session-sweeper', daemon=True)
+                self._sweeper.start()
+        if abandoned is not None:
+            abandoned.close()
+        return session
+
+    def _abandoned(self, deadline):
+        """没有事件流、且在 deadline 之前就已不活动的会话中最久未用的一个"""
+        candidates = [session for session in self._sessions.values()
+                      if not session.streaming and session.last_active < deadline]
+        return min(candidates, key=lambda session: session.last_active, default=None)
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session
+
+    def evict_idle(self, now=None):
+        """关闭并移除空闲超时的会话，返回移除的个数"""
+        deadline = (now or time.time()) - self.idle_timeout
+        with self._lock:
+            idle = [session for session in self._sessions.values() if session.last_active < deadline]
+            for session in idle:
+                del self._sessions[session.id]
+            self.evicted += len(idle)
+        for session in idle:
+            session.close()
+        return len(idle)
+
+    def _sweep(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.evict_idle()
+
+    def shutdown(self):
+        """停止清理线程并关闭所有会话，各事件流随之结束"""
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def stats(self):
+        with self._lock:
+            return {'sessions': len(self._sessions), 'evicted': self.evicted}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
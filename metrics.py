@@ -0,0 +1,206 @@
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """进程内的计数器与直方图，按 Prometheus 文本格式输出
+
+    指标名在输出时加上 prefix 前缀；add_collector 注册的函数在每次抓取时调用，
+    用来导出缓存命中数、队列长度等由其他组件维护的当前值。
+    """
+
+    def __init__(self, prefix='sql2er', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._meta = {}  # 指标名 -> (类型, 说明)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text)
+
+    def histogram(self, name, help_text):
+        self._meta[name] = ('histogram', help_text)
+
+    def add_collector(self, collect):
+        """collect() 返回 [(指标名, 类型, 说明, [(标签字典, 值)])]"""
+        self._collectors.append(collect)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram.counts[i] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h.counts), h.sum, h.count)) for key, h in self._histograms.items())
+
+        described = set()
+
+        def describe(name, kind, help_text):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for (name, key), value in counters:
+            kind, help_text = self._meta.get(name, ('counter', name))
+            describe(name, kind, help_text)
+            lines.append(f"{self.prefix}_{name}{_format_labels(key)} {_format_value(value)}")
+        for (name, key), (counts, total, count) in histograms:
+            kind, help_text = self._meta.get(name, ('histogram', name))
+            describe(name, kind, help_text)
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.prefix}_{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} "
+                             f"{bucket_count}")
+            lines.append(f"{self.prefix}_{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.prefix}_{name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.prefix}_{name}_count{_format_labels(key)} {count}")
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                describe(name, kind, help_text)
+                for labels, value in samples:
+                    lines.append(f"{self.prefix}_{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+registry.histogram('phase_seconds', '各处理阶段耗时（parse/layout/dot/render/io/drawio）')
+registry.histogram('request_seconds', '请求处理耗时')
+registry.counter('requests_total', '请求数')
+registry.counter('response_bytes_total', '非流式响应的字节数')
+registry.counter('tables_total', '解析出的表数量')
+registry.counter('fields_total', '解析出的字段数量')
+registry.counter('edges_total', '解析出的表间关系数量')
+registry.counter('skipped_statements_total', '无法解析而跳过的建表语句数量')
+registry.counter('render_bytes_total', 'Graphviz 输出的字节数')
+registry.counter('partitions_total', '分区导出划分出的分区数')
+
+# 当前线程正在处理的请求的阶段耗时，供 Server-Timing 响应头使用
+_local = threading.local()
+
+
+def start_request():
+    _local.phases = []
+
+
+def finish_request():
+    phases = getattr(_local, 'phases', None)
+    _local.phases = None
+    return phases or []
+
+
+@contextmanager
+def timed(phase):
+    """计时一个处理阶段：记入直方图，并在请求线程中记入本次请求的阶段列表"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('phase_seconds', elapsed, phase=phase)
+        phases = getattr(_local, 'phases', None)
+        if phases is not None:
+            phases.append((phase, elapsed))
+
+
+def record_schema(schema):
+    registry.inc('tables_total', len(schema))
+    registry.inc('fields_total', sum(len(table.columns) for table in schema))
+    registry.inc('edges_total', len(schema.relationships()))
+    if schema.errors:
+        registry.inc('skipped_statements_total', len(schema.errors))
+
+
+def server_timing(phases, total=None):
+    """把阶段耗时合并成 Server-Timing 头的值，同名阶段累加"""
+    merged = {}
+    for phase, elapsed in phases:
+        merged[phase] = merged.get(phase, 0.0) + elapsed
+    parts = [f"{phase};dur={elapsed * 1000:.1f}" for phase, elapsed in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(parts)
+
+
+class SlowRequestProfiler:
+    """对每个请求启用 cProfile，耗时超过 threshold 秒的请求把统计结果写入 directory
+
+    cProfile 只统计请求所在线程，渲染工作线程里的 neato 等待时间表现为请求线程中的阻塞。
+    """
+
+    def __init__(self, directory, threshold=1.0):
+        self.directory = directory
+        self.threshold = threshold
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 同一线程上已有其他分析器在运行
+            return None
+        return profile
+
+    def stop(self, profile, elapsed, name):
+        """停止分析；超过阈值时写出 .prof 文件并返回路径"""
+        if profile is None:
+            return None
+        profile.disable()
+        if elapsed < self.threshold:
+            return None
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+        path = os.path.join(self.directory,
+                            f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{int(elapsed * 1000)}ms.prof")
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,281 @@
+import itertools
+import json
+import re
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import graphviz
+
+from drawio_writer import GRAPH_MODEL_FOOTER, GRAPH_MODEL_HEADER, DrawioGenerator, edge_cell, iter_pages, vertex_cell
+from layout import LAYOUT_MODES, grid_layout
+from table_bundle import _STORED_FORMATS, BundleCancelled, neighbour_map, safe_filename
+
+# 大表结构的分区渲染。
+# 几千张表放在一个 graphviz.Graph 里时，一个 neato 进程要同时容纳全部节点，输出的图片也大得无法查看，
+# 容器很容易因内存不足被杀掉。这里先把表分成若干区，每区单独布局、单独渲染（可并行，并发数由内存预算决定），
+# 每个 neato 进程的内存只与该区的大小有关。分区方式：
+#   components 按外键关系的连通分量，相关的表在同一区
+#   prefix     按表名前缀（有 schema 名时按 schema 名）
+#   size       只按大小，依关系顺序切分
+# 超过上限的分组按关系顺序（广度优先）切开，相关的表尽量留在同一块；过小的分组按顺序合并，
+# 避免几千张孤立的表各占一页。结果可以是多页的 Draw.io 文件，也可以是一组图片加总览图。
+PARTITION_STRATEGIES = ('components', 'prefix', 'size')
+
+# 每区默认的表数上限与节点数上限（表、字段、关系菱形各算一个节点）
+DEFAULT_MAX_TABLES = 150
+DEFAULT_MAX_NODES = 3000
+
+_PREFIX_SEPARATOR = re.compile(r'[_$.\-]')
+
+# 总览页中分区方框的大小与间距
+_OVERVIEW_BOX = (200, 60)
+_OVERVIEW_SPACING = 320
+
+
+class Partition:
+    """一个分区：名称（用于页名、文件名）、表名列表与估计的节点数"""
+    __slots__ = ('name', 'tables', 'nodes')
+
+    def __init__(self, name, tables, nodes):
+        self.name = name
+        self.tables = tables
+        self.nodes = nodes
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        return f"Partition({self.name!r}, {len(self.tables)} tables, {self.nodes} nodes)"
+
+
+def table_prefix(table):
+    """表名前缀：有 schema 名时取 schema 名，否则取第一个 _ . $ - 之前的部分"""
+    if table.schema_name:
+        return table.schema_name
+    return _PREFIX_SEPARATOR.split(table.name, 1)[0] or table.name
+
+
+def _components(names, neighbours, within=None):
+    """连通分量，每个分量内按广度优先顺序排列，分量按首张表在表结构中的顺序排列；
+    给出 within 时只沿 within 中的表扩展"""
+    visited = set()
+    groups = []
+    for name in names:
+        if name in visited:
+            continue
+        visited.add(name)
+        order = []
+        queue = deque([name])
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for other in sorted(neighbours.get(current, ())):
+                if other not in visited and (within is None or other in within):
+                    visited.add(other)
+                    queue.append(other)
+        groups.append((name, order))
+    return groups
+
+
+def _grouped(schema, strategy, neighbours):
+    """按分区方式得到 [(分组名, 表名列表)]"""
+    names = schema.table_names()
+    if strategy == 'components':
+        return _components(names, neighbours)
+    if strategy == 'prefix':
+        groups = {}
+        for table in schema:
+            groups.setdefault(table_prefix(table), []).append(table.name)
+        # 组内按关系顺序排列，切分时相关的表尽量在同一块
+        return [(prefix, [name for _, order in _components(members, neighbours, set(members)) for name in order])
+                for prefix, members in groups.items()]
+    if strategy == 'size':
+        return [('', [name for _, order in _components(names, neighbours) for name in order])]
+    raise ValueError(f"未知的分区方式: {strategy}")
+
+
+def partition_schema(schema, strategy='components', max_tables=DEFAULT_MAX_TABLES, max_nodes=DEFAULT_MAX_NODES):
+    """把表结构分成若干区，每区不超过 max_tables 张表、约 max_nodes 个节点，返回 Partition 列表"""
+    if max_tables < 1 or max_nodes < 1:
+        raise ValueError("分区大小必须大于 0")
+    neighbours = neighbour_map(schema)
+    weights = {table.name: 1 + len(table.columns) + len(neighbours.get(table.name, ())) for table in schema}
+
+    # 超过上限的分组按顺序切开
+    pieces = []
+    for key, members in _grouped(schema, strategy, neighbours):
+        chunk = []
+        nodes = 0
+        part = 1
+        for name in members:
+            if chunk and (len(chunk) >= max_tables or nodes + weights[name] > max_nodes):
+                pieces.append((f"{key} ({part})" if key else '', chunk, nodes))
+                chunk, nodes = [], 0
+                part += 1
+            chunk.append(name)
+            nodes += weights[name]
+        if chunk:
+            pieces.append((f"{key} ({part})" if key and part > 1 else key, chunk, nodes))
+
+    # 过小的块按顺序合并
+    partitions = []
+    keys = []
+    tables = []
+    nodes = 0
+    for key, chunk, chunk_nodes in pieces:
+        if tables and (len(tables) + len(chunk) > max_tables or nodes + chunk_nodes > max_nodes):
+            partitions.append(Partition(_partition_name(keys, tables, len(partitions)), tables, nodes))
+            keys, tables, nodes = [], [], 0
+        keys.append(key)
+        tables = tables + chunk
+        nodes += chunk_nodes
+    if tables:
+        partitions.append(Partition(_partition_name(keys, tables, len(partitions)), tables, nodes))
+    return partitions
+
+
+def _partition_name(keys, tables, index):
+    """分区名：序号加上分组名（合并多个分组时列出前三个），size 方式为首张表的名字"""
+    keys = [key for key in keys if key]
+    if not keys:
+        label = tables[0]
+    elif len(keys) <= 3:
+        label = ', '.join(keys)
+    else:
+        label = f"{', '.join(keys[:3])} 等 {len(keys)} 组"
+    return f"{index + 1:03d} {label}"
+
+
+def cross_links(schema, partitions):
+    """分区之间的关系数：{(序号a, 序号b): 数量}，a < b"""
+    owner = {}
+    for index, partition in enumerate(partitions):
+        for name in partition.tables:
+            owner[name] = index
+    links = Counter()
+    for relation in schema.relationships():
+        a, b = owner.get(relation.child), owner.get(relation.parent)
+        if a is None or b is None or a == b:
+            continue
+        links[(min(a, b), max(a, b))] += 1
+    return links
+
+
+def partition_files(partitions, format):
+    """各分区图片在压缩包中的文件名"""
+    used = set()
+    files = []
+    for partition in partitions:
+        base = safe_filename(partition.name)
+        if base.casefold() in used:
+            base = f"{base}_{len(used)}"
+        used.add(base.casefold())
+        files.append(f"{base}.{format}")
+    return files
+
+
+def overview_graph(partitions, links, files=None):
+    """总览图：每个分区一个节点（标出表数），分区之间的连线标出关系数；给出 files 时 SVG 中的节点链接到各区的图片"""
+    dot = graphviz.Graph('overview', engine='neato',
+                         graph_attr={'overlap': 'false', 'splines': 'true', 'sep': '+20', 'charset': 'utf8'})
+    dot.attr('node', shape='box', style='rounded', fontname='Microsoft YaHei')
+    for index, partition in enumerate(partitions):
+        attributes = {'href': files[index]} if files else {}
+        dot.node(f"p{index}", f"{partition.name}\n{len(partition.tables)} 张表", **attributes)
+    for (a, b), count in sorted(links.items()):
+        dot.edge(f"p{a}", f"p{b}", label=str(count), penwidth=str(min(1 + count / 5, 6)))
+    return dot
+
+
+def overview_cells(partitions, links):
+    """Draw.io 总览页：每个分区一个方框，按网格排列，分区之间的连线标出关系数"""
+    yield GRAPH_MODEL_HEADER
+    width, height = _OVERVIEW_BOX
+    positions = grid_layout(range(len(partitions)), _OVERVIEW_SPACING)
+    for index, partition in enumerate(partitions):
+        x, y = positions[index]
+        yield vertex_cell(f"p{index}", f"{partition.name}\n{len(partition.tables)} 张表",
+                          "rounded=1;whiteSpace=wrap;html=1;", round(x), round(y), width, height)
+    for (a, b), count in sorted(links.items()):
+        yield edge_cell(f"link_{a}_{b}", f"p{a}", f"p{b}", value=count)
+    yield GRAPH_MODEL_FOOTER
+
+
+def iter_partitioned_drawio(schema, partitions, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                            relationships=True, compressed=False):
+    """多页的 Draw.io 文件：第一页为总览，之后每个分区一页。
+
+    各页单独布局，跨分区的关系不画在页内，只在总览页中标出数量。生成器，某一页的子表结构和布局
+    在输出到该页时才计算，内存占用取决于最大的分区而不是整个表结构。
+    """
+    # 布局方式错误在开始输出之前报告
+    if layout not in LAYOUT_MODES:
+        raise ValueError(f"未知的布局方式: {layout}")
+    pages = ((partition.name, DrawioGenerator().iter_cells(schema.subset(partition.tables), table_radius,
+                                                            field_radius, show_type, layout, relationships))
+             for partition in partitions)
+    overview = ('总览', overview_cells(partitions, cross_links(schema, partitions)))
+    return iter_pages(itertools.chain([overview], pages), compressed)
+
+
+def render_partitions(schema, partitions, render_partition, max_workers=2, cancel_check=None):
+    """按顺序产出 (序号, render_partition(子Schema) 的结果)
+
+    各分区在线程池中并行渲染，同时在途的分区数不超过 max_workers 的两倍，已完成未取走的结果不会堆积；
+    cancel_check() 为真时取消尚未开始的分区并抛出 BundleCancelled。
+    """
+    window = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='partition') as executor:
+        pending = deque()
+        remaining = iter(enumerate(partitions))
+        try:
+            while True:
+                for index, partition in remaining:
+                    pending.append((index, executor.submit(render_partition, schema.subset(partition.tables))))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                if cancel_check is not None and cancel_check():
+                    raise BundleCancelled("导出已取消")
+                index, future = pending.popleft()
+                yield index, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def partition_index(partitions, links, files, overview):
+    """index.json 的内容：每个分区的名称、各格式的文件名、表名以及与其他分区之间的关系数；
+    files 为 {格式: 各分区文件名列表}，overview 为 {格式: 总览图文件名}"""
+    return {
+        'partitions': [{'name': partition.name,
+                        'files': {fmt: names[i] for fmt, names in files.items()},
+                        'tables': partition.tables,
+                        'links': {partitions[b if a == i else a].name: count
+                                  for (a, b), count in sorted(links.items()) if i in (a, b)}}
+                       for i, partition in enumerate(partitions)],
+        'overview': overview,
+    }
+
+
+def write_partition_bundle(fileobj, schema, partitions, format, render_partition, render_overview,
+                           max_workers=2, cancel_check=None):
+    """把各分区的图片、总览图和 index.json 写入zip，返回分区数
+
+    render_partition(子Schema) 返回一个分区的图片字节，由 render_partitions 并行调用；
+    render_overview(graphviz.Graph) 渲染总览图。
+    """
+    files = partition_files(partitions, format)
+    links = cross_links(schema, partitions)
+    compress_type = zipfile.ZIP_STORED if format in _STORED_FORMATS else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for index, data in render_partitions(schema, partitions, render_partition, max_workers, cancel_check):
+            archive.writestr(files[index], data, compress_type=compress_type)
+        overview = f"overview.{format}"
+        archive.writestr(overview, render_overview(overview_graph(partitions, links, files)),
+                         compress_type=compress_type)
+        index = partition_index(partitions, links, {format: files}, {format: overview})
+        archive.writestr('index.json', json.dumps(index, ensure_ascii=False, indent=2))
+    return len(partitions)
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from dialects import sniff_dialect
+
+# 压缩后会改变的空白：连续的空白或空格、换行以外的空白字符；不含这些的字符串等结构无需单独保留
+_LOOSE_SPACE = re.compile(r'\s\s|[^\S \n]')
+# [标识符] 不由 chunk_literal 单独切出，压缩空白时整体跳过
+_BRACKET_IDENT = re.compile(r'(\[[^\]]*(?:\]\][^\]]*)*\])')
+
+# 最近一次规范化的 (原文, 结果)：同一请求的图片、布局和节点位置缓存键规范化的是同一段SQL
+_last_normalized = (None, None)
+
+
+def _collapse_space(text, brackets=False):
+    """含换行的空白压缩为一个换行（-- 注释、SQL Server 的 GO 以及方言识别都按行判断），其余压缩为一个空格"""
+    if brackets and '[' in text:
+        pieces = _BRACKET_IDENT.split(text)
+        pieces[::2] = [_collapse_space(piece) for piece in pieces[::2]]
+        return ''.join(pieces)
+    core = '\n'.join(filter(None, [' '.join(line.split()) for line in text.split('\n')]))
+    stripped = text.lstrip()
+    if not stripped:
+        return '\n' if '\n' in text else (' ' if text else '')
+    # 两端的空白也保留一个，与相邻的字符串等结构之间是否有分隔不变（例如 N 'x' 与 N'x'）
+    head = text[:len(text) - len(stripped)]
+    tail = text[len(text.rstrip()):]
+    if head:
+        core = ('\n' if '\n' in head else ' ') + core
+    if tail:
+        core += '\n' if '\n' in tail else ' '
+    return core
+
+
+def normalize_sql(sql_content):
+    """压缩空白，使仅有缩进/换行差异的SQL得到相同的缓存键
+
+    按解析时识别出的方言切分词法结构，字符串、引号标识符、注释和 $tag$ 引用体原样保留，
+    只压缩它们之外的空白，因此 DEFAULT 'a  b' 与 DEFAULT 'a b' 的缓存键不同。
+    """
+    global _last_normalized
+    last_sql, last_result = _last_normalized
+    if sql_content is last_sql or sql_content == last_sql:
+        return last_result
+    dialect = sniff_dialect(sql_content)
+    brackets = dialect.bracket_quotes
+    parts = []
+    plain_start = 0
+    for m in dialect.chunk_literal.finditer(sql_content):
+        start, end = m.span()
+        if not _LOOSE_SPACE.search(sql_content, start, end):
+            continue
+        if sql_content[end - 1] == '\n' and sql_content.startswith(('--', '#'), start):
+            end -= 1  # 行注释末尾的换行与其后的空白一起压缩
+        parts.append(_collapse_space(sql_content[plain_start:start], brackets))
+        parts.append(sql_content[start:end])
+        plain_start = end
+    parts.append(_collapse_space(sql_content[plain_start:], brackets))
+    result = ''.join(parts).strip()
+    _last_normalized = (sql_content, result)
+    return result
+
+
+def cache_key(sql_content, output_format, **options):
+    """根据规范化后的SQL、渲染参数和输出格式计算内容寻址的缓存键"""
+    digest = hashlib.sha256()
+    digest.update(normalize_sql(sql_content).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(output_format.encode('utf-8'))
+    for name in sorted(options):
+        digest.update(f"\0{name}={options[name]!r}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """渲染结果缓存
+
+    内存层为有容量上限的 LRU；可选的磁盘层按总大小淘汰最久未使用的文件。磁盘层只在启动时
+    扫描一次目录，之后由本进程的读写维护各文件大小与使用顺序，其他进程写入的文件要到重启后才计入。
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024,
+                 disk_dir=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._disk_files = OrderedDict()  # 磁盘层文件名 -> 字节数，按最近使用排序
+        self._disk_size = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._store_memory(key, data)
+        self._write_disk(key, data)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.disk_dir is not None and os.path.exists(self._disk_path(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }
+
+    def _store_memory(self, key, data):
+        # 单个结果超过内存层总上限时只放磁盘层
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key)
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # 更新修改时间，重启后扫描目录时据此恢复使用顺序
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk_files.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._disk_files:
+                self._disk_files.move_to_end(key)
+        return data
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        with self._lock:
+            self._disk_size += len(data) - self._disk_files.pop(key, 0)
+            self._disk_files[key] = len(data)
+        self._evict_disk()
+
+    def _scan_disk(self):
+        """启动时读取磁盘层已有文件的大小，按修改时间排出使用顺序"""
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+        files.sort()
+        for _, name, size in files:
+            self._disk_files[name] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        # 按累计的大小判断，不再每次写入都列出整个目录
+        victims = []
+        with self._lock:
+            while self._disk_files and self._disk_size > self.disk_max_bytes:
+                name, size = self._disk_files.popitem(last=False)
+                self._disk_size -= size
+                victims.append(name)
+        for name in victims:
+            try:
+                os.unlink(self._disk_path(name))
+            except OSError:
+                pass
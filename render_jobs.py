@@ -0,0 +1,181 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class DiagramJob:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, formats):
+        self.id = uuid.uuid4().hex
+        self.formats = list(formats)
+        self.status = DiagramJob.QUEUED
+        self.progress = 0
+        self.stage = ''
+        self.error = None
+        self.artifacts = {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in (DiagramJob.DONE, DiagramJob.FAILED, DiagramJob.CANCELLED)
+
+    def set_progress(self, progress, stage=''):
+        with self._lock:
+            self.progress = progress
+            self.stage = stage
+
+    def add_artifact(self, format, data, mimetype):
+        with self._lock:
+            self.artifacts[format] = (data, mimetype)
+
+    def artifact(self, format):
+        with self._lock:
+            return self.artifacts.get(format)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'status': self.status,
+                'progress': self.progress,
+                'stage': self.stage,
+                'formats': self.formats,
+                'ready': sorted(self.artifacts),
+                'error': self.error,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            if self.finished:
+                return
+            self.status = status
+            self.error = error
+            if status == DiagramJob.DONE:
+                self.progress = 100
+            self.finished_at = time.time()
+
+
+class JobStore:
+    """按过期时间淘汰的任务结果存储
+
+    已完成的任务在 ttl 秒后被清理；任务总数超过 max_jobs 时优先清理最早完成的任务。
+    """
+
+    def __init__(self, ttl=600, max_jobs=1000):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._purge(time.time())
+            self._jobs[job.id] = job
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge(time.time())
+            return self._jobs.get(job_id)
+
+    def remove(self, job_id):
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def _purge(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > self.ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_jobs:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished]:
+                if len(self._jobs) < self.max_jobs:
+                    break
+                del self._jobs[job_id]
+
+
+class JobManager:
+    """在后台线程中执行任务函数，任务函数签名为 task(job, *args)
+
+    排队和运行中的任务合计不超过 max_pending 个，超出时 submit 抛出 JobQueueFull；
+    线程池的队列本身没有上限，不加限制时排队的任务（连同其SQL）会无限堆积。
+    """
+
+    def __init__(self, store, max_workers=4, max_pending=32):
+        self.store = store
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='diagram-job')
+
+    def submit(self, formats, task, *args):
+        with self._lock:
+            if self._active >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull("后台任务已满，请稍后重试")
+            self._active += 1
+        job = DiagramJob(formats)
+        self.store.add(job)
+        try:
+            self._executor.submit(self._run, job, task, args)
+        except RuntimeError:
+            # 线程池已关闭
+            self._release()
+            self.store.remove(job.id)
+            raise
+        return job
+
+    def stats(self):
+        with self._lock:
+            return {'active': self._active, 'capacity': self.max_pending, 'rejected': self.rejected}
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def cancel(self, job_id):
+        """把任务标记为已取消；运行中的任务函数须自行检查 job.cancel_event，在下一步之前返回"""
+        job = self.store.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        job._finish(DiagramJob.CANCELLED, "任务已取消")
+        return job
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, task, args):
+        try:
+            with job._lock:
+                if job.finished:
+                    return
+                job.status = DiagramJob.RUNNING
+            try:
+                task(job, *args)
+            except Exception as e:
+                job._finish(DiagramJob.FAILED, str(e))
+            else:
+                job._finish(DiagramJob.DONE)
+        finally:
+            self._release()
@@ -0,0 +1,307 @@
+import os
+import queue
+import select
+import socket
+import subprocess
+import threading
+import time
+
+
+class RenderError(Exception):
+    pass
+
+
+class RenderQueueFull(RenderError):
+    """等待队列已满，调用方应稍后重试"""
+
+
+class RenderUnavailable(RenderError):
+    """调度器已关闭，不再接受新任务"""
+
+
+class RenderTimeout(RenderError):
+    pass
+
+
+class RenderCancelled(RenderError):
+    pass
+
+
+class RenderJob:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, source, format='png', engine='neato', args=(), extra_format=None):
+        self.source = source
+        self.format = format
+        self.engine = engine
+        self.args = tuple(args)
+        self.extra_format = extra_format  # 同一次运行再输出的另一种格式，结果为 (标准输出, 该格式的输出)
+        self.state = RenderJob.QUEUED
+        self.data = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._process = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.state == RenderJob.CANCELLED
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """取消任务：排队中的直接丢弃，运行中的杀掉布局进程"""
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self.state = RenderJob.CANCELLED
+            self.error = RenderCancelled("渲染已取消")
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        self.finished_at = time.time()
+        self._done.set()
+        return True
+
+    def result(self, cancel_check=None, poll_interval=0.2):
+        """阻塞等待结果；cancel_check 返回 True 时取消任务（例如客户端已断开）"""
+        while not self._done.wait(poll_interval):
+            if cancel_check is not None and cancel_check():
+                self.cancel()
+        if self.error is not None:
+            raise self.error
+        return self.data
+
+    def _start(self, process):
+        with self._lock:
+            if self.state == RenderJob.CANCELLED:
+                return False
+            self.state = RenderJob.RUNNING
+            self.started_at = time.time()
+            self._process = process
+            return True
+
+    def _finish(self, data=None, error=None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.data = data
+            self.error = error
+            self.state = RenderJob.FAILED if error is not None else RenderJob.DONE
+            self.finished_at = time.time()
+            self._process = None
+        self._done.set()
+
+
+class RenderScheduler:
+    """Graphviz 布局任务调度器
+
+    固定数量的工作线程各自驱动一个布局子进程，因此同时运行的 neato 进程数不超过
+    max_workers；超出的任务进入容量为 max_queue 的队列，队列满时 submit 直接拒绝。
+    每个任务有墙钟超时，Linux 等 POSIX 系统下还会经 sh 的 ulimit -v 限制布局进程的地址空间，
+    限制在 exec neato 之前设置，fork 出的子进程中不执行任何 Python 代码，多线程下也是安全的。
+    POSIX 系统下任务还可以用 extra_format 让同一次运行再输出一种格式（例如带坐标的 DOT），
+    它写进子进程继承的管道（-o/dev/fd/N），与标准输出一样不落盘。
+    """
+
+    # 子进程能否把额外的输出写进继承下来的管道
+    supports_extra_format = os.name == 'posix'
+
+    def __init__(self, max_workers=2, max_queue=16, timeout=60, memory_limit=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, source, format='png', engine='neato', args=(), extra_format=None):
+        if extra_format is not None and not self.supports_extra_format:
+            raise ValueError("当前系统不支持同一次运行输出两种格式")
+        if self._closed:
+            raise RenderUnavailable("渲染服务正在关闭")
+        self._ensure_started()
+        job = RenderJob(source, format, engine, args, extra_format)
+        # 与 shutdown 取同一把锁，保证任务不会排在工作线程的结束标记之后而永远得不到执行
+        with self._lock:
+            if self._closed:
+                raise RenderUnavailable("渲染服务正在关闭")
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise RenderQueueFull("渲染队列已满，请稍后重试")
+        return job
+
+    def render(self, source, format='png', engine='neato', args=(), cancel_check=None, extra_format=None):
+        """提交任务并阻塞等待结果；给出 extra_format 时返回 (format 的输出, extra_format 的输出)"""
+        return self.submit(source, format, engine, args, extra_format).result(cancel_check=cancel_check)
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """停止接受新任务；wait=True 时等待已提交的任务全部完成"""
+        with self._lock:
+            self._closed = True
+        if cancel_pending:
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.cancel()
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'running': self._running,
+                'queued': self._queue.qsize(),
+                'queue_capacity': self.max_queue,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+    def _ensure_started(self):
+        # 工作线程在第一次提交时才启动
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(target=self._worker, name=f'render-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            with self._lock:
+                self._running += 1
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    if job.state == RenderJob.DONE:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+    def _run(self, job):
+        args = [f'-T{job.format}', *job.args]
+        extra = None
+        if job.extra_format is not None:
+            read_fd, write_fd = os.pipe()
+            # Graphviz 中 -o 只作用于紧邻其前的 -T，主输出仍写到标准输出
+            args += [f'-T{job.extra_format}', f'-o/dev/fd/{write_fd}']
+            extra = []
+        command = self._limit_memory([job.engine, *args])
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       pass_fds=(write_fd,) if extra is not None else ())
+        except (OSError, subprocess.SubprocessError) as e:
+            if extra is not None:
+                os.close(read_fd)
+            job._finish(error=RenderError(f"Graphviz错误: 无法执行 {job.engine}: {e}"))
+            return
+        finally:
+            if extra is not None:
+                # 写端只留在子进程中，子进程退出后读端读到 EOF
+                os.close(write_fd)
+        reader = None
+        if extra is not None:
+            reader = threading.Thread(target=_drain, args=(read_fd, extra), name='render-extra-output', daemon=True)
+            reader.start()
+        try:
+            out, err = self._communicate(job, process)
+        finally:
+            if reader is not None:
+                reader.join()
+        if out is None or job.cancelled:
+            return
+        if process.returncode != 0:
+            message = err.decode('utf-8', 'replace').strip()
+            if command[0] != job.engine and process.returncode == 127:
+                # sh 找不到 neato 时以 127 退出
+                job._finish(error=RenderError(f"Graphviz错误: 无法执行 {job.engine}: {message}"))
+                return
+            if self.memory_limit and (process.returncode < 0 or 'out of memory' in message.lower()):
+                message = f"布局进程超出内存限制（{self.memory_limit // (1024 * 1024)}MB）{message}"
+            job._finish(error=RenderError(f"Graphviz错误: {message or process.returncode}"))
+            return
+        job._finish(data=out if extra is None else (out, b''.join(extra)))
+
+    def _communicate(self, job, process):
+        """把源码写给子进程并等它退出，返回 (stdout, stderr)；任务已取消或超时时返回 (None, None)"""
+        if not job._start(process):
+            process.kill()
+            process.communicate()
+            return None, None
+        try:
+            return process.communicate(job.source.encode('utf-8'), timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            job._finish(error=RenderTimeout(f"渲染超时（超过{self.timeout}秒）"))
+            return None, None
+
+    def _limit_memory(self, command):
+        """需要限制内存时把命令包进 sh：先 ulimit -v（单位 KB）再 exec 原命令，限制从 neato 启动的第一刻起就生效"""
+        if not self.memory_limit or os.name != 'posix':
+            return command
+        # ulimit 失败（例如系统不支持 -v）时照常运行，不做限制
+        script = f'ulimit -v {max(1, self.memory_limit // 1024)} 2>/dev/null; exec "$0" "$@"'
+        return ['/bin/sh', '-c', script, *command]
+
+
+def _drain(fd, chunks):
+    """在后台读完管道 fd 的全部内容并关闭它"""
+    with os.fdopen(fd, 'rb') as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+
+def client_disconnected(environ):
+    """检查WSGI请求对应的客户端连接是否已经关闭"""
+    sock = environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
@@ -0,0 +1,222 @@
+import math
+from collections import defaultdict
+
+from layout import compute_layout, relationship_edges
+from sql_parser import Schema, Table
+
+ADDED = 'added'
+REMOVED = 'removed'
+ALTERED = 'altered'
+
+# 差异图中各状态的 (填充色, 边框色)
+DIFF_COLORS = {
+    ADDED: ('#e6f4ea', '#2e7d32'),
+    REMOVED: ('#fdecea', '#c62828'),
+    ALTERED: ('#fff4e0', '#ef6c00'),
+}
+
+
+def _normalized(text):
+    return ' '.join((text or '').split()).casefold()
+
+
+def _constraint_signature(table):
+    """约束的比较键，忽略约束名和书写顺序"""
+    return sorted((c.kind, tuple(map(str.casefold, c.columns)), _normalized(c.ref_table),
+                   tuple(map(str.casefold, c.ref_columns))) for c in table.constraints)
+
+
+class TableDiff:
+    def __init__(self, name, added_columns, removed_columns, altered_columns, constraints_changed):
+        self.name = name
+        self.added_columns = added_columns
+        self.removed_columns = removed_columns
+        self.altered_columns = altered_columns  # 列名 -> (旧定义, 新定义)
+        self.constraints_changed = constraints_changed
+
+    @property
+    def changed(self):
+        return bool(self.added_columns or self.removed_columns or self.altered_columns
+                    or self.constraints_changed)
+
+    def column_status(self):
+        status = {name: ADDED for name in self.added_columns}
+        status.update((name, REMOVED) for name in self.removed_columns)
+        status.update((name, ALTERED) for name in self.altered_columns)
+        return status
+
+    def to_dict(self):
+        return {
+            'added_columns': self.added_columns,
+            'removed_columns': self.removed_columns,
+            'altered_columns': {name: {'old': old, 'new': new}
+                                for name, (old, new) in self.altered_columns.items()},
+            'constraints_changed': self.constraints_changed,
+        }
+
+
+class SchemaDiff:
+    def __init__(self, added_tables, removed_tables, altered_tables, unchanged_tables):
+        self.added_tables = added_tables
+        self.removed_tables = removed_tables
+        self.altered_tables = altered_tables  # 表名 -> TableDiff
+        self.unchanged_tables = unchanged_tables
+        self._added = set(added_tables)
+        self._removed = set(removed_tables)
+
+    @property
+    def changed(self):
+        return bool(self.added_tables or self.removed_tables or self.altered_tables)
+
+    def table_status(self, name):
+        if name in self.altered_tables:
+            return ALTERED
+        if name in self._added:
+            return ADDED
+        if name in self._removed:
+            return REMOVED
+        return None
+
+    def to_dict(self):
+        return {
+            'added_tables': self.added_tables,
+            'removed_tables': self.removed_tables,
+            'altered_tables': {name: diff.to_dict() for name, diff in self.altered_tables.items()},
+            'unchanged_tables': len(self.unchanged_tables),
+        }
+
+
+def diff_tables(old, new):
+    old_columns = {c.name: c for c in old.columns}
+    new_columns = {c.name: c for c in new.columns}
+    added = [c.name for c in new.columns if c.name not in old_columns]
+    removed = [c.name for c in old.columns if c.name not in new_columns]
+    altered = {}
+    for column in new.columns:
+        previous = old_columns.get(column.name)
+        if previous is not None and _normalized(previous.definition) != _normalized(column.definition):
+            altered[column.name] = (previous.definition, column.definition)
+    constraints_changed = _constraint_signature(old) != _constraint_signature(new)
+    return TableDiff(new.name, added, removed, altered, constraints_changed)
+
+
+def diff_schemas(old_schema, new_schema):
+    """比较两个版本的 Schema，表按名字对应，列按名字对应、按规范化后的定义比较"""
+    added = [t.name for t in new_schema if t.name not in old_schema]
+    removed = [t.name for t in old_schema if t.name not in new_schema]
+    altered = {}
+    unchanged = []
+    for table in new_schema:
+        previous = old_schema.get(table.name)
+        if previous is None:
+            continue
+        if previous is table:
+            unchanged.append(table.name)
+            continue
+        table_diff = diff_tables(previous, table)
+        if table_diff.changed:
+            altered[table.name] = table_diff
+        else:
+            unchanged.append(table.name)
+    return SchemaDiff(added, removed, altered, unchanged)
+
+
+def diff_display_schema(old_schema, new_schema, schema_diff):
+    """构造差异图用的 Schema 与高亮信息
+
+    新版本的表加上被删除的表；修改过的表在新列之后补上被删除的列。
+    返回 (Schema, {表名: (表状态或None, {列名: 列状态})})。
+    """
+    tables = []
+    highlight = {}
+    for table in new_schema:
+        status = schema_diff.table_status(table.name)
+        if status == ALTERED:
+            table_diff = schema_diff.altered_tables[table.name]
+            if table_diff.removed_columns:
+                merged = Table(table.name, table.schema_name, table.comment)
+                for column in table.columns:
+                    merged.add_column(column)
+                previous = old_schema.get(table.name)
+                for name in table_diff.removed_columns:
+                    merged.add_column(previous.column(name))
+                merged.constraints = table.constraints
+                table = merged
+            highlight[table.name] = (ALTERED, table_diff.column_status())
+        elif status == ADDED:
+            highlight[table.name] = (ADDED, {})
+        tables.append(table)
+    for name in schema_diff.removed_tables:
+        tables.append(old_schema.get(name))
+        highlight[name] = (REMOVED, {})
+    return Schema(tables), highlight
+
+
+def stable_layout(old_schema, new_schema, mode='circle', table_radius=6, node_size=5, old_positions=None):
+    """在旧布局基础上为新版本计算坐标
+
+    旧版本中已有的表（包括已被删除的表，差异图中仍要画出）保持原位；新增的表放在与它有关系的
+    已定位表的重心附近，没有关系的放在现有区域右侧，再在空间哈希中找最近的空位，
+    因此只有新增表所在的局部区域发生变化。
+    """
+    if old_positions is None:
+        old_positions = compute_layout(old_schema, mode, table_radius, node_size)
+    if not old_positions:
+        return compute_layout(new_schema, mode, table_radius, node_size)
+    positions = dict(old_positions)
+
+    neighbours = defaultdict(list)
+    for child, parent in relationship_edges(new_schema):
+        neighbours[child].append(parent)
+        neighbours[parent].append(child)
+
+    occupied = defaultdict(list)
+    for x, y in positions.values():
+        occupied[(int(x // node_size), int(y // node_size))].append((x, y))
+    right = max(x for x, _ in positions.values()) + node_size
+    top = min(y for _, y in positions.values())
+    next_free_row = 0
+
+    for table in new_schema:
+        if table.name in positions:
+            continue
+        anchors = [positions[other] for other in neighbours.get(table.name, ()) if other in positions]
+        if anchors:
+            start_x = sum(x for x, _ in anchors) / len(anchors)
+            start_y = sum(y for _, y in anchors) / len(anchors)
+        else:
+            start_x, start_y = right, top + next_free_row * node_size
+            next_free_row += 1
+        x, y = _nearest_free_position(occupied, start_x, start_y, node_size)
+        occupied[(int(x // node_size), int(y // node_size))].append((x, y))
+        positions[table.name] = (x, y)
+    return positions
+
+
+def _is_free(occupied, x, y, node_size):
+    cx, cy = int(x // node_size), int(y // node_size)
+    limit = node_size * node_size * 0.99
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for ox, oy in occupied.get((cx + dx, cy + dy), ()):
+                if (ox - x) ** 2 + (oy - y) ** 2 < limit:
+                    return False
+    return True
+
+
+def _nearest_free_position(occupied, x, y, node_size):
+    """以 node_size 为步长一圈圈向外查找与已有表都不重叠的位置"""
+    if _is_free(occupied, x, y, node_size):
+        return x, y
+    radius = 1
+    while True:
+        best = None
+        for dx in range(-radius, radius + 1):
+            for dy in (-radius, radius) if abs(dx) != radius else range(-radius, radius + 1):
+                candidate = (x + dx * node_size, y + dy * node_size)
+                distance = math.hypot(dx, dy)
+                if (best is None or distance < best[0]) and _is_free(occupied, *candidate, node_size):
+                    best = (distance, candidate)
+        if best is not None:
+            return best[1]
+        radius += 1
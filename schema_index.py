@@ -0,0 +1,299 @@
+import re
+import shlex
+from array import array
+from collections import deque
+from itertools import groupby
+
+from table_bundle import neighbour_map
+
+# 表结构的倒排索引，表很多时按表名、字段名、类型和注释检索，只画命中的子图。
+# 同一个名字在各表中反复出现（如 id、created_at），索引先把取值去重：每个取值对应一串表或字段的序号，
+# 再对去重后的取值建 n-gram 索引——每个取值按 3-gram 切分（首尾加上边界标记，*_id 这样的后缀查询也能用上），
+# 中文等 CJK 字符另按单字和 2-gram 切分，"客户"这样的两字词也能直接命中。
+# 查询时先由通配符之间的字面片段取出候选取值，再用正则逐个确认，所以即使有几万个字段也只需检查少量候选。
+
+# 首尾边界标记，不会出现在标识符中
+_START = '\x02'
+_END = '\x03'
+
+_CJK = re.compile('[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\U00020000-\U0003134f]')
+
+# 查询字段名（含中文别名）-> 内部字段
+QUERY_FIELDS = {
+    'table': 'table', '表': 'table',
+    'column': 'column', '列': 'column', '字段': 'column',
+    'type': 'type', '类型': 'type',
+    'comment': 'comment', '注释': 'comment',
+}
+
+# 只作用于单个字段的条件：同一查询中的这类条件须由同一个字段同时满足
+_COLUMN_FIELDS = frozenset(['column', 'type'])
+
+_TYPE_NOISE = re.compile(r'\([^)]*\)|[\[\]"`]')
+
+
+def _grams(text):
+    """取值（已折叠大小写）的全部 n-gram：带边界标记的 3-gram，以及 CJK 字符的单字与相邻 2-gram"""
+    wrapped = _START + text + _END
+    grams = {wrapped[i:i + 3] for i in range(len(wrapped) - 2)}
+    if _CJK.search(text):
+        for i, ch in enumerate(wrapped):
+            if _CJK.match(ch):
+                grams.add(ch)
+                grams.add(wrapped[i - 1:i + 1])
+                grams.add(wrapped[i:i + 2])
+    return grams
+
+
+def _fragment_grams(fragment):
+    """查询中的一个字面片段须包含的 n-gram；片段太短、索引中没有对应的 n-gram 时返回空集合"""
+    if len(fragment) >= 3:
+        return {fragment[i:i + 3] for i in range(len(fragment) - 2)}
+    grams = set()
+    for i, ch in enumerate(fragment):
+        if _CJK.match(ch):
+            grams.add(fragment[i:i + 2] if i + 1 < len(fragment) else fragment[i - 1:] if i else ch)
+    return grams
+
+
+def type_names(data_type):
+    """类型的检索形式：去掉长度/精度、方括号和引号后折叠大小写，多个词时另加首词（INT UNSIGNED 也按 int 检索）"""
+    text = ' '.join(_TYPE_NOISE.sub(' ', data_type).split()).casefold()
+    if not text:
+        return ()
+    first = text.split(' ', 1)[0]
+    return (text, first) if first != text else (text,)
+
+
+class Pattern:
+    """一个查询值：含 * 或 ? 时须整体匹配（不区分大小写），否则为子串匹配；exact 为 True 时不含通配符也须整体匹配"""
+
+    def __init__(self, text, exact=False):
+        self.text = text
+        folded = text.casefold()
+        pieces = re.split(r'([*?])', folded)
+        wildcard = len(pieces) > 1
+        anchored = wildcard or exact
+        # 不含通配符的子串匹配直接用 in 判断，比正则快
+        self.substring = None if anchored else folded
+        regex = ''.join('.*' if piece == '*' else '.' if piece == '?' else re.escape(piece) for piece in pieces)
+        self.regex = re.compile(regex if anchored else f'.*{regex}.*', re.DOTALL)
+        # 通配符之间的字面片段，两端没有通配符时带上边界标记
+        fragments = pieces[::2]
+        if anchored:
+            fragments[0] = _START + fragments[0]
+            fragments[-1] = fragments[-1] + _END
+        self.grams = set()
+        for fragment in fragments:
+            self.grams |= _fragment_grams(fragment)
+
+    def __repr__(self):
+        return f"Pattern({self.text!r})"
+
+
+class _Field:
+    """一个检索字段：去重后的取值、每个取值对应的序号，以及取值的 n-gram 索引"""
+
+    def __init__(self):
+        self.values = []
+        self.postings = []
+        self._value_ids = {}
+        self._grams = {}
+
+    def add(self, value, item):
+        value_id = self._value_ids.get(value)
+        if value_id is None:
+            value_id = self._value_ids[value] = len(self.values)
+            self.values.append(value)
+            self.postings.append([])
+            for gram in _grams(value):
+                self._grams.setdefault(gram, array('l')).append(value_id)
+        postings = self.postings[value_id]
+        if not postings or postings[-1] != item:
+            postings.append(item)
+
+    def candidates(self, pattern):
+        """可能匹配的取值序号：由 n-gram 倒排表求交；查询中没有可用的 n-gram 时为全部取值"""
+        if not pattern.grams:
+            return range(len(self.values))
+        lists = []
+        for gram in pattern.grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                return ()
+            lists.append(ids)
+        lists.sort(key=len)
+        result = set(lists[0])
+        for ids in lists[1:]:
+            result.intersection_update(ids)
+            if not result:
+                break
+        return result
+
+    def match(self, pattern):
+        """匹配的取值对应的全部序号"""
+        values = self.values
+        substring = pattern.substring
+        if substring is not None:
+            matched = [value_id for value_id in self.candidates(pattern) if substring in values[value_id]]
+        else:
+            fullmatch = pattern.regex.fullmatch
+            matched = [value_id for value_id in self.candidates(pattern) if fullmatch(values[value_id])]
+        found = set()
+        for value_id in matched:
+            found.update(self.postings[value_id])
+        return found
+
+
+def parse_query(text):
+    """把查询语句拆成 [(字段, Pattern)]；字段为 None 表示不限字段。
+
+    条件之间以空格分隔、同时满足，值中有空格时加引号，例如 column:*_id type:int 或 注释:"下单 时间"
+    """
+    try:
+        words = shlex.split(text)
+    except ValueError:
+        raise ValueError("查询语句中的引号不成对")
+    terms = []
+    for word in words:
+        field, sep, value = word.partition(':')
+        if not sep:
+            field, sep, value = word.partition('：')
+        if not sep:
+            terms.append((None, Pattern(word)))
+            continue
+        if field.casefold() not in QUERY_FIELDS:
+            raise ValueError(f"未知的查询字段: {field}")
+        if not value:
+            raise ValueError(f"查询字段 {field} 缺少取值")
+        field = QUERY_FIELDS[field.casefold()]
+        # 类型不含通配符时整体匹配，type:int 不会命中 point
+        terms.append((field, Pattern(value, exact=field == 'type')))
+    if not terms:
+        raise ValueError("请输入查询条件")
+    return terms
+
+
+class SearchResult:
+    """命中的表（按在表结构中的顺序）以及每张表中命中的字段"""
+
+    def __init__(self, query, tables, columns):
+        self.query = query
+        self.tables = tables
+        self.columns = columns
+
+    def to_dict(self):
+        return {
+            'query': self.query,
+            'count': len(self.tables),
+            'tables': [{'name': name, 'columns': self.columns.get(name, [])} for name in self.tables],
+        }
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        return f"SearchResult({self.query!r}, {len(self.tables)} tables)"
+
+
+class SchemaIndex:
+    """一份表结构的倒排索引，创建后不再修改；表结构变化后需重新创建"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.table_names = []
+        self.column_tables = []  # 字段序号 -> 所在表的序号
+        self.column_offsets = [0]  # 第 i 张表的字段序号为 column_offsets[i] 到 column_offsets[i + 1]
+        self.column_names = []
+        self._tables = _Field()    # 表名 -> 表序号
+        self._columns = _Field()   # 字段名 -> 字段序号
+        self._types = _Field()     # 类型 -> 字段序号
+        self._comments = _Field()  # 表和字段的注释 -> 表序号
+        self._column_comments = _Field()  # 字段注释 -> 字段序号
+        self._neighbours = None
+        for table_id, table in enumerate(schema):
+            self.table_names.append(table.name)
+            self._tables.add(table.name.casefold(), table_id)
+            if table.comment:
+                self._comments.add(table.comment.casefold(), table_id)
+            for column in table.columns:
+                column_id = len(self.column_names)
+                self.column_names.append(column.name)
+                self.column_tables.append(table_id)
+                self._columns.add(column.name.casefold(), column_id)
+                for name in type_names(column.data_type):
+                    self._types.add(name, column_id)
+                if column.comment:
+                    self._comments.add(column.comment.casefold(), table_id)
+                    self._column_comments.add(column.comment.casefold(), column_id)
+            self.column_offsets.append(len(self.column_names))
+
+    def search(self, query):
+        """按查询语句检索，返回 SearchResult；查询语句有误时抛出 ValueError
+
+        不带字段名的值在表名、字段名和注释中查找；column:/type: 条件须由同一个字段同时满足，
+        例如 column:*_id type:int 为"有 INT 类型的 *_id 字段的表"。
+        """
+        terms = parse_query(query)
+        tables = None
+        loose_columns = set()  # 不带字段名的值命中的字段，只用于标出命中的字段
+        for field, pattern in terms:
+            if field in _COLUMN_FIELDS:
+                continue
+            if field == 'table':
+                found = self._tables.match(pattern)
+            elif field == 'comment':
+                found = self._comments.match(pattern)
+            else:
+                hits = self._columns.match(pattern) | self._column_comments.match(pattern)
+                loose_columns |= hits
+                found = self._tables.match(pattern) | self._comments.match(pattern)
+                found.update(map(self.column_tables.__getitem__, hits))
+            tables = found if tables is None else tables & found
+
+        # 表级条件先求出的表通常不多，字段条件只在这些表的字段中求交，不必为大量字段逐个找所在的表
+        offsets = self.column_offsets
+        allowed = None
+        if tables is not None and len(tables) * 4 < len(self.table_names):
+            allowed = set()
+            for table_id in tables:
+                allowed.update(range(offsets[table_id], offsets[table_id + 1]))
+            loose_columns &= allowed
+        columns = None
+        if any(field in _COLUMN_FIELDS for field, _ in terms):
+            columns = allowed
+            for field, pattern in terms:
+                if field in _COLUMN_FIELDS:
+                    found = (self._columns if field == 'column' else self._types).match(pattern)
+                    columns = found if columns is None else columns & found
+            owners = set(map(self.column_tables.__getitem__, columns))
+            tables = owners if tables is None else tables & owners
+
+        # 同一张表的字段序号是连续的，排序后按所在表分组
+        matched = {}
+        names = self.column_names
+        hits = sorted(columns | loose_columns if columns is not None else loose_columns)
+        for table_id, group in groupby(hits, self.column_tables.__getitem__):
+            if table_id in tables:
+                matched[self.table_names[table_id]] = [names[column_id] for column_id in group]
+        return SearchResult(query, [self.table_names[table_id] for table_id in sorted(tables)], matched)
+
+    def subgraph(self, names, depth=0):
+        """只含 names 中各表（以及沿关系向外 depth 层内的关联表）的子Schema"""
+        found = set(names)
+        if depth > 0:
+            if self._neighbours is None:
+                self._neighbours = neighbour_map(self.schema)
+            frontier = deque((name, 0) for name in found)
+            while frontier:
+                current, distance = frontier.popleft()
+                if distance >= depth:
+                    continue
+                for other in self._neighbours.get(current, ()):
+                    if other not in found:
+                        found.add(other)
+                        frontier.append((other, distance + 1))
+        return self.schema.subset(found)
+
+    def __repr__(self):
+        return f"SchemaIndex({len(self.table_names)} tables, {len(self.column_names)} columns)"
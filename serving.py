@@ -0,0 +1,136 @@
+import gc
+import logging
+import shutil
+import subprocess
+import threading
+
+from dialects import DIALECTS
+from drawio_writer import DrawioGenerator
+from layout import LAYOUT_MODES, compute_layout
+from sql_parser import parse_schema
+
+# 生产环境部署（gunicorn，见 gunicorn.conf.py 与 wsgi.py）用到的启动检查、fork 前预热和就绪状态。
+# 启动时检查 Graphviz 与中文字体；预热在主进程中完成，工作进程 fork 后以写时复制共享。
+
+logger = logging.getLogger(__name__)
+
+# 图中使用的字体，与 ERDiagramGenerator 一致
+FONT_FAMILY = 'Microsoft YaHei'
+
+_WARMUP_SQL = """
+CREATE TABLE 用户 (
+    id INT PRIMARY KEY,
+    名称 VARCHAR(50) NOT NULL
+);
+CREATE TABLE orders (
+    id INT PRIMARY KEY,
+    user_id INT,
+    FOREIGN KEY (user_id) REFERENCES 用户(id)
+);
+"""
+
+
+class StartupError(Exception):
+    pass
+
+
+def check_graphviz(engine='neato'):
+    """确认布局引擎可以执行，返回版本信息"""
+    path = shutil.which(engine)
+    if path is None:
+        raise StartupError(f"未找到 {engine}，请先安装 Graphviz")
+    try:
+        result = subprocess.run([path, '-V'], stdin=subprocess.DEVNULL, capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise StartupError(f"无法执行 {engine}: {e}")
+    if result.returncode != 0:
+        raise StartupError(f"无法执行 {engine}: {result.stderr.decode('utf-8', 'replace').strip()}")
+    # 版本信息输出在 stderr，例如 "neato - graphviz version 2.43.0 (0)"
+    return (result.stderr or result.stdout).decode('utf-8', 'replace').strip()
+
+
+def check_fonts(family=FONT_FAMILY):
+    """通过 fontconfig 检查字体，返回 (状态, 问题说明)
+
+    状态为 ok、fallback（没有该字体，但有可显示中文的字体）、missing 或 unknown（没有 fc-list，如 Windows）。
+    """
+    fc_list = shutil.which('fc-list')
+    if fc_list is None:
+        return 'unknown', None
+    try:
+        families = subprocess.run([fc_list, ':', 'family'], capture_output=True, timeout=10).stdout
+        if family.lower().encode('utf-8') in families.lower():
+            return 'ok', None
+        chinese = subprocess.run([fc_list, ':lang=zh', 'family'], capture_output=True, timeout=10).stdout
+    except (OSError, subprocess.TimeoutExpired):
+        return 'unknown', None
+    if chinese.strip():
+        fallback = chinese.decode('utf-8', 'replace').splitlines()[0].split(',')[0]
+        return 'fallback', f"未找到字体 {family}，中文将使用 {fallback} 显示"
+    return 'missing', f"未找到字体 {family}，也没有可显示中文的字体，中文表名和字段名会显示为方框"
+
+
+class Readiness:
+    """就绪状态：启动检查通过且未进入退出流程时就绪
+
+    checks 为各项检查的结果；errors 中的问题会使 /ready 返回 503，warnings 只做提示。
+    """
+
+    def __init__(self):
+        self.checks = {}
+        self.errors = []
+        self.warnings = []
+        self.draining = False
+        self._checked = False
+        self._lock = threading.Lock()
+
+    def run_checks(self, engine='neato'):
+        with self._lock:
+            self.checks, self.errors, self.warnings = {}, [], []
+            try:
+                self.checks['graphviz'] = check_graphviz(engine)
+            except StartupError as e:
+                self.errors.append(str(e))
+            self.checks['fonts'], font_problem = check_fonts()
+            if font_problem:
+                self.warnings.append(font_problem)
+            self._checked = True
+        for warning in self.warnings:
+            logger.warning(warning)
+        return not self.errors
+
+    def ensure_checked(self):
+        """直接以开发服务器运行时没有经过启动检查，第一次查询就绪状态时补做"""
+        if not self._checked:
+            self.run_checks()
+
+    def problems(self):
+        self.ensure_checked()
+        problems = list(self.errors)
+        if self.draining:
+            problems.append('服务正在退出')
+        return problems
+
+    def to_dict(self):
+        return {'checks': dict(self.checks), 'warnings': list(self.warnings), 'draining': self.draining}
+
+
+def preload(app, readiness=None):
+    """fork 之前预热
+
+    启动检查；各方言的解析、方言识别、各种布局、Draw.io 生成各走一遍，模板预先编译；
+    最后冻结垃圾回收的对象代，避免工作进程中的回收扫描写入共享页面、破坏写时复制。
+    Graphviz 不可用时抛出 StartupError。
+    """
+    if readiness is not None and not readiness.run_checks():
+        raise StartupError('；'.join(readiness.errors))
+    for name in DIALECTS:
+        parse_schema(_WARMUP_SQL, name)
+    schema = parse_schema(_WARMUP_SQL)
+    for mode in LAYOUT_MODES:
+        compute_layout(schema, mode, 6, node_size=5)
+    DrawioGenerator().generate_from_schema(schema)
+    with app.app_context():
+        app.jinja_env.get_template('index.html')
+    gc.collect()
+    gc.freeze()
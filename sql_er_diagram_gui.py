@@ -1,8 +1,22 @@
-import re
-import graphviz
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
-import math
+import base64
+import os
+import queue
+import threading
+from sql_parser import IncrementalSchema, Schema
+from diagram_model import load_model
+from drawio_writer import DrawioGenerator
+from graphviz_writer import ERDiagramGenerator
+from svg_writer import build_scene
+from schema_index import SchemaIndex
+from table_bundle import write_table_bundle
+from layout import LAYOUT_MODES
+
+# 停止输入多少毫秒后重新解析
+REPARSE_DELAY_MS = 300
+# 预览图的最大边长（像素），超出时按整数倍缩小
+PREVIEW_SIZE = 280
 
 class ERDiagramGUI:
     def __init__(self, root):
@@ -62,6 +76,9 @@ class ERDiagramGUI:
         self.generate_btn = ttk.Button(self.button_frame, text="生成ER图", command=self.generate_diagram)
         self.generate_btn.pack(side=tk.RIGHT, padx=5)
         
+        self.fast_preview_btn = ttk.Button(self.button_frame, text="快速预览", command=self.fast_preview)
+        self.fast_preview_btn.pack(side=tk.RIGHT, padx=5)
+        
         # 右侧配置区域
         ttk.Label(self.right_frame, text="配置选项", font=('Microsoft YaHei', 10, 'bold')).pack(anchor=tk.W, pady=(0, 10))
         
@@ -81,6 +98,12 @@ class ERDiagramGUI:
         self.field_radius_entry = ttk.Entry(settings_frame, textvariable=self.field_radius_var, width=10)
         self.field_radius_entry.pack(anchor=tk.W, pady=(0, 10))
         
+        # 布局方式
+        ttk.Label(settings_frame, text="布局方式:").pack(anchor=tk.W)
+        self.layout_var = tk.StringVar(value=LAYOUT_MODES[0])
+        ttk.Combobox(settings_frame, textvariable=self.layout_var, values=LAYOUT_MODES,
+                     state='readonly', width=12).pack(anchor=tk.W, pady=(0, 10))
+        
         # 在字段间距设置后添加数据类型选项
         self.show_type_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(settings_frame, text="显示数据类型", 
@@ -109,8 +132,48 @@ class ERDiagramGUI:
                                                   command=self.export_single_table_drawio)
         self.export_single_drawio_btn.pack(side=tk.LEFT, padx=5)
         
-        # 更新表格列表
-        self.sql_text.bind('<KeyRelease>', self.update_table_list)
+        # 所有表各导出一张图，打包为zip
+        bundle_frame = ttk.Frame(settings_frame)
+        bundle_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(bundle_frame, text="关联表层数:").pack(side=tk.LEFT)
+        self.bundle_depth_var = tk.StringVar(value="0")
+        ttk.Spinbox(bundle_frame, from_=0, to=5, textvariable=self.bundle_depth_var, width=4).pack(side=tk.LEFT, padx=5)
+        self.export_bundle_btn = ttk.Button(bundle_frame, text="批量导出各表", command=self.export_table_bundle)
+        self.export_bundle_btn.pack(side=tk.LEFT, padx=5)
+        
+        # 检索：按表名、字段名、类型和注释筛选下拉列表，或只画匹配的表（关联表层数同上）
+        ttk.Label(settings_frame, text="检索（如 column:*_id type:int）:").pack(anchor=tk.W)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(settings_frame, textvariable=self.search_var, width=30)
+        search_entry.pack(anchor=tk.W, pady=(0, 5))
+        search_entry.bind('<Return>', self.search_tables)
+        search_btn_frame = ttk.Frame(settings_frame)
+        search_btn_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(search_btn_frame, text="筛选表", command=self.search_tables).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_btn_frame, text="生成匹配的子图",
+                   command=self.generate_search_diagram).pack(side=tk.LEFT, padx=5)
+        self.search_status = ttk.Label(settings_frame, text="")
+        self.search_status.pack(anchor=tk.W, pady=(0, 10))
+        
+        # 实时预览：编辑时只重新渲染定义有变化的表
+        preview_frame = ttk.LabelFrame(self.right_frame, text="实时预览", padding=10)
+        preview_frame.pack(fill=tk.BOTH, expand=True)
+        self.live_preview_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(preview_frame, text="编辑时预览当前表", variable=self.live_preview_var,
+                        command=self.toggle_live_preview).pack(anchor=tk.W)
+        self.preview_label = ttk.Label(preview_frame, anchor=tk.CENTER)
+        self.preview_label.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        
+        # 每条语句的解析结果缓存在 schema_model 中，编辑后只重新解析改动的语句
+        self.schema_model = IncrementalSchema()
+        self.search_index = None  # 表结构变化后重建
+        self.preview_renderer = None
+        self.preview_images = {}
+        self.preview_table = None
+        self._reparse_job = None
+        
+        # 内容变化（键入、粘贴、加载文件）后延迟解析，连续输入时只解析一次
+        self.sql_text.bind('<<Modified>>', self.on_sql_modified)
         
         # 预填充示例SQL
         self.load_example_sql()
@@ -184,23 +247,174 @@ class ERDiagramGUI:
             show_type = self.show_type_var.get()  # 获取是否显示数据类型
             
             generator = ERDiagramGenerator()
-            generator.parse_sql(sql_content, table_radius, field_radius, show_type)  # 添加 show_type 参数
-            generator.generate()
+            generator.load_schema(self.current_model(), table_radius, field_radius, show_type,
+                                  self.layout_var.get())
+            generator.generate(view=True)
             messagebox.showinfo("成功", "ER图已生成！")
         except ValueError as e:
             messagebox.showerror("错误", "请输入有效的数值！")
         except Exception as e:
             messagebox.showerror("错误", f"生成ER图时出错：{str(e)}")
 
+    def fast_preview(self):
+        """不经过 Graphviz，按计算出的坐标直接把整张图画在窗口中（直线连线），适合编辑时快速查看"""
+        sql_content = self.sql_text.get(1.0, tk.END)
+        if not sql_content.strip():
+            messagebox.showwarning("警告", "请先输入SQL语句！")
+            return
+        
+        try:
+            table_radius = float(self.table_radius_var.get())
+            field_radius = float(self.field_radius_var.get())
+            scene = build_scene(self.current_model(), table_radius, field_radius, self.show_type_var.get(),
+                                self.layout_var.get())
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的数值！")
+            return
+        except Exception as e:
+            messagebox.showerror("错误", f"生成预览时出错：{str(e)}")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("快速预览")
+        window.geometry("900x700")
+        canvas = tk.Canvas(window, background='white',
+                           scrollregion=(scene.x, scene.y, scene.x + scene.width, scene.y + scene.height))
+        x_scroll = ttk.Scrollbar(window, orient=tk.HORIZONTAL, command=canvas.xview)
+        y_scroll = ttk.Scrollbar(window, orient=tk.VERTICAL, command=canvas.yview)
+        canvas.configure(xscrollcommand=x_scroll.set, yscrollcommand=y_scroll.set)
+        x_scroll.pack(side=tk.BOTTOM, fill=tk.X)
+        y_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        draw_scene(canvas, scene)
+
+    def on_sql_modified(self, event=None):
+        if not self.sql_text.edit_modified():
+            return  # 复位修改标志本身也会触发 <<Modified>>
+        self.sql_text.edit_modified(False)
+        if self._reparse_job is not None:
+            self.root.after_cancel(self._reparse_job)
+        self._reparse_job = self.root.after(REPARSE_DELAY_MS, self.update_table_list)
+
+    def current_schema(self):
+        """把编辑器内容同步到增量解析结果，返回 (Schema, 有变化的表名集合)"""
+        self._reparse_job = None
+        changed = self.schema_model.update(self.sql_text.get(1.0, tk.END))
+        return self.schema_model.schema, changed
+
+    def current_model(self):
+        """编辑器内容对应的 DiagramModel；内容不变时生成ER图与导出Draw.io共用同一个模型和已算好的布局"""
+        self.update_table_list()
+        return load_model(self.sql_text.get(1.0, tk.END), parse=lambda sql: self.schema_model.schema)
+
     def update_table_list(self, event=None):
         """更新表格下拉列表"""
-        sql_content = self.sql_text.get(1.0, tk.END)
-        table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\('
-        tables = re.finditer(table_pattern, sql_content, re.IGNORECASE)
-        table_names = [table.group(1) for table in tables]
-        self.table_combo['values'] = table_names
-        if table_names and not self.table_var.get():
-            self.table_combo.set(table_names[0])
+        schema, changed = self.current_schema()
+        if changed:
+            self.search_index = None
+        if changed or not self.table_combo['values']:
+            table_names = schema.table_names()
+            self.table_combo['values'] = table_names
+            if table_names and self.table_var.get() not in schema:
+                self.table_combo.set(table_names[0])
+        if changed and self.live_preview_var.get():
+            self.request_preview([table for table in schema if table.name in changed])
+
+    def search(self):
+        """按检索框中的条件检索当前表结构，返回 SearchResult；条件为空时返回 None"""
+        query = self.search_var.get().strip()
+        if not query:
+            return None
+        schema, _ = self.current_schema()
+        if self.search_index is None:
+            self.search_index = SchemaIndex(schema)
+        return self.search_index.search(query)
+
+    def search_tables(self, event=None):
+        """把单表生成的下拉列表筛选为匹配的表；条件为空时恢复全部表"""
+        try:
+            result = self.search()
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        if result is None:
+            self.table_combo['values'] = self.schema_model.schema.table_names()
+            self.search_status.configure(text="")
+            return
+        self.table_combo['values'] = result.tables
+        if result.tables:
+            self.table_combo.set(result.tables[0])
+        column_count = sum(len(columns) for columns in result.columns.values())
+        self.search_status.configure(text=f"匹配 {len(result.tables)} 张表、{column_count} 个字段")
+
+    def generate_search_diagram(self):
+        """只画检索到的表，以及关联表层数内与它们相连的表"""
+        try:
+            result = self.search()
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+        if result is None:
+            messagebox.showwarning("警告", "请先输入检索条件！")
+            return
+        if not result.tables:
+            messagebox.showwarning("警告", "没有匹配的表！")
+            return
+        try:
+            depth = int(self.bundle_depth_var.get())
+            table_radius = float(self.table_radius_var.get())
+            field_radius = float(self.field_radius_var.get())
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的数值！")
+            return
+        
+        try:
+            generator = ERDiagramGenerator()
+            generator.load_schema(self.search_index.subgraph(result.tables, depth), table_radius, field_radius,
+                                  self.show_type_var.get(), self.layout_var.get())
+            generator.generate('er_diagram_search', view=True)
+            messagebox.showinfo("成功", f"已生成 {len(result.tables)} 张匹配表的ER图！")
+        except Exception as e:
+            messagebox.showerror("错误", f"生成ER图时出错：{str(e)}")
+
+    def toggle_live_preview(self):
+        if not self.live_preview_var.get():
+            return
+        if self.preview_renderer is None:
+            self.preview_renderer = PreviewRenderer()
+            self.poll_preview()
+        schema, _ = self.current_schema()
+        table = schema.get(self.table_var.get())
+        if table is not None:
+            self.request_preview([table])
+
+    def request_preview(self, tables):
+        """在后台线程渲染这些表的预览，显示其中第一张"""
+        if not tables or self.preview_renderer is None:
+            return
+        self.preview_table = tables[0].name
+        try:
+            field_radius = float(self.field_radius_var.get())
+        except ValueError:
+            field_radius = 2
+        self.preview_renderer.submit(tables, field_radius, self.show_type_var.get())
+
+    def poll_preview(self):
+        """在Tk主循环中取回后台渲染的结果（Tk控件只能在主线程中操作）"""
+        for name, data, error in self.preview_renderer.results():
+            if error is not None:
+                if name == self.preview_table:
+                    self.preview_label.configure(image='', text=error)
+                continue
+            image = tk.PhotoImage(data=base64.b64encode(data).decode('ascii'))
+            factor = max(1, -(-max(image.width(), image.height()) // PREVIEW_SIZE))
+            if factor > 1:
+                image = image.subsample(factor)
+            self.preview_images[name] = image
+        image = self.preview_images.get(self.preview_table)
+        if image is not None and self.live_preview_var.get():
+            self.preview_label.configure(image=image, text='')
+        self.root.after(100, self.poll_preview)
 
     def generate_single_table_diagram(self):
         """生成单个表的ER图"""
@@ -209,16 +423,13 @@ class ERDiagramGUI:
             messagebox.showwarning("警告", "请先选择一个表！")
             return
             
-        sql_content = self.sql_text.get(1.0, tk.END)
         try:
-            table_pattern = f"CREATE TABLE\\s+`?{selected_table}`?\\s*\\([^;]+\\);"
-            match = re.search(table_pattern, sql_content, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-            if match:
-                table_sql = match.group(0)
+            schema, _ = self.current_schema()
+            if selected_table in schema:
                 generator = ERDiagramGenerator()
                 show_type = self.show_type_var.get()  # 获取是否显示数据类型
-                generator.parse_sql(table_sql, table_radius=0, field_radius=2, show_type=show_type)
-                generator.generate(f'er_diagram_{selected_table}')
+                generator.load_schema(schema.subset([selected_table]), table_radius=0, field_radius=2, show_type=show_type)
+                generator.generate(f'er_diagram_{selected_table}', view=True)
                 messagebox.showinfo("成功", f"{selected_table}的ER图已生成！")
             else:
                 messagebox.showerror("错误", f"未找到表 {selected_table} 的定义！")
@@ -244,10 +455,11 @@ class ERDiagramGUI:
                 show_type = self.show_type_var.get()  # 获取是否显示数据类型
                 
                 generator = DrawioGenerator()
-                xml_content = generator.generate_drawio(sql_content, table_radius, field_radius, show_type)
+                chunks = generator.iter_drawio(self.current_model(), table_radius, field_radius, show_type,
+                                               self.layout_var.get())
                 
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(xml_content)
+                    f.writelines(chunks)
                 messagebox.showinfo("成功", "Draw.io文件已生成！")
         except Exception as e:
             messagebox.showerror("错误", f"生成Draw.io文件时出错：{str(e)}")
@@ -259,13 +471,10 @@ class ERDiagramGUI:
             messagebox.showwarning("警告", "请先选择一个表！")
             return
             
-        sql_content = self.sql_text.get(1.0, tk.END)
         try:
-            # 提取选中表的SQL
-            table_pattern = f"CREATE TABLE\\s+`?{selected_table}`?\\s*\\([^;]+\\);"
-            match = re.search(table_pattern, sql_content, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-            if match:
-                table_sql = match.group(0)
+            # 提取选中表的定义
+            schema, _ = self.current_schema()
+            if selected_table in schema:
                 file_path = filedialog.asksaveasfilename(
                     defaultextension=".drawio",
                     filetypes=[("Draw.io files", "*.drawio"), ("XML files", "*.xml"), ("All files", "*.*")]
@@ -273,149 +482,136 @@ class ERDiagramGUI:
                 if file_path:
                     generator = DrawioGenerator()
                     show_type = self.show_type_var.get()  # 获取是否显示数据类型
-                    xml_content = generator.generate_drawio(table_sql, table_radius=0, field_radius=2, show_type=show_type)
+                    chunks = generator.iter_drawio(schema.subset([selected_table]), table_radius=0, field_radius=2, show_type=show_type)
                     
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(xml_content)
+                        f.writelines(chunks)
                     messagebox.showinfo("成功", f"{selected_table}的Draw.io文件已生成！")
             else:
                 messagebox.showerror("错误", f"未找到表 {selected_table} 的定义！")
         except Exception as e:
             messagebox.showerror("错误", f"导出Draw.io文件时出错：{str(e)}")
 
-class ERDiagramGenerator:
-    def __init__(self):
-        self.dot = graphviz.Graph('ER', 
-                                 engine='neato',  
-                                 graph_attr={
-                                     'splines': 'spline',
-                                     'overlap': 'scale',
-                                     'sep': '+30',
-                                     'esep': '+20',
-                                     'nodesep': '1.0',
-                                     'charset': 'utf8'  # 添加UTF-8支持
-                                 })
-        self.dot.attr('node', shape='rectangle', fontname='Microsoft YaHei')  # 使用中文字体
-
-    def parse_sql(self, sql_content, table_radius=6, field_radius=2, show_type=False):
-        table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\(([\s\S]*?)\);'
-        tables = list(re.finditer(table_pattern, sql_content, re.IGNORECASE))
-        table_count = len(tables)
+    def export_table_bundle(self):
+        """为每张表生成PNG和Draw.io文件并打包为zip，渲染在后台线程中进行"""
+        try:
+            schema, _ = self.current_schema()
+            depth = int(self.bundle_depth_var.get())
+            field_radius = float(self.field_radius_var.get())
+            table_radius = float(self.table_radius_var.get())
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的数值！")
+            return
+        if not len(schema):
+            messagebox.showwarning("警告", "请先输入SQL语句！")
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".zip",
+            filetypes=[("Zip files", "*.zip"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
         
-        table_angle_step = 360 / table_count if table_count > 1 else 0
+        show_type = self.show_type_var.get()
+        layout = self.layout_var.get()
+        radius = table_radius if depth else 0
         
-        for i, table in enumerate(tables):
-            table_name = table.group(1)
-            fields_text = table.group(2)
-            
-            table_angle = i * table_angle_step
-            table_x = table_radius * math.cos(math.radians(table_angle))
-            table_y = table_radius * math.sin(math.radians(table_angle))
-            
-            self.dot.node(table_name, table_name, 
-                         pos=f"{table_x},{table_y}!",
-                         fontname='Microsoft YaHei')
-            
-            field_pattern = r'`?(\w+)`?\s+([^,\n]+)'
-            field_count = len(list(re.finditer(field_pattern, fields_text)))
-            angle_step = 360 / field_count
-            
-            for j, field in enumerate(re.finditer(field_pattern, fields_text)):
-                field_name = field.group(1)
-                field_type = field.group(2).strip()
-                
-                field_angle = j * angle_step
-                field_x = table_x + field_radius * math.cos(math.radians(field_angle))
-                field_y = table_y + field_radius * math.sin(math.radians(field_angle))
-                
-                field_node_name = f"{table_name}_{field_name}"
-                # 根据选项决定是否显示数据类型
-                field_label = f"{field_name}\n{field_type}" if show_type else field_name
-                
-                self.dot.node(field_node_name, 
-                            field_label,
-                            shape='ellipse',
-                            pos=f"{field_x},{field_y}!",
-                            fontname='Microsoft YaHei')
-                
-                self.dot.edge(table_name, field_node_name)
+        def render_table(name, subset):
+            generator = ERDiagramGenerator()
+            generator.load_schema(subset, radius, field_radius, show_type, layout)
+            return {
+                'png': generator.dot.pipe(format='png'),
+                'drawio': DrawioGenerator().generate_from_schema(subset, radius, field_radius, show_type,
+                                                                 layout).encode('utf-8'),
+            }
+        
+        result = {}
+        
+        def run():
+            try:
+                with open(file_path, 'wb') as f:
+                    result['count'] = write_table_bundle(f, schema, render_table, depth=depth,
+                                                         max_workers=os.cpu_count() or 2)
+            except Exception as e:
+                result['error'] = e
+        
+        def wait_done():
+            if thread.is_alive():
+                self.root.after(200, wait_done)
+                return
+            self.export_bundle_btn.configure(state=tk.NORMAL)
+            if 'error' in result:
+                messagebox.showerror("错误", f"批量导出时出错：{result['error']}")
+            else:
+                messagebox.showinfo("成功", f"已导出 {result['count']} 张表的ER图！")
+        
+        self.export_bundle_btn.configure(state=tk.DISABLED)
+        thread = threading.Thread(target=run, name='table-bundle', daemon=True)
+        thread.start()
+        wait_done()
+
+def draw_scene(canvas, scene, font=('Microsoft YaHei', 10)):
+    """把 svg_writer.build_scene 得到的图元画到 Canvas 上：先画连线，再画白底的节点盖住连线"""
+    for x1, y1, x2, y2, label, dashed in scene.edges:
+        canvas.create_line(x1, y1, x2, y2, dash=(5, 2) if dashed else None)
+    for shape, x, y, width, height, lines in scene.nodes:
+        left, top, right, bottom = x - width / 2, y - height / 2, x + width / 2, y + height / 2
+        if shape == 'box':
+            canvas.create_rectangle(left, top, right, bottom, fill='white')
+        elif shape == 'ellipse':
+            canvas.create_oval(left, top, right, bottom, fill='white')
+        else:
+            canvas.create_polygon(x, top, right, y, x, bottom, left, y, fill='white', outline='black')
+        canvas.create_text(x, y, text='\n'.join(lines), font=font, justify=tk.CENTER)
+    for x1, y1, x2, y2, label, dashed in scene.edges:
+        if label:
+            canvas.create_text((x1 + x2) / 2 + 8, (y1 + y2) / 2 - 8, text=label, font=(font[0], font[1] - 1))
 
-    def generate(self, output_file='er_diagram'):
-        # 移除 encoding 参数
-        self.dot.render(output_file, view=True, format='png')
+class PreviewRenderer:
+    """单表预览的后台渲染线程
+
+    submit() 只是把表放入队列；线程每次取出队列中积压的全部请求，同名表只渲染最新的定义，
+    连续编辑时不会为中间状态排队渲染。结果由主线程通过 results() 取回。
+    """
 
-class DrawioGenerator:
     def __init__(self):
-        self.next_id = 2  # 从2开始，因为0和1已被根节点使用
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='preview-renderer', daemon=True)
+        self._thread.start()
 
-    def get_next_id(self):
-        # 使用字符串ID避免重复
-        current_id = f"node_{self.next_id}"
-        self.next_id += 1
-        return current_id
+    def submit(self, tables, field_radius=2, show_type=False):
+        self._requests.put((tables, field_radius, show_type))
 
-    def generate_drawio(self, sql_content, table_radius=6, field_radius=2, show_type=False):
-        xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<mxfile host="app.diagrams.net" modified="2024-01-01T00:00:00.000Z" agent="SQL ER Generator" version="21.1.1">
-  <diagram id="ER-Diagram" name="ER图">
-    <mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" pageWidth="1169" pageHeight="827" background="#ffffff" math="0" shadow="0">
-      <root>
-        <mxCell id="0"/>
-        <mxCell id="1" parent="0"/>
-'''
-        
-        table_pattern = r'CREATE TABLE\s+`?(\w+)`?\s*\(([\s\S]*?)\);'
-        tables = list(re.finditer(table_pattern, sql_content, re.IGNORECASE))
-        table_count = len(tables)
-        center_x, center_y = 400, 300
-        
-        for i, table in enumerate(tables):
-            table_name = table.group(1)
-            fields_text = table.group(2)
-            
-            angle = (2 * math.pi * i) / table_count if table_count > 1 else 0
-            table_x = center_x + table_radius * 50 * math.cos(angle)
-            table_y = center_y + table_radius * 50 * math.sin(angle)
-            
-            # 简化表格为普通方框
-            table_id = self.get_next_id()
-            xml += f'''        <mxCell id="{table_id}" value="{table_name}" style="whiteSpace=wrap;html=1;" vertex="1" parent="1">
-          <mxGeometry x="{table_x}" y="{table_y}" width="120" height="40" as="geometry"/>
-        </mxCell>
-'''
-            
-            field_pattern = r'`?(\w+)`?\s+([^,\n]+)'
-            fields = list(re.finditer(field_pattern, fields_text))
-            
-            for j, field in enumerate(fields):
-                field_name = field.group(1)
-                field_type = field.group(2).strip()
-                
-                field_angle = (2 * math.pi * j) / len(fields)
-                field_x = table_x + field_radius * 100 * math.cos(field_angle)
-                field_y = table_y + field_radius * 100 * math.sin(field_angle)
-                
-                # 根据选项决定是否显示数据类型
-                field_value = f"{field_name}&#10;{field_type}" if show_type else field_name
-                
-                field_id = self.get_next_id()
-                xml += f'''        <mxCell id="{field_id}" value="{field_value}" style="ellipse;whiteSpace=wrap;html=1;" vertex="1" parent="1">
-          <mxGeometry x="{field_x}" y="{field_y}" width="120" height="60" as="geometry"/>
-        </mxCell>
-'''
-                
-                line_id = self.get_next_id()
-                xml += f'''        <mxCell id="{line_id}" style="endArrow=none;html=1;edgeStyle=none;" edge="1" parent="1" source="{table_id}" target="{field_id}">
-          <mxGeometry relative="1" as="geometry"/>
-        </mxCell>
-'''
-        
-        xml += '''      </root>
-    </mxGraphModel>
-  </diagram>
-</mxfile>'''
-        
-        return xml
+    def results(self):
+        items = []
+        while True:
+            try:
+                items.append(self._results.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _run(self):
+        while True:
+            pending = {}
+            request = self._requests.get()
+            while True:
+                tables, field_radius, show_type = request
+                for table in tables:
+                    pending[table.name] = (table, field_radius, show_type)
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+            for name, (table, field_radius, show_type) in pending.items():
+                # 生成DOT出错时也只让这张表预览失败，不能结束后台线程
+                try:
+                    generator = ERDiagramGenerator()
+                    generator.load_schema(Schema([table]), table_radius=0, field_radius=field_radius,
+                                          show_type=show_type, relationships=False)
+                    self._results.put((name, generator.dot.pipe(format='png'), None))
+                except Exception as e:
+                    self._results.put((name, None, f"预览失败：{e}"))
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,1333 @@
+import bisect
+import copy
+import re
+
+from dialects import SNIFF_SIZE, get_dialect, sniff_dialect
+
+_CREATE_TABLE_HEAD = re.compile(
+    r'(?:\s+|--[^\n]*|\#[^\n]*|/\*[\s\S]*?\*/)*CREATE\s+(?:(?:GLOBAL|LOCAL)\s+)?(?:(?:TEMPORARY|TEMP|UNLOGGED)\s+)?TABLE\b',
+    re.IGNORECASE)
+
+_ALTER_TABLE_HEAD = re.compile(
+    r'(?:\s+|--[^\n]*|\#[^\n]*|/\*[\s\S]*?\*/)*ALTER\s+TABLE\b', re.IGNORECASE)
+
+# 需要保留全文解析的语句：首个关键字 -> 完整的语句开头
+_KEPT_HEADS = {
+    'CREATE': _CREATE_TABLE_HEAD,
+    'ALTER': _ALTER_TABLE_HEAD,
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+# PostgreSQL 的 COPY ... FROM stdin; 之后是逐行的数据，以单独一行 \. 结束
+_COPY_FROM_STDIN = re.compile(r'\bFROM\s+STDIN\b', re.IGNORECASE)
+_COPY_END = re.compile(r'^\\\.\r?$', re.MULTILINE)
+
+# 语句分类：建表、改表语句需要保留全文解析；COPY 语句保留以判断其后是否跟着数据；其余语句边扫描边丢弃
+_KEEP = 'keep'
+_COPY = 'copy'
+_SKIP = 'skip'
+
+# 表级约束的起始关键字，出现在列定义位置时不当作字段
+_CONSTRAINT_KEYWORDS = frozenset([
+    'CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE', 'KEY', 'INDEX',
+    'CHECK', 'FULLTEXT', 'SPATIAL', 'EXCLUDE',
+])
+
+# 可以跟在数据类型后面、仍属于类型本身的修饰词
+_TYPE_SUFFIXES = frozenset([
+    'UNSIGNED', 'SIGNED', 'ZEROFILL', 'VARYING', 'PRECISION',
+])
+
+
+class Column:
+    def __init__(self, name, data_type='', definition='', nullable=True,
+                 primary_key=False, unique=False, default=None, comment=None):
+        self.name = name
+        self.data_type = data_type
+        self.definition = definition  # 字段名之后的完整定义文本
+        self.nullable = nullable
+        self.primary_key = primary_key
+        self.unique = unique
+        self.default = default
+        self.comment = comment
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.data_type!r})"
+
+
+class Constraint:
+    PRIMARY_KEY = 'PRIMARY KEY'
+    FOREIGN_KEY = 'FOREIGN KEY'
+    UNIQUE = 'UNIQUE'
+    INDEX = 'INDEX'
+    CHECK = 'CHECK'
+
+    def __init__(self, kind, columns=(), name=None, ref_table=None, ref_columns=()):
+        self.kind = kind
+        self.columns = tuple(columns)
+        self.name = name
+        self.ref_table = ref_table
+        self.ref_columns = tuple(ref_columns)
+
+    def __repr__(self):
+        if self.kind == Constraint.FOREIGN_KEY:
+            return f"Constraint({self.kind!r}, {self.columns!r} -> {self.ref_table!r}{self.ref_columns!r})"
+        return f"Constraint({self.kind!r}, {self.columns!r})"
+
+
+class Table:
+    def __init__(self, name, schema_name=None, comment=None):
+        self.name = name
+        self.schema_name = schema_name
+        self.comment = comment
+        self.like = None  # CREATE TABLE ... LIKE 的来源表名，加入 Schema 时展开
+        self.columns = []
+        self.constraints = []
+        self._columns_by_name = {}
+
+    def add_column(self, column):
+        self.columns.append(column)
+        self._columns_by_name[column.name] = column
+
+    def column(self, name):
+        return self._columns_by_name.get(name)
+
+    def add_constraint(self, constraint):
+        """添加约束，并同步主键与单列唯一约束对应字段的标记"""
+        self.constraints.append(constraint)
+        if constraint.kind == Constraint.PRIMARY_KEY:
+            for column_name in constraint.columns:
+                column = self.column(column_name)
+                if column is not None:
+                    column.primary_key = True
+        elif constraint.kind == Constraint.UNIQUE and len(constraint.columns) == 1:
+            column = self.column(constraint.columns[0])
+            if column is not None:
+                column.unique = True
+
+    def copy(self, name=None):
+        """复制表结构，字段对象也一并复制，修改副本不影响原表"""
+        table = Table(self.name if name is None else name, self.schema_name, self.comment)
+        table.like = self.like
+        for column in self.columns:
+            table.add_column(copy.copy(column))
+        table.constraints = list(self.constraints)
+        return table
+
+    @property
+    def primary_key(self):
+        for constraint in self.constraints:
+            if constraint.kind == Constraint.PRIMARY_KEY:
+                return constraint.columns
+        return tuple(c.name for c in self.columns if c.primary_key)
+
+    @property
+    def foreign_keys(self):
+        return [c for c in self.constraints if c.kind == Constraint.FOREIGN_KEY]
+
+    def unique_keys(self):
+        """返回能唯一确定一行的列组合集合（主键、UNIQUE 约束与 UNIQUE 列）"""
+        keys = set()
+        primary_key = self.primary_key
+        if primary_key:
+            keys.add(frozenset(primary_key))
+        for constraint in self.constraints:
+            if constraint.kind == Constraint.UNIQUE and constraint.columns:
+                keys.add(frozenset(constraint.columns))
+        for column in self.columns:
+            if column.unique:
+                keys.add(frozenset((column.name,)))
+        return keys
+
+    def __repr__(self):
+        return f"Table({self.name!r}, {len(self.columns)} columns)"
+
+
+class TableAlteration:
+    """ALTER TABLE 中新增的字段与约束，由 Schema.alter_table 合并到已有的表"""
+
+    def __init__(self, name, schema_name=None):
+        self.name = name
+        self.schema_name = schema_name
+        self.columns = []
+        self.constraints = []
+
+    def add_column(self, column):
+        self.columns.append(column)
+
+    def add_constraint(self, constraint):
+        self.constraints.append(constraint)
+
+    def __bool__(self):
+        return bool(self.columns or self.constraints)
+
+    def __repr__(self):
+        return f"TableAlteration({self.name!r}, {len(self.columns)} columns, {len(self.constraints)} constraints)"
+
+
+class Relationship:
+    """两张表之间的关系：child 的 child_columns 引用 parent 的 parent_columns"""
+
+    def __init__(self, child, child_columns, parent, parent_columns, name=None,
+                 one_to_one=False, inferred=False):
+        self.child = child
+        self.child_columns = tuple(child_columns)
+        self.parent = parent
+        self.parent_columns = tuple(parent_columns)
+        self.name = name
+        self.one_to_one = one_to_one
+        self.inferred = inferred  # 由同名列推断而来，而非显式外键
+
+    @property
+    def label(self):
+        return ', '.join(self.child_columns)
+
+    @property
+    def child_cardinality(self):
+        return '1' if self.one_to_one else 'N'
+
+    @property
+    def parent_cardinality(self):
+        return '1'
+
+    def __repr__(self):
+        return (f"Relationship({self.child}{self.child_columns!r} "
+                f"{self.child_cardinality}:{self.parent_cardinality} {self.parent}{self.parent_columns!r})")
+
+
+class Schema:
+    def __init__(self, tables=()):
+        self.tables = []
+        self._tables_by_name = {}
+        self._tables_by_folded_name = {}
+        self._invalidate()
+        self.errors = []  # 解析时跳过的语句（带行号的 SQLParseError）
+        for table in tables:
+            self.add_table(table)
+
+    def _invalidate(self):
+        """表有增删改时清空按表建立的缓存，需要时重新建立"""
+        self._column_index = None
+        self._relationships = None
+        self._positions = None  # 表名 -> 在 tables 中的下标
+        self._key_tables = None  # 单列主键名 -> 以它为主键的表名元组
+        self._child_relations = None  # 子表名 -> 该表作为子表的关系元组
+        self._referrers = None  # 表名 -> 以外键引用它的子表名元组
+
+    def add_table(self, table):
+        """加入一张表并返回实际保存的表；LIKE 建表时保存的是复制了来源结构的新表"""
+        if table.like is not None:
+            table = self._expand_like(table)
+        # 同名表以后出现的定义为准
+        existing = self._tables_by_name.get(table.name)
+        if existing is not None:
+            self.tables[self.tables.index(existing)] = table
+        else:
+            self.tables.append(table)
+        self._tables_by_name[table.name] = table
+        self._tables_by_folded_name[table.name.casefold()] = table
+        self._invalidate()
+        return table
+
+    def _expand_like(self, table):
+        source = self.resolve(table.like)
+        if source is None:
+            return table
+        # 与 MySQL、PostgreSQL 的 LIKE 一致：复制字段、主键和索引，不复制外键
+        expanded = source.copy(table.name)
+        expanded.schema_name = table.schema_name
+        expanded.comment = table.comment
+        expanded.like = None
+        expanded.constraints = [c for c in expanded.constraints if c.kind != Constraint.FOREIGN_KEY]
+        for column in table.columns:
+            expanded.add_column(copy.copy(column))
+        for constraint in table.constraints:
+            expanded.add_constraint(constraint)
+        return expanded
+
+    def alter_table(self, alteration, copy_table=False):
+        """把 ALTER TABLE 新增的字段与约束合并到对应的表，返回修改后的表；表不存在时返回 None
+
+        copy_table 为 True 时先复制再修改，原来的 Table 对象保持不变（其他 Schema 可能共用）。
+        """
+        table = self.resolve(alteration.name)
+        if table is None:
+            return None
+        if copy_table:
+            table = table.copy()
+        for column in alteration.columns:
+            table.add_column(copy.copy(column) if copy_table else column)
+        for constraint in alteration.constraints:
+            table.add_constraint(constraint)
+        if copy_table:
+            self.add_table(table)
+        else:
+            self._invalidate()
+        return table
+
+    def get(self, name):
+        return self._tables_by_name.get(name)
+
+    def resolve(self, name):
+        """按名字查找表，精确匹配失败时忽略大小写"""
+        if name is None:
+            return None
+        table = self._tables_by_name.get(name)
+        if table is None:
+            table = self._tables_by_folded_name.get(name.casefold())
+        return table
+
+    def tables_with_column(self, column_name):
+        """返回包含指定列名的所有表（索引在首次调用时建立）"""
+        if self._column_index is None:
+            index = {}
+            for table in self.tables:
+                for column in table.columns:
+                    index.setdefault(column.name, []).append(table)
+            self._column_index = index
+        return self._column_index.get(column_name, [])
+
+    def relationships(self):
+        """返回表之间的全部关系（结果缓存到 schema 变化为止）"""
+        if self._relationships is None:
+            if self._child_relations is not None:
+                self._relationships = self._joined_relations()
+            else:
+                self._relationships = extract_relationships(self)
+        return self._relationships
+
+    def replaced(self, tables):
+        """返回把同名的已有表换成 tables 中的新定义（位置不变）后的新 Schema，本对象保持不变
+
+        未变的表直接共用，只复制列表与字典本身。本对象已经算出关系时，新 Schema 只对受影响的子表
+        重新计算关系：被替换的表本身、主键有变化的表被外键引用时的子表，以及单列主键名有变化时
+        含有这些列名的表。返回 (新 Schema, 关系有变化的子表名集合)；本对象还没有算出关系时集合为 None。
+        """
+        schema = Schema()
+        schema.tables = list(self.tables)
+        schema._tables_by_name = dict(self._tables_by_name)
+        schema._tables_by_folded_name = dict(self._tables_by_folded_name)
+        schema._positions = positions = self._table_positions()
+        schema.errors = self.errors
+        pairs = []
+        for table in tables:
+            old = self._tables_by_name[table.name]
+            if old is table:
+                continue
+            schema.tables[positions[table.name]] = table
+            schema._tables_by_name[table.name] = table
+            folded = table.name.casefold()
+            if schema._tables_by_folded_name.get(folded) is old:
+                schema._tables_by_folded_name[folded] = table
+            pairs.append((old, table))
+
+        if self._column_index is not None:
+            schema._column_index = index = dict(self._column_index)
+            for old, table in pairs:
+                for name in {column.name for column in old.columns + table.columns}:
+                    count = sum(1 for column in table.columns if column.name == name)
+                    index[name] = _replace_ordered(index.get(name, ()), old, [table] * count, positions)
+
+        if self._relationships is None and self._child_relations is None:
+            return schema, None
+        key_tables = self._key_table_map()
+        child_relations = self._child_relation_map()
+        referrers = self._referrer_map()
+        schema._key_tables = dict(key_tables)
+        affected = set()
+        for old, table in pairs:
+            affected.add(table.name)
+            if old.primary_key == table.primary_key:
+                continue
+            affected.update(referrers.get(table.name, ()))
+            for key in {_single_key(old), _single_key(table)} - {None}:
+                owner = schema.key_owner(key)
+                schema._key_tables[key] = tuple(_replace_ordered(
+                    schema._key_tables.get(key, ()), old.name, [table.name] if _single_key(table) == key else [],
+                    positions, name=lambda name: name))
+                # 推断的关系只取决于同名列唯一的主键表，它没变时含有这个列名的表不受影响
+                if schema.key_owner(key) != owner:
+                    affected.update(other.name for other in schema.tables_with_column(key))
+
+        schema._child_relations = dict(child_relations)
+        schema._referrers = dict(referrers)
+        changed = set()
+        for name in affected:
+            relations = tuple(_child_relationships(schema, schema._tables_by_name[name]))
+            previous = child_relations.get(name, ())
+            if [_relation_key(r) for r in relations] == [_relation_key(r) for r in previous]:
+                continue
+            changed.add(name)
+            schema._child_relations[name] = relations
+            for parent in {r.parent for r in previous if not r.inferred} | {r.parent for r in relations if not r.inferred}:
+                children = set(schema._referrers.get(parent, ()))
+                children.discard(name)
+                if any(r.parent == parent and not r.inferred for r in relations):
+                    children.add(name)
+                schema._referrers[parent] = tuple(children)
+        if not changed:
+            schema._relationships = self._relationships
+        return schema, changed
+
+    def _joined_relations(self):
+        """把 replaced() 逐表更新过的关系按 extract_relationships 的顺序拼起来：先按表的顺序是各表的外键，
+        再是推断的关系，按主键名首次出现（即唯一的主键表）的顺序分组，组内按表的顺序"""
+        positions = self._table_positions()
+        explicit = []
+        inferred = []
+        for table in self.tables:
+            for relation in self._child_relations.get(table.name, ()):
+                (inferred if relation.inferred else explicit).append(relation)
+        inferred.sort(key=lambda relation: positions[relation.parent])
+        return explicit + inferred
+
+    def _table_positions(self):
+        if self._positions is None:
+            self._positions = {table.name: i for i, table in enumerate(self.tables)}
+        return self._positions
+
+    def _key_table_map(self):
+        if self._key_tables is None:
+            owners = {}
+            for table in self.tables:
+                key = _single_key(table)
+                if key is not None:
+                    owners.setdefault(key, []).append(table.name)
+            self._key_tables = {key: tuple(names) for key, names in owners.items()}
+        return self._key_tables
+
+    def _child_relation_map(self):
+        if self._child_relations is None:
+            grouped = {}
+            for relation in self.relationships():
+                grouped.setdefault(relation.child, []).append(relation)
+            self._child_relations = {name: tuple(relations) for name, relations in grouped.items()}
+        return self._child_relations
+
+    def _referrer_map(self):
+        if self._referrers is None:
+            referrers = {}
+            for relation in self.relationships():
+                if not relation.inferred:
+                    referrers.setdefault(relation.parent, set()).add(relation.child)
+            self._referrers = {name: tuple(children) for name, children in referrers.items()}
+        return self._referrers
+
+    def key_owner(self, key):
+        """以 key 为单列主键的唯一一张表的表名；没有或有多张时返回 None"""
+        owners = self._key_table_map().get(key, ())
+        return owners[0] if len(owners) == 1 else None
+
+    def table_names(self):
+        return [table.name for table in self.tables]
+
+    def subset(self, names):
+        """按给定表名返回只包含这些表的新Schema
+
+        关系取自本表结构中两端都保留下来的关系，不在子集中重新推断：由同名列推断的关系取决于整个表结构
+        （例如两张表都以 user_id 为主键时不做推断），在子集中重新推断会多出完整的图中没有的连线。
+        检索的子图（schema_index）和分区（partition）都经由这里取子集。
+
+        >>> schema = parse_schema('CREATE TABLE a (code INT PRIMARY KEY);'
+        ...                       'CREATE TABLE b (code INT PRIMARY KEY);'
+        ...                       'CREATE TABLE c (id INT PRIMARY KEY, code INT);')
+        >>> schema.relationships(), schema.subset(['a', 'c']).relationships()
+        ([], [])
+        """
+        wanted = set(names)
+        subset = Schema(t for t in self.tables if t.name in wanted)
+        subset._relationships = [relation for relation in self.relationships()
+                                 if relation.child in wanted and relation.parent in wanted]
+        return subset
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __contains__(self, name):
+        return name in self._tables_by_name
+
+
+def _replace_ordered(items, old, new, positions, name=lambda table: table.name):
+    """items 按表的顺序排列（positions 为表名 -> 下标），返回把其中的 old 换成 new 后的新列表
+
+    二分查找 old 所在的位置，old 与 new 在表中的位置相同。
+    """
+    items = list(items)
+    target = positions[name(old)]
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if positions[name(items[mid])] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    end = lo
+    while end < len(items) and items[end] == old:
+        end += 1
+    items[lo:end] = new
+    return items
+
+
+def _single_key(table):
+    primary_key = table.primary_key
+    return primary_key[0] if len(primary_key) == 1 else None
+
+
+def _relation_key(relation):
+    return (relation.child, relation.child_columns, relation.parent, relation.parent_columns,
+            relation.name, relation.one_to_one, relation.inferred)
+
+
+def _foreign_key_relationships(schema, table):
+    """table 的外键约束中引用了已知表的那些，对应的关系列表"""
+    relationships = []
+    unique_keys = None
+    for constraint in table.foreign_keys:
+        parent = schema.resolve(constraint.ref_table)
+        if parent is None:
+            continue
+        parent_columns = constraint.ref_columns or parent.primary_key
+        if unique_keys is None:
+            unique_keys = table.unique_keys()
+        relationships.append(Relationship(
+            table.name, constraint.columns, parent.name, parent_columns, constraint.name,
+            one_to_one=frozenset(constraint.columns) in unique_keys))
+    return relationships
+
+
+def _child_relationships(schema, table):
+    """table 作为子表的全部关系：外键在前，之后是按字段顺序由同名列推断的关系（规则同 extract_relationships）"""
+    relationships = _foreign_key_relationships(schema, table)
+    linked = {column for relation in relationships for column in relation.child_columns}
+    primary_key = table.primary_key
+    for column in table.columns:
+        key = column.name
+        owner = schema.key_owner(key)
+        if owner is None or owner == table.name or key in linked or primary_key == (key,):
+            continue
+        relationships.append(Relationship(
+            table.name, (key,), owner, (key,), one_to_one=table.column(key).unique, inferred=True))
+    return relationships
+
+
+def extract_relationships(schema, infer_shared_columns=True):
+    """从外键约束提取关系；infer_shared_columns 为 True 时，把与其他表单列主键同名的列也视为引用
+
+    所有查找都通过字典完成，总耗时与约束和列的数量成线性关系。
+    """
+    relationships = []
+    linked = set()
+    for table in schema:
+        for relation in _foreign_key_relationships(schema, table):
+            relationships.append(relation)
+            linked.update((table.name, column) for column in relation.child_columns)
+
+    if not infer_shared_columns:
+        return relationships
+
+    # 单列主键名 -> 所属表；多张表的主键同名（例如都叫 id）时无法判断，记为 None
+    key_owner = {}
+    for table in schema:
+        primary_key = table.primary_key
+        if len(primary_key) == 1:
+            key = primary_key[0]
+            key_owner[key] = None if key in key_owner else table.name
+
+    for key, owner in key_owner.items():
+        if owner is None:
+            continue
+        for table in schema.tables_with_column(key):
+            if table.name == owner or (table.name, key) in linked:
+                continue
+            if table.primary_key == (key,):
+                continue
+            column = table.column(key)
+            relationships.append(Relationship(
+                table.name, (key,), owner, (key,), one_to_one=column.unique, inferred=True))
+    return relationships
+
+
+class SQLParseError(Exception):
+    """语句无法解析；line 为该语句在输入中的起始行号（已知时）"""
+
+    def __init__(self, message, line=None):
+        super().__init__(f"第 {line} 行的语句: {message}" if line else message)
+        self.message = message
+        self.line = line
+
+
+def _tokenize(text, dialect):
+    """把单条语句切分为 (类型, 值, 起始, 结束) 元组，忽略空白与注释"""
+    for m in dialect.token.finditer(text):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == 'qident':
+            quote = value[0]
+            if quote == '[':
+                value = value[1:-1].replace(']]', ']')
+            else:
+                value = value[1:-1].replace(quote * 2, quote)
+        yield (kind, value, m.start(kind), m.end())
+
+
+def _is_word(token, *words):
+    return token is not None and token[0] == 'word' and token[1].upper() in words
+
+
+def _is_punct(token, value):
+    return token is not None and token[0] == 'punct' and token[1] == value
+
+
+def _is_name(token):
+    return token is not None and token[0] in ('word', 'qident')
+
+
+def _string_value(token):
+    # 去掉 N'...' 之类的前缀
+    value = token[1]
+    return value[value.index("'") + 1:-1].replace("''", "'").replace("\\'", "'")
+
+
+class _TokenStream:
+    def __init__(self, text, tokens):
+        self.text = text
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is not None:
+            self.pos += 1
+        return token
+
+    def accept_words(self, *words):
+        """依次匹配关键字序列，全部匹配才前进"""
+        for offset, word in enumerate(words):
+            if not _is_word(self.peek(offset), word):
+                return False
+        self.pos += len(words)
+        return True
+
+    def skip_group(self):
+        """跳过以当前 '(' 开头的括号组，返回组内 (起始, 结束) 位置"""
+        start = self.pos
+        depth = 0
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if token[0] == 'punct':
+                if token[1] == '(':
+                    depth += 1
+                elif token[1] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        return start, self.pos
+        raise SQLParseError("括号不匹配")
+
+    def span_text(self, start, end):
+        """返回 tokens[start:end] 覆盖的原文（空白压缩为单个空格）"""
+        if start >= end:
+            return ''
+        raw = self.text[self.tokens[start][2]:self.tokens[end - 1][3]]
+        return _WHITESPACE.sub(' ', raw)
+
+
+def _parse_name_list(stream):
+    """解析 (a, b, c) 形式的列名列表"""
+    names = []
+    if not _is_punct(stream.peek(), '('):
+        return names
+    start, end = stream.skip_group()
+    depth = 0
+    for token in stream.tokens[start + 1:end - 1]:
+        if token[0] == 'punct' and token[1] == '(':
+            depth += 1
+        elif token[0] == 'punct' and token[1] == ')':
+            depth -= 1
+        elif depth == 0 and _is_name(token):
+            # 跳过 ASC/DESC 等排序修饰
+            if token[0] == 'word' and token[1].upper() in ('ASC', 'DESC'):
+                continue
+            names.append(token[1])
+    return names
+
+
+def _parse_qualified_name(stream):
+    """解析 a.b.c 形式的名字，返回 (schema名, 表名)"""
+    parts = []
+    token = stream.next()
+    if not _is_name(token):
+        raise SQLParseError("缺少表名")
+    parts.append(token[1])
+    while _is_punct(stream.peek(), '.') and _is_name(stream.peek(1)):
+        stream.next()
+        parts.append(stream.next()[1])
+    schema_name = parts[-2] if len(parts) > 1 else None
+    return schema_name, parts[-1]
+
+
+def _parse_references(stream):
+    schema_name, ref_table = _parse_qualified_name(stream)
+    ref_columns = _parse_name_list(stream)
+    return ref_table, ref_columns
+
+
+def _parse_table_constraint(stream, table):
+    name = None
+    if stream.accept_words('CONSTRAINT'):
+        if _is_name(stream.peek()) and not _is_word(stream.peek(), 'PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK'):
+            name = stream.next()[1]
+        if _is_word(stream.peek(), 'DEFAULT'):
+            # SQL Server 的 CONSTRAINT name DEFAULT (...) FOR column，只是默认值
+            return
+
+    if stream.accept_words('PRIMARY', 'KEY'):
+        # MySQL 允许 PRIMARY KEY USING BTREE (...)
+        while not _is_punct(stream.peek(), '(') and stream.peek() is not None:
+            stream.next()
+        table.add_constraint(Constraint(Constraint.PRIMARY_KEY, _parse_name_list(stream), name))
+        return
+
+    if stream.accept_words('FOREIGN', 'KEY'):
+        if _is_name(stream.peek()):
+            name = name or stream.next()[1]
+        columns = _parse_name_list(stream)
+        ref_table, ref_columns = None, ()
+        if stream.accept_words('REFERENCES'):
+            ref_table, ref_columns = _parse_references(stream)
+        table.add_constraint(Constraint(Constraint.FOREIGN_KEY, columns, name, ref_table, ref_columns))
+        return
+
+    if stream.accept_words('CHECK'):
+        table.add_constraint(Constraint(Constraint.CHECK, (), name))
+        return
+
+    kind = Constraint.INDEX
+    if _is_word(stream.peek(), 'UNIQUE'):
+        kind = Constraint.UNIQUE
+    # UNIQUE [KEY|INDEX] [name] (...)、KEY name (...)、FULLTEXT KEY name (...)
+    while stream.peek() is not None and not _is_punct(stream.peek(), '('):
+        token = stream.next()
+        if _is_name(token) and not _is_word(token, 'UNIQUE', 'KEY', 'INDEX', 'FULLTEXT', 'SPATIAL'):
+            name = name or token[1]
+    table.add_constraint(Constraint(kind, _parse_name_list(stream), name))
+
+
+def _parse_column(stream, table):
+    name = stream.next()[1]
+    rest_start = stream.pos
+
+    # 数据类型：首个词 + 可选括号参数 + 类型修饰词
+    type_start = stream.pos
+    if _is_name(stream.peek()):
+        stream.next()
+        while True:
+            if _is_punct(stream.peek(), '('):
+                stream.skip_group()
+            elif _is_word(stream.peek(), *_TYPE_SUFFIXES):
+                stream.next()
+            elif _is_word(stream.peek(), 'WITH', 'WITHOUT') and _is_word(stream.peek(1), 'TIME'):
+                stream.pos += 3
+            elif stream.peek() is not None and stream.peek()[0] == 'other' and stream.peek()[1] == '[':
+                # 数组类型 text[]、integer[3]
+                stream.next()
+                if stream.peek() is not None and stream.peek()[0] == 'word' and \
+                        stream.peek(1) is not None and stream.peek(1)[1] == ']':
+                    stream.next()
+                if stream.peek() is not None and stream.peek()[1] == ']':
+                    stream.next()
+            else:
+                break
+    data_type = stream.span_text(type_start, stream.pos)
+    if data_type and stream.tokens[type_start][0] == 'qident':
+        # SQL Server 的 [int]、[nvarchar](50)：类型名去掉引号
+        first = stream.tokens[type_start]
+        data_type = first[1] + data_type[first[3] - first[2]:]
+
+    column = Column(name, data_type, stream.span_text(rest_start, len(stream.tokens)))
+    table.add_column(column)
+
+    # 列级选项
+    while True:
+        token = stream.next()
+        if token is None:
+            break
+        if token[0] == 'punct' and token[1] == '(':
+            stream.pos -= 1
+            stream.skip_group()
+            continue
+        if token[0] != 'word':
+            continue
+        keyword = token[1].upper()
+        if keyword == 'PRIMARY' and stream.accept_words('KEY'):
+            column.primary_key = True
+            column.nullable = False
+        elif keyword == 'NOT' and stream.accept_words('NULL'):
+            column.nullable = False
+        elif keyword == 'UNIQUE':
+            column.unique = True
+            stream.accept_words('KEY')
+        elif keyword == 'DEFAULT':
+            start = stream.pos
+            if _is_punct(stream.peek(), '('):
+                stream.skip_group()
+            else:
+                stream.next()
+                if _is_punct(stream.peek(), '('):  # 函数调用，如 now()
+                    stream.skip_group()
+            column.default = stream.span_text(start, stream.pos)
+        elif keyword == 'COMMENT':
+            token = stream.next()
+            if token is not None and token[0] == 'string':
+                column.comment = _string_value(token)
+        elif keyword == 'REFERENCES':
+            ref_table, ref_columns = _parse_references(stream)
+            table.add_constraint(Constraint(Constraint.FOREIGN_KEY, (name,), None, ref_table, ref_columns))
+
+
+def _split_items(stream):
+    """把括号内的定义按顶层逗号切分，返回每一项的 token 列表"""
+    start, end = stream.skip_group()
+    return _split_top_level(stream.tokens, start + 1, end - 1)
+
+
+def _split_top_level(tokens, start, end):
+    """把 tokens[start:end] 按顶层逗号切分，返回每一项的 token 列表"""
+    items = []
+    depth = 0
+    item_start = start
+    for index in range(start, end):
+        token = tokens[index]
+        if token[0] != 'punct':
+            continue
+        if token[1] == '(':
+            depth += 1
+        elif token[1] == ')':
+            depth -= 1
+        elif token[1] == ',' and depth == 0:
+            items.append((item_start, index))
+            item_start = index + 1
+    items.append((item_start, end))
+    return [tokens[a:b] for a, b in items if b > a]
+
+
+def parse_create_table(text, dialect=None):
+    """解析一条 CREATE TABLE 语句，返回 Table；不是建表语句时返回 None"""
+    dialect = get_dialect(dialect or 'generic')
+    stream = _TokenStream(text, list(_tokenize(text, dialect)))
+    if not stream.accept_words('CREATE'):
+        return None
+    while _is_word(stream.peek(), 'GLOBAL', 'LOCAL', 'TEMPORARY', 'TEMP', 'UNLOGGED'):
+        stream.next()
+    if not stream.accept_words('TABLE'):
+        return None
+    stream.accept_words('IF', 'NOT', 'EXISTS')
+    schema_name, name = _parse_qualified_name(stream)
+    table = Table(name, schema_name)
+    if stream.accept_words('LIKE'):
+        # MySQL 的 CREATE TABLE a LIKE b
+        table.like = _parse_qualified_name(stream)[1]
+        return table
+    if not _is_punct(stream.peek(), '('):
+        return None
+
+    for item_tokens in _split_items(stream):
+        item = _TokenStream(text, item_tokens)
+        first = item.peek()
+        if _is_word(first, 'LIKE'):
+            # PostgreSQL 的 CREATE TABLE a (LIKE b INCLUDING ALL, ...)
+            item.next()
+            table.like = _parse_qualified_name(item)[1]
+        elif first[0] == 'word' and first[1].upper() in _CONSTRAINT_KEYWORDS:
+            _parse_table_constraint(item, table)
+        elif _is_name(first):
+            _parse_column(item, table)
+
+    # 表选项，例如 MySQL 的 COMMENT='...'
+    while stream.peek() is not None:
+        if stream.accept_words('COMMENT'):
+            if stream.peek() is not None and stream.peek()[1] == '=':
+                stream.next()
+            token = stream.next()
+            if token is not None and token[0] == 'string':
+                table.comment = _string_value(token)
+        else:
+            stream.next()
+    return table
+
+
+def parse_alter_table(text, dialect=None):
+    """解析一条 ALTER TABLE 语句中的 ADD 子句，返回 TableAlteration；没有新增字段或约束时返回 None
+
+    支持 ADD [CONSTRAINT name] PRIMARY KEY/FOREIGN KEY/UNIQUE/KEY/INDEX 与 ADD [COLUMN] 字段定义，
+    也接受 PostgreSQL 的 ALTER TABLE ONLY 和 SQL Server 的 WITH CHECK ADD CONSTRAINT。
+    """
+    dialect = get_dialect(dialect or 'generic')
+    stream = _TokenStream(text, list(_tokenize(text, dialect)))
+    if not stream.accept_words('ALTER', 'TABLE'):
+        return None
+    stream.accept_words('IF', 'EXISTS')
+    stream.accept_words('ONLY')
+    schema_name, name = _parse_qualified_name(stream)
+    alteration = TableAlteration(name, schema_name)
+    for item_tokens in _split_top_level(stream.tokens, stream.pos, len(stream.tokens)):
+        item = _TokenStream(text, item_tokens)
+        if not (item.accept_words('WITH', 'CHECK') or item.accept_words('WITH', 'NOCHECK')):
+            item.accept_words('ONLY')
+        if not item.accept_words('ADD'):
+            continue
+        first = item.peek()
+        if _is_word(first, 'DEFAULT'):
+            continue
+        if first is not None and first[0] == 'word' and first[1].upper() in _CONSTRAINT_KEYWORDS:
+            _parse_table_constraint(item, alteration)
+            continue
+        item.accept_words('COLUMN')
+        item.accept_words('IF', 'NOT', 'EXISTS')
+        if _is_name(item.peek()):
+            _parse_column(item, alteration)
+    return alteration or None
+
+
+def parse_statement(text, dialect=None):
+    """解析一条建表或改表语句，返回 Table 或 TableAlteration；其他语句返回 None"""
+    if _CREATE_TABLE_HEAD.match(text):
+        return parse_create_table(text, dialect)
+    if _ALTER_TABLE_HEAD.match(text):
+        return parse_alter_table(text, dialect)
+    return None
+
+
+class SchemaParser:
+    """增量式 DDL 解析器
+
+    通过 feed() 分块送入 SQL 文本，整个输入只扫描一遍：先按顶层分号切分语句，
+    再只对 CREATE TABLE / ALTER TABLE 语句做细粒度解析。close() 返回最终的 Schema。
+    dialect 为方言名，省略时攒够开头 SNIFF_SIZE 个字符（或输入结束）后由 sniff_dialect 判断。
+
+    INSERT 等其他语句一旦从首个关键字认出，就边扫描边丢弃，不在缓冲区中拼出整条语句；
+    COPY ... FROM stdin 之后的数据行同样直接跳过。max_statement 不为 None 时，
+    需要保留的单条语句（或一个未结束的注释）超过该字符数即抛出 SQLParseError，
+    因此无论输入多大，缓冲区都不会超过 max_statement 加一个分块的大小。
+
+    无法解析的建表语句不会中断整个输入：记下行号后跳过，结果中的 schema.errors 列出这些语句；
+    只有一张表也没有解析出来时，close() 才抛出第一条语句的错误。
+    """
+
+    def __init__(self, max_statement=None, dialect=None):
+        self.schema = Schema()
+        self.max_statement = max_statement
+        self.dialect = get_dialect(dialect) if dialect else None
+        self._buffer = ''
+        self._pos = 0  # 缓冲区内已扫描到的位置，缓冲区总是从当前语句开头开始
+        self._quote = None  # 分块边界处于字符串/引号标识符内部时记录引号字符
+        self._kind = None  # 当前语句的分类，尚未认出时为 None
+        self._copy_data = False  # 正处于 COPY 的数据行中
+        self._line = 1  # 缓冲区开头在输入中的行号
+
+    def feed(self, text):
+        self._buffer += text
+        for _ in self._process(final=False):
+            pass
+
+    def close(self):
+        for _ in self._process(final=True):
+            pass
+        self._check_errors()
+        return self.schema
+
+    def iter_tables(self, chunks):
+        """依次送入 chunks，每解析出或修改一张表就立即产出"""
+        for chunk in chunks:
+            self._buffer += chunk
+            yield from self._process(final=False)
+        yield from self._process(final=True)
+        self._check_errors()
+
+    def _check_errors(self):
+        if self.schema.errors and not self.schema.tables:
+            raise self.schema.errors[0]
+
+    def _process(self, final):
+        if self.dialect is None:
+            if not final and len(self._buffer) < SNIFF_SIZE:
+                return
+            self.dialect = sniff_dialect(self._buffer)
+        for item in self._scan(final):
+            if isinstance(item, TableAlteration):
+                table = self.schema.alter_table(item)
+            else:
+                table = self.schema.add_table(item)
+            if table is not None:
+                yield table
+
+    def _classify(self, buffer, start, final):
+        """根据语句开头判断分类；开头被分块截断、暂时无法判断时返回 None"""
+        m = self.dialect.statement_head.match(buffer, start)
+        word = m.group(1)
+        end = m.end()
+        if not word:
+            if not final and (end == len(buffer) or buffer.startswith(('--', '#', '/*'), end)):
+                return None
+            return _SKIP
+        if end == len(buffer) and not final:
+            return None
+        word = word.upper()
+        head = _KEPT_HEADS.get(word)
+        if head is not None:
+            if head.match(buffer, start):
+                return _KEEP
+            # 留出足够的长度容纳 GLOBAL TEMPORARY TABLE 之类的修饰词
+            return None if len(buffer) - end < 64 and not final else _SKIP
+        if word == 'COPY':
+            return _COPY
+        return _SKIP
+
+    def _scan(self, final):
+        dialect = self.dialect
+        buffer = self._buffer
+        length = len(buffer)
+        pos = self._pos
+        start = 0
+        while pos < length:
+            if self._copy_data:
+                m = _COPY_END.search(buffer, pos)
+                if m is None:
+                    # 数据行全部丢弃，只保留最后一行未完整的部分
+                    pos = start = length if final else max(pos, buffer.rfind('\n', pos) + 1)
+                    break
+                pos = start = m.end()
+                self._copy_data = False
+                continue
+            if self._kind is None:
+                self._kind = self._classify(buffer, start, final)
+            if self._quote is not None:
+                # 续扫上一块中未闭合的字符串，避免每来一块都从字符串开头重扫
+                end = dialect.quote_body[self._quote].match(buffer, pos).end()
+                if not final and end >= length - 1:
+                    pos = end
+                    break
+                pos = end + 1
+                self._quote = None
+                continue
+            m = dialect.chunk_bulk.match(buffer, pos)
+            if m is not None:
+                if final or m.end() < length:
+                    pos = m.end()
+                    continue
+                # 匹配到了缓冲区末尾：最后一段可能被分块截断（例如字符串后紧跟 '' 转义），
+                # 只接受它之前的部分，避免每个 token 都把剩余内容重新匹配一遍
+                if m.start('last') > pos:
+                    pos = m.start('last')
+                    continue
+            m = dialect.chunk_token.match(buffer, pos)
+            end = m.end()
+            if not final and end == length and buffer[pos] in dialect.quote_body:
+                self._quote = buffer[pos]
+                pos += 1
+                continue
+            if not final and (end == length or (dialect.dollar_quotes and m.group('tag') is not None
+                                                and m.group('dollar_body') is None)):
+                # 末尾的 token 可能被分块截断（或 $$ 引用体尚未闭合），等下一块数据再处理
+                break
+            if m.group('separator') is not None:
+                if self._kind == _KEEP:
+                    item = self._handle_statement(buffer, start, pos)
+                    if item is not None:
+                        yield item
+                elif self._kind == _COPY and _COPY_FROM_STDIN.search(buffer, start, pos):
+                    self._copy_data = True
+                self._kind = None
+                start = end
+            pos = end
+        if final and start < length:
+            if self._kind != _SKIP and not self._copy_data:
+                item = self._handle_statement(buffer, start, length)
+                if item is not None:
+                    yield item
+            start = pos = length
+        if self._kind == _SKIP:
+            # 跳过的语句已扫描过的部分不再需要
+            start = pos
+        # 丢弃已处理完的语句，缓冲区只保留当前未结束的语句
+        self._line += buffer.count('\n', 0, start)
+        self._buffer = buffer[start:]
+        self._pos = pos - start
+        if self.max_statement is not None and len(self._buffer) > self.max_statement:
+            raise SQLParseError(f"单条语句超过 {self.max_statement} 个字符的上限")
+
+    def _handle_statement(self, buffer, start, end):
+        try:
+            return parse_statement(buffer[start:end], self.dialect)
+        except SQLParseError as e:
+            # 一条语句写错（或方言认错）不影响其他表，记下语句开头的行号后跳过
+            head = self.dialect.statement_head.match(buffer, start).start(1)
+            self.schema.errors.append(SQLParseError(e.message, self._line + buffer.count('\n', 0, head)))
+            return None
+
+
+def parse_schema(sql_content, dialect=None):
+    """解析整段 SQL 文本，返回 Schema；dialect 省略时根据内容判断"""
+    parser = SchemaParser(dialect=dialect)
+    parser.feed(sql_content)
+    return parser.close()
+
+
+def parse_schema_chunks(chunks, dialect=None):
+    """从分块数据（例如文件对象）中流式解析，返回 Schema"""
+    parser = SchemaParser(dialect=dialect)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def iter_statement_spans(text, pos=0, dialect=None):
+    """从 pos（必须是某条语句的开头）起按顶层分隔符切分，依次产出 (start, end)
+
+    end 是语句结尾分隔符（分号，SQL Server 还有 GO）的位置，最后一条没有分隔符的语句以文本末尾为 end。
+    """
+    dialect = get_dialect(dialect or 'generic')
+    length = len(text)
+    start = pos
+    while pos < length:
+        m = dialect.chunk_bulk.match(text, pos)
+        if m is not None:
+            pos = m.end()
+            continue
+        m = dialect.chunk_token.match(text, pos)
+        if m.group('separator') is not None:
+            yield start, pos
+            start = m.end()
+        pos = m.end()
+    if start < length:
+        yield start, length
+
+
+def _common_prefix(a, b):
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class IncrementalSchema:
+    """跟随编辑器内容增量更新的 Schema
+
+    记录每条语句的位置和解析结果。update() 把新文本与上一版比较找出改动区间，
+    只从改动所在语句的开头重新切分；切分位置与旧的语句边界重新对齐后，其后的语句
+    直接沿用（位置按长度差平移）。重新切分出的语句若与旧语句文本相同，沿用旧的 Table。
+    dialect 省略时每次更新都根据文本开头判断方言，方言变化后全部重新解析。
+
+    各表的建表、改表语句按表名分组保存。表的集合不变时（编辑已有的表），只用改动所涉及的表名的
+    语句重新合并出这几张表，再由 Schema.replaced 换入，关系也只对受影响的表重新计算；
+    表有增删、改名，或者用到 LIKE 建表（依赖其他表的定义）时才整体重建 Schema。
+    每次更新都得到新的 schema 对象，之前取得的 Schema 不会被修改。
+    """
+
+    def __init__(self, dialect=None):
+        self.text = ''
+        self.schema = Schema()
+        self.dialect = get_dialect(dialect) if dialect else None
+        self.reparsed = 0  # 最近一次 update 实际解析的语句数
+        # 最近一次 update 中关系有变化的子表名集合；None 表示整体重建过，表的集合、顺序与关系都可能变化
+        self.relations_changed = set()
+        self._dialect = None  # 当前切分结果所用的方言
+        self._starts = []
+        self._ends = []
+        self._tables = []  # 与语句一一对应，是 Table、TableAlteration 或 None（其他语句）
+        self._definitions = {}  # 表名（忽略大小写）-> 该名字的建表、改表语句，按语句顺序
+        self._group_names = {}  # 表名（忽略大小写）-> schema 中对应的表名元组
+        self._likes = 0  # LIKE 建表语句的条数
+
+    def update(self, text, edit=None):
+        """更新为新文本，返回定义有变化（新增、修改或删除）的表名集合
+
+        调用方已知改动区间时可传 edit=(start, end)，表示旧文本的 [start, end) 被替换，省去逐段比较新旧文本。
+        """
+        old = self.text
+        self.reparsed = 0
+        self.relations_changed = set()
+        if text == old:
+            return set()
+        if self.dialect is None and edit is not None and edit[0] >= SNIFF_SIZE and self._dialect is not None:
+            # 方言只根据开头的 SNIFF_SIZE 个字符判断，改动在这之后时不会变
+            dialect = self._dialect
+        else:
+            dialect = self.dialect or sniff_dialect(text)
+        old_tables = self._tables
+        if dialect is self._dialect and edit is not None:
+            prefix, suffix = edit[0], len(old) - edit[1]
+        elif dialect is self._dialect:
+            prefix = _common_prefix(old, text)
+            suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+        else:
+            # 切分规则变了，不能沿用任何旧结果
+            prefix = suffix = 0
+            self._tables = [None] * len(self._tables)
+            self._dialect = dialect
+        delta = len(text) - len(old)
+        new_change_end = len(text) - suffix
+
+        # 改动所在的第一条语句：结尾分号不早于 prefix 的那一条
+        first = bisect.bisect_left(self._ends, prefix)
+        if dialect.dollar_quotes and ('$' in old[prefix:len(old) - suffix] or '$' in text[prefix:new_change_end]):
+            # $$ 引用体可能跨过前面的分号，保守起见从头切分
+            first = 0
+        scan_from = self._starts[first] if first < len(self._starts) else len(old)
+
+        spans = []
+        resume = len(self._starts)
+        for start, end in iter_statement_spans(text, scan_from, dialect):
+            if start >= new_change_end:
+                # 语句开头已落在公共后缀内，若与旧边界对齐则其后的内容切分结果完全相同
+                j = bisect.bisect_left(self._starts, start - delta, first)
+                if j < len(self._starts) and self._starts[j] == start - delta:
+                    resume = j
+                    break
+            spans.append((start, end))
+
+        previous = {}
+        for i in range(first, resume):
+            if self._tables[i] is not None:
+                previous[old[self._starts[i]:self._ends[i]]] = self._tables[i]
+
+        tables = []
+        for start, end in spans:
+            table = previous.get(text[start:end])
+            if table is None and (_CREATE_TABLE_HEAD.match(text, start, end) or
+                                  _ALTER_TABLE_HEAD.match(text, start, end)):
+                self.reparsed += 1
+                try:
+                    table = parse_statement(text[start:end], dialect)
+                except SQLParseError:
+                    # 正在输入中的语句往往不完整，暂时忽略，等后续编辑补全
+                    table = None
+            tables.append(table)
+
+        old_items = old_tables[first:resume]
+        removed = {id(t): t for t in old_items if t is not None}
+        changed = set()
+        for table in tables:
+            if table is not None and removed.pop(id(table), None) is None:
+                changed.add(table.name)
+        changed.update(table.name for table in removed.values())
+
+        self._starts[first:resume] = [start for start, _ in spans]
+        self._ends[first:resume] = [end for _, end in spans]
+        self._tables[first:resume] = tables
+        if delta:
+            tail = first + len(spans)
+            self._starts[tail:] = [start + delta for start in self._starts[tail:]]
+            self._ends[tail:] = [end + delta for end in self._ends[tail:]]
+        self.text = text
+        shapes = self._index_definitions(old_items, tables)
+        if changed:
+            self._apply(changed, shapes)
+            # 改表语句中的表名可能与建表时的大小写不同，也加入 schema 中实际的表名
+            changed.update(table.name for table in map(self.schema.resolve, list(changed)) if table is not None)
+        return changed
+
+    def _index_definitions(self, old_items, new_items):
+        """从按表名分组的语句中去掉 old_items、加入 new_items；同名的语句有多条时按文本中的顺序排列。
+        返回各个改动过的分组原来的语句形态（见 _shape）"""
+        shapes = {}
+        for item in old_items:
+            if item is not None:
+                key = item.name.casefold()
+                if key not in shapes:
+                    shapes[key] = _shape(self._definitions[key])
+                self._definitions[key].remove(item)
+                if getattr(item, 'like', None) is not None:
+                    self._likes -= 1
+        for item in new_items:
+            if item is not None:
+                key = item.name.casefold()
+                if key not in shapes:
+                    shapes[key] = _shape(self._definitions.get(key, ()))
+                self._definitions.setdefault(key, []).append(item)
+                if getattr(item, 'like', None) is not None:
+                    self._likes += 1
+        order = None
+        for key in shapes:
+            items = self._definitions[key]
+            if not items:
+                del self._definitions[key]
+            elif len(items) > 1:
+                # 同名的语句有多条（重复建表或改表语句）时才需要各语句的下标
+                if order is None:
+                    order = {id(item): i for i, item in enumerate(self._tables)}
+                items.sort(key=lambda item: order[id(item)])
+        return shapes
+
+    def _apply(self, changed, shapes):
+        """把有变化的表更新到 schema
+
+        各表在 schema 中的顺序取决于它的第一条建表语句的位置。改动过的分组只是把语句逐条换成新的
+        （形态不变）时，顺序不变，可以逐表替换；否则（例如第一条建表语句解析失败）整体重建。
+        """
+        if not self._likes:
+            tables = []
+            for key in {name.casefold() for name in changed}:
+                items = self._definitions.get(key, ())
+                if _shape(items) != shapes.get(key):
+                    break
+                group = Schema()
+                for item in items:
+                    _merge_statement(group, item)
+                if tuple(group.table_names()) != self._group_names.get(key, ()):
+                    break
+                tables.extend(group.tables)
+            else:
+                self.schema, self.relations_changed = self.schema.replaced(tables)
+                return
+        schema = Schema()
+        folded = {name.casefold() for name in changed}
+        for item in self._tables:
+            _merge_statement(schema, item)
+            # LIKE 建的表复制了来源表的结构，来源表变了它也跟着变
+            if getattr(item, 'like', None) is not None and item.like.casefold() in folded:
+                changed.add(item.name)
+                folded.add(item.name.casefold())
+        groups = {}
+        for table in schema:
+            groups.setdefault(table.name.casefold(), []).append(table.name)
+        self.schema = schema
+        self.relations_changed = None
+        self._group_names = {key: tuple(names) for key, names in groups.items()}
+
+
+def _shape(items):
+    """一组同名语句的形态：依次是建表还是改表语句、用的哪个表名"""
+    return tuple((isinstance(item, TableAlteration), item.name) for item in items)
+
+
+def _merge_statement(schema, item):
+    """把一条建表（Table）或改表（TableAlteration）语句的结果合并到 schema"""
+    if isinstance(item, TableAlteration):
+        # 保存的 Table 在下次更新时还会用到，合并改表语句时不能修改它
+        schema.alter_table(item, copy_table=True)
+    elif item is not None:
+        schema.add_table(item)
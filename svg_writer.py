@@ -0,0 +1,309 @@
+import math
+
+from diagram_model import TableLayout, as_model, load_model
+
+# 不经过 Graphviz 的快速预览：直接按布局坐标生成 SVG，连线为直线，节点为简单图形。
+# 节点位置与 graphviz_writer 固定的 pos 一致（1英寸 = 72点），只是不做重叠消除和样条布线。
+# SvgGenerator 写出 SVG；build_scene 给出与输出格式无关的图元，桌面版直接画到 Canvas 上。
+
+POINTS_PER_INCH = 72
+FONT_SIZE = 14
+LINE_HEIGHT = FONT_SIZE * 1.2
+FONT_FAMILY = "'Microsoft YaHei', 'PingFang SC', 'Noto Sans CJK SC', sans-serif"
+MARGIN = 20
+
+# 与 Graphviz 默认值相同：节点最小 0.75 x 0.5 英寸，文字两侧各留约 8 点
+MIN_WIDTH = 54
+MIN_HEIGHT = 36
+PADDING = 16
+
+# 椭圆和菱形要比文字框大才能把文字包住
+SHAPE_SCALE = {'box': 1.0, 'ellipse': math.sqrt(2), 'diamond': 2.0}
+
+STYLE = (f"<style>text{{font-family:{FONT_FAMILY};font-size:{FONT_SIZE}px;text-anchor:middle;"
+         "dominant-baseline:central}"
+         ".n{fill:#fff;stroke:#000}"
+         ".e{stroke:#000;fill:none}"
+         ".d{stroke-dasharray:5,2}"
+         ".l text{font-size:12px}</style>")
+
+
+def escape_text(value):
+    """转义文本节点内容；逐个 replace 比 str.translate 快得多，没有特殊字符时原样返回"""
+    return str(value).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def text_width(text, font_size=FONT_SIZE):
+    """估算一行文字的宽度：全角字符按一个字号，其余按半个多字号"""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2e80)
+    return (wide + (len(text) - wide) * 0.6) * font_size
+
+
+def node_size(shape, lines):
+    scale = SHAPE_SCALE[shape]
+    width = max(text_width(line) for line in lines) + PADDING
+    height = len(lines) * LINE_HEIGHT + PADDING / 2
+    return max(MIN_WIDTH, width * scale), max(MIN_HEIGHT, height * scale)
+
+
+class _Sizes(dict):
+    """(形状, 文字行) -> (宽, 高)；字段名和类型大量重复，同一张图内只估算一次。同时记下最大的宽和高"""
+    max_width = max_height = 0
+
+    def __missing__(self, key):
+        size = self[key] = node_size(*key)
+        width, height = size
+        if width > self.max_width:
+            self.max_width = width
+        if height > self.max_height:
+            self.max_height = height
+        return size
+
+
+# 坐标取整到点，预览不需要更高精度
+_BOX = '<rect class="n" x="%d" y="%d" width="%d" height="%d"/>'
+_ELLIPSE = '<ellipse class="n" cx="%d" cy="%d" rx="%d" ry="%d"/>'
+_DIAMOND = '<polygon class="n" points="%d,%d %d,%d %d,%d %d,%d"/>'
+_LABEL = '<text x="%d" y="%d">%s</text>'
+
+
+def _field_markup(offset, size, line_count):
+    """字段椭圆及文字的标记，按文字行切开：返回的片段与转义后的各行交替拼接"""
+    x, y = offset
+    width, height = size
+    shape = _ELLIPSE % (x, y, width / 2, height / 2)
+    if line_count == 1:
+        return shape + '<text x="%d" y="%d">' % (x, y), '</text>'
+    top = y - LINE_HEIGHT / 2
+    return (shape + '<text><tspan x="%d" y="%d">' % (x, top),
+            '</tspan><tspan x="%d" y="%d">' % (x, top + LINE_HEIGHT),
+            '</tspan></text>')
+
+
+class TableMarkup:
+    """表的 SVG 标记，坐标相对表中心（由外层 <g transform="translate(...)"> 定位）
+
+    edges() 为字段连线，nodes() 为字段椭圆与表的矩形。字段数相同的表共用同一组相对坐标，
+    字段的标记只需拼接而不必逐个格式化数字；表移动时标记不变，实时预览只需发送新位置。
+    """
+
+    def __init__(self, field_radius=2, show_type=False):
+        self.ring = field_radius * POINTS_PER_INCH
+        self.show_type = show_type
+        self.sizes = _Sizes()
+        self._offsets = {}
+        self._edges = {}
+        self._fields = {}
+
+    def offsets(self, count):
+        """count 个字段相对表中心的偏移。Graphviz 中字段按逆时针排列（y 轴向上），换成屏幕坐标后 y 取反"""
+        offsets = self._offsets.get(count)
+        if offsets is None:
+            ring = self.ring
+            offsets = self._offsets[count] = [(ring * math.cos(2 * math.pi * j / count),
+                                               -ring * math.sin(2 * math.pi * j / count))
+                                              for j in range(count)]
+        return offsets
+
+    def lines(self, field_names, field_types, index):
+        if self.show_type:
+            return field_names[index], field_types[index]
+        return field_names[index],
+
+    def edges(self, count):
+        markup = self._edges.get(count)
+        if markup is None:
+            markup = self._edges[count] = '<path class="e" d="%s"/>' % ''.join(
+                'M0 0L%d %d' % offset for offset in self.offsets(count)) if count else ''
+        return markup
+
+    def nodes(self, table_name, field_names, field_types):
+        count = len(field_names)
+        sizes = self.sizes
+        fields = self._fields
+        parts = []
+        for j in range(count):
+            lines = self.lines(field_names, field_types, j)
+            size = sizes['ellipse', lines]
+            key = (count, j, size, len(lines))
+            markup = fields.get(key)
+            if markup is None:
+                markup = fields[key] = _field_markup(self.offsets(count)[j], size, len(lines))
+            if len(lines) == 1:
+                parts.append(markup[0] + escape_text(lines[0]) + markup[1])
+            else:
+                parts.append(markup[0] + escape_text(lines[0]) + markup[1] + escape_text(lines[1]) + markup[2])
+        width, height = sizes['box', (table_name,)]
+        parts.append(_BOX % (-width / 2, -height / 2, width, height) + f'<text>{escape_text(table_name)}</text>')
+        return '\n'.join(parts)
+
+
+def relation_center(relation, parent, child, ring):
+    """关系菱形的中心：两表中心连线的中点；自引用关系放在表的右上方，与 Graphviz 版一致"""
+    rel_x = (parent[0] + child[0]) / 2
+    rel_y = (parent[1] + child[1]) / 2
+    if relation.parent == relation.child:
+        rel_x += ring
+        rel_y -= ring
+    return rel_x, rel_y
+
+
+def relation_markup(items, sizes):
+    """关系层的标记，items 为 (关系, 父表中心, 子表中心, 菱形中心)；返回 (连线, 菱形节点, 基数标注) 三段文本"""
+    solid = []
+    dashed = []
+    nodes = []
+    labels = []
+    for relation, (parent_x, parent_y), (child_x, child_y), (x, y) in items:
+        solid.append('M%d %dL%d %d' % (parent_x, parent_y, x, y))
+        (dashed if relation.inferred else solid).append('M%d %dL%d %d' % (x, y, child_x, child_y))
+        labels.append(_LABEL % ((parent_x + x) / 2 + 8, (parent_y + y) / 2 - 8,
+                                escape_text(relation.parent_cardinality)))
+        labels.append(_LABEL % ((x + child_x) / 2 + 8, (y + child_y) / 2 - 8,
+                                escape_text(relation.child_cardinality)))
+        width, height = sizes['diamond', (relation.label,)]
+        nodes.append(_DIAMOND % (x, y - height / 2, x + width / 2, y, x, y + height / 2, x - width / 2, y) +
+                     _LABEL % (x, y, escape_text(relation.label)))
+    edges = ''
+    if solid:
+        edges += f'<path class="e" d="{"".join(solid)}"/>'
+    if dashed:
+        edges += f'<path class="e d" d="{"".join(dashed)}"/>'
+    return edges, '\n'.join(nodes), f'<g class="l">{"".join(labels)}</g>' if labels else ''
+
+
+def bounds(xs, ys, sizes, ring):
+    """画布范围 (x, y, width, height)，xs/ys 为各表中心（点）：字段和关系节点都在表中心的 ring 范围内
+    （自引用的关系节点恰在边上），再加上最大节点的半宽/半高和 MARGIN；只看表的坐标，范围可能略大于实际。
+    须在取过所有节点大小之后调用"""
+    if not xs:
+        return -MARGIN, -MARGIN, 2 * MARGIN, 2 * MARGIN
+    half_width = sizes.max_width / 2 + ring + MARGIN
+    half_height = sizes.max_height / 2 + ring + MARGIN
+    return (min(xs) - half_width, min(ys) - half_height,
+            max(xs) - min(xs) + 2 * half_width, max(ys) - min(ys) + 2 * half_height)
+
+
+class _Geometry:
+    """一组布局参数下各表的位置（单位为点，y 轴向下）"""
+
+    def __init__(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                 relationships=True, positions=None):
+        self.model = as_model(schema)
+        if positions is None:
+            self.table_layout = self.model.layout(layout, table_radius, node_size=2 * field_radius + 1)
+        else:
+            self.table_layout = TableLayout.from_positions(self.model.names, positions)
+        self.tables = TableMarkup(field_radius, show_type)
+        self.relationships = relationships
+
+    def table_center(self, index):
+        return self.table_layout.xs[index] * POINTS_PER_INCH, self.table_layout.ys[index] * POINTS_PER_INCH
+
+    def relations(self):
+        """逐个产出 (关系, 父表中心, 子表中心, 菱形中心)"""
+        if not self.relationships:
+            return
+        for relation in self.model.relations:
+            parent = self.table_center(relation.parent_index)
+            child = self.table_center(relation.child_index)
+            yield relation, parent, child, relation_center(relation, parent, child, self.tables.ring)
+
+    def bounds(self):
+        return bounds([x * POINTS_PER_INCH for x in self.table_layout.xs],
+                      [y * POINTS_PER_INCH for y in self.table_layout.ys], self.tables.sizes, self.tables.ring)
+
+
+class Scene:
+    """一张图的全部图元，坐标单位为点，y 轴向下
+
+    nodes 为 (形状, 中心x, 中心y, 宽, 高, 文字行元组) 列表，形状为 box / ellipse / diamond；
+    edges 为 (x1, y1, x2, y2, 标注或None, 是否虚线) 列表；
+    (x, y, width, height) 为包含所有节点的画布范围，左上角不一定是原点。
+    """
+    __slots__ = ('nodes', 'edges', 'x', 'y', 'width', 'height')
+
+    def __init__(self, nodes, edges, x, y, width, height):
+        self.nodes = nodes
+        self.edges = edges
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+def build_scene(schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                relationships=True, positions=None):
+    """schema 为 Schema 或 DiagramModel，布局参数与 ERDiagramGenerator.load_schema 相同"""
+    geometry = _Geometry(schema, table_radius, field_radius, show_type, layout, relationships, positions)
+    model = geometry.model
+    tables = geometry.tables
+    sizes = tables.sizes
+    nodes = []
+    edges = []
+    for i, table_name in enumerate(model.names):
+        table_x, table_y = geometry.table_center(i)
+        field_names, field_types = model.columns(i)
+        offsets = tables.offsets(len(field_names))
+        for j in range(len(field_names)):
+            field_x = table_x + offsets[j][0]
+            field_y = table_y + offsets[j][1]
+            lines = tables.lines(field_names, field_types, j)
+            edges.append((table_x, table_y, field_x, field_y, None, False))
+            nodes.append(('ellipse', field_x, field_y) + sizes['ellipse', lines] + (lines,))
+        lines = (table_name,)
+        nodes.append(('box', table_x, table_y) + sizes['box', lines] + (lines,))
+
+    for relation, (parent_x, parent_y), (child_x, child_y), (rel_x, rel_y) in geometry.relations():
+        lines = (relation.label,)
+        nodes.append(('diamond', rel_x, rel_y) + sizes['diamond', lines] + (lines,))
+        edges.append((parent_x, parent_y, rel_x, rel_y, relation.parent_cardinality, False))
+        edges.append((rel_x, rel_y, child_x, child_y, relation.child_cardinality, relation.inferred))
+    return Scene(nodes, edges, *geometry.bounds())
+
+
+class SvgGenerator:
+    """生成快速预览用的 SVG
+
+    iter_svg 按顺序产出文本片段，generate_svg / generate_from_schema 返回完整字符串。
+    每张表写成一个平移到表中心的 <g>，内容由 TableMarkup 生成。
+    """
+
+    def generate_svg(self, sql_content, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                     relationships=True):
+        return self.generate_from_schema(load_model(sql_content), table_radius, field_radius, show_type,
+                                         layout, relationships)
+
+    def generate_from_schema(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                             relationships=True, positions=None):
+        return ''.join(self.iter_svg(schema, table_radius, field_radius, show_type, layout,
+                                     relationships, positions))
+
+    def iter_svg(self, schema, table_radius=6, field_radius=2, show_type=False, layout='circle',
+                 relationships=True, positions=None):
+        # 布局在返回生成器之前算好，布局方式错误等异常不会出现在输出中途
+        geometry = _Geometry(schema, table_radius, field_radius, show_type, layout, relationships, positions)
+        return self._iter_document(geometry)
+
+    def _iter_document(self, geometry):
+        model = geometry.model
+        tables = geometry.tables
+        # 先画所有连线，再画节点；节点填充白色，盖住连线伸进节点的部分，不必计算连线与图形的交点
+        edges = []
+        nodes = []
+        for i, table_name in enumerate(model.names):
+            field_names, field_types = model.columns(i)
+            group = '<g transform="translate(%d %d)">' % geometry.table_center(i)
+            if field_names:
+                edges.append(group + tables.edges(len(field_names)) + '</g>')
+            nodes.append(group + tables.nodes(table_name, field_names, field_types) + '</g>')
+        relation_edges, relation_nodes, labels = relation_markup(geometry.relations(), tables.sizes)
+
+        x, y, width, height = geometry.bounds()
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}pt" height="{height:.0f}pt" '
+               f'viewBox="{x:.0f} {y:.0f} {width:.0f} {height:.0f}">\n{STYLE}\n')
+        yield '\n'.join(edges)
+        yield f'\n{relation_edges}\n'
+        yield '\n'.join(nodes)
+        yield f'\n{relation_nodes}\n{labels}\n</svg>\n'
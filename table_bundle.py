@@ -0,0 +1,93 @@
+import re
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from layout import relationship_edges
+
+# 压缩包内文件名中不允许出现的字符
+_UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+# 已经压缩过的格式直接存储，避免重复压缩浪费CPU
+_STORED_FORMATS = frozenset(['png'])
+
+
+class BundleCancelled(Exception):
+    pass
+
+
+def neighbour_map(schema):
+    """表名 -> 通过关系直接相连的表名集合（不区分方向）"""
+    neighbours = defaultdict(set)
+    for child, parent in relationship_edges(schema):
+        neighbours[child].add(parent)
+        neighbours[parent].add(child)
+    return neighbours
+
+
+def table_neighbourhood(schema, name, depth=0, neighbours=None):
+    """返回以 name 为中心、沿关系向外扩展 depth 层的子Schema；depth=0 时只含该表本身"""
+    if name not in schema:
+        raise ValueError(f"未找到表 {name} 的定义")
+    if neighbours is None:
+        neighbours = neighbour_map(schema)
+    found = {name}
+    frontier = deque([(name, 0)])
+    while frontier:
+        current, distance = frontier.popleft()
+        if distance >= depth:
+            continue
+        for other in neighbours.get(current, ()):
+            if other not in found:
+                found.add(other)
+                frontier.append((other, distance + 1))
+    return schema.subset(found)
+
+
+def safe_filename(name):
+    return _UNSAFE_FILENAME.sub('_', name).strip(' .') or '_'
+
+
+def write_table_bundle(fileobj, schema, render_table, names=None, depth=0, max_workers=4, cancel_check=None):
+    """为每张表生成一组文件并写入zip
+
+    schema 只解析一次，各表的子图由 render_table(表名, 子Schema) 在线程池中并行渲染，
+    返回 {扩展名: 字节}；结果按表的顺序写入压缩包。同时在途的任务数有上限，
+    已完成但尚未写入的结果不会无限堆积。返回写入的表数量。
+    """
+    names = list(names) if names else schema.table_names()
+    for name in names:
+        if name not in schema:
+            raise ValueError(f"未找到表 {name} 的定义")
+    neighbours = neighbour_map(schema) if depth > 0 else {}
+    window = max_workers * 2
+    used = set()
+
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='table-bundle') as executor:
+        pending = deque()
+        remaining = iter(names)
+        try:
+            while True:
+                for name in remaining:
+                    subset = table_neighbourhood(schema, name, depth, neighbours)
+                    pending.append((name, executor.submit(render_table, name, subset)))
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                if cancel_check is not None and cancel_check():
+                    raise BundleCancelled("导出已取消")
+                name, future = pending.popleft()
+                base = safe_filename(name)
+                if base.casefold() in used:
+                    base = f"{base}_{len(used)}"
+                used.add(base.casefold())
+                for extension, data in future.result().items():
+                    compress_type = zipfile.ZIP_STORED if extension in _STORED_FORMATS else zipfile.ZIP_DEFLATED
+                    archive.writestr(f"{base}.{extension}", data, compress_type=compress_type)
+        except BaseException:
+            for _, future in pending:
+                future.cancel()
+            raise
+    return len(names)
@@ -0,0 +1,77 @@
+import math
+import re
+
+# 分块显示：先用 neato 计算一次完整布局（输出带坐标的DOT），之后每个图块都以 neato -n2
+# 按已有坐标绘制，并通过 viewport 属性只输出该图块覆盖的区域，不再重新布局。
+# 坐标单位为点（1/72英寸），渲染时固定 dpi=72，因此一个点对应一个像素。
+
+TILE_SIZE = 256
+# 最大缩放级别下每个点对应的像素数
+MAX_SCALE = 2.0
+TILE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+_NUMBER = r'(-?[\d.]+(?:e[-+]?\d+)?)'
+_BBOX = re.compile(rf'\bbb="{_NUMBER},{_NUMBER},{_NUMBER},{_NUMBER}"')
+
+
+class TileGrid:
+    """布局包围盒上的分块网格
+
+    缩放级别 0 时整张图缩放到恰好放进一个图块，每升一级边长放大一倍，
+    直到每个点对应 max_scale 个像素。图块编号 (x, y) 从左上角开始。
+    """
+
+    def __init__(self, bbox, tile_size=TILE_SIZE, max_scale=MAX_SCALE):
+        self.x0, self.y0, self.x1, self.y1 = bbox
+        self.tile_size = tile_size
+        self.width = max(self.x1 - self.x0, 1.0)
+        self.height = max(self.y1 - self.y0, 1.0)
+        self.base_scale = tile_size / max(self.width, self.height)
+        self.max_zoom = max(0, math.ceil(math.log2(max_scale / self.base_scale)))
+
+    @classmethod
+    def from_layout(cls, layout_source, **kwargs):
+        """从 neato -Tdot 的输出中读取图的包围盒"""
+        m = _BBOX.search(layout_source)
+        if m is None:
+            raise ValueError("布局结果中缺少包围盒信息")
+        return cls(tuple(float(value) for value in m.groups()), **kwargs)
+
+    def scale(self, zoom):
+        return self.base_scale * 2 ** zoom
+
+    def grid_size(self, zoom):
+        """返回该缩放级别下的 (列数, 行数)"""
+        scale = self.scale(zoom)
+        return (max(1, math.ceil(self.width * scale / self.tile_size)),
+                max(1, math.ceil(self.height * scale / self.tile_size)))
+
+    def contains(self, zoom, x, y):
+        if not 0 <= zoom <= self.max_zoom:
+            return False
+        columns, rows = self.grid_size(zoom)
+        return 0 <= x < columns and 0 <= y < rows
+
+    def viewport(self, zoom, x, y):
+        """Graphviz viewport 属性 "W,H,Z,中心x,中心y"，中心点使用图坐标（y 轴向上）"""
+        scale = self.scale(zoom)
+        span = self.tile_size / scale
+        center_x = self.x0 + (x + 0.5) * span
+        center_y = self.y1 - (y + 0.5) * span
+        return f"{self.tile_size},{self.tile_size},{scale:.6f},{center_x:.3f},{center_y:.3f}"
+
+    def render_args(self, zoom, x, y):
+        """渲染单个图块时传给 neato 的命令行参数"""
+        return ('-n2', '-Gdpi=72', f'-Gviewport={self.viewport(zoom, x, y)}')
+
+    def describe(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'tile_size': self.tile_size,
+            'max_zoom': self.max_zoom,
+            'levels': [self.grid_size(zoom) for zoom in range(self.max_zoom + 1)],
+        }
@@ -0,0 +1,10 @@
+"""生产环境的 WSGI 入口
+
+gunicorn 读取项目目录下的 gunicorn.conf.py，按 preload_app 在主进程中导入本模块：
+启动检查与预热只做一次，之后 fork 出的工作进程共享已编译的解析规则和模板。
+Graphviz 不可用时导入失败，gunicorn 直接退出。
+"""
+from app import app, readiness
+from serving import preload
+
+preload(app, readiness)